@@ -21,7 +21,14 @@ class CommandAdmin(admin.ModelAdmin):
 
 @admin.register(Job)
 class JobAdmin(admin.ModelAdmin):
-    list_display = ["name", "comment", "command"]
+    list_display = [
+        "name",
+        "comment",
+        "command",
+        "priority",
+        "max_concurrent_runs",
+        "exclusion_group",
+    ]
 
 
 class JobRunLogEntryInline(admin.TabularInline):
@@ -33,11 +40,19 @@ class JobRunLogEntryInline(admin.TabularInline):
 class JobRunAdmin(ReadOnlyAdmin):
     date_hierarchy = "started_at"
     inlines = [JobRunLogEntryInline]
-    list_display = ["started_at_p", "stopped_at_p", "job", "exit_code"]
+    list_display = ["started_at_p", "stopped_at_p", "job", "exit_code", "wait_time"]
     list_filter = ("started_at", ("started_at", DateRangeFilter), "job", "exit_code")
     # auto_now_add_fields don't show even in readonlyadmin.
     # Therefore we'll add all the fields by hand in a suitable order
-    readonly_fields = ("job", "pid", "started_at_p", "stopped_at_p", "exit_code")
+    readonly_fields = (
+        "job",
+        "pid",
+        "hostname",
+        "started_at_p",
+        "stopped_at_p",
+        "exit_code",
+        "wait_time",
+    )
     search_fields = ["log_entries__text"]
     exclude = ["stopped_at"]
 
@@ -58,7 +73,13 @@ class JobRunLogEntryAdmin(ReadOnlyAdmin):
 @admin.register(JobRunQueueItem)
 class JobRunQueueItemAdmin(ReadOnlyAdmin):
     date_hierarchy = "run_at"
-    list_display = ["run_at", "scheduled_job", "assigned_at", "assignee_pid"]
+    list_display = [
+        "run_at",
+        "scheduled_job",
+        "assigned_at",
+        "assignee_pid",
+        "held_back_at",
+    ]
 
 
 @admin.register(ScheduledJob)
@@ -6,3 +6,19 @@ from datetime import timedelta
 #: started until the grace period has elapsed too.  After the grace
 #: period has passed, the missed scheduling will be discarded.
 GRACE_PERIOD_LENGTH = timedelta(minutes=5)
+
+#: Launch timeout length.
+#:
+#: If the process of a job run hasn't been started in this time after
+#: the job run was created, the launching is considered failed and the
+#: job run no longer counts towards the concurrency limits.
+LAUNCH_TIMEOUT_LENGTH = timedelta(minutes=1)
+
+#: Exit code recorded for a job run whose process has stopped without
+#: recording its stopping, e.g. because it was killed or the host crashed.
+LOST_JOB_RUN_EXIT_CODE = -1
+
+#: Maximum time (in seconds) that the scheduler waits before checking the
+#: held back job runs again.  The scheduler is woken up when a job run
+#: stops, but a job run which crashes doesn't record its stopping.
+HELD_BACK_CHECK_INTERVAL = 60.0
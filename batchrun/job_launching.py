@@ -1,15 +1,25 @@
 import multiprocessing
+import os
 import subprocess
 import sys
+from datetime import datetime
+from typing import Optional
 
 import daemon
+from django import db
 
+from ._times import utc_now
+from .job_running import execute_job_run
 from .management.commands import batchrun_execute_job_run
 from .models import Job, JobRun
 from .utils import get_django_manage_py
 
 
-def run_job(job: Job) -> JobRun:
+def run_job(
+    job: Job,
+    fork_server: Optional["JobRunForkServer"] = None,
+    scheduled_at: Optional[datetime] = None,
+) -> JobRun:
     """
     Run given job and store its output logs to database.
 
@@ -24,12 +34,20 @@ def run_job(job: Job) -> JobRun:
     object as soon as the job finishes.  Use `job_run.refresh_from_db()`
     to make them visible.
 
+    :param fork_server:
+      Fork server to launch the job with.  If not given or if the fork
+      server is not running, a new Django process is started for the job.
+    :param scheduled_at:
+      Scheduled run time of the job, which is used to record the time
+      the job run waited to be started.
     :return: JobRun object of the stared job.
     """
-    job_run = JobRun.objects.create(job=job)
-    launcher = JobRunLauncher(job_run)
-    launcher.start()
-    launcher.join()
+    wait_time = (utc_now() - scheduled_at) if scheduled_at else None
+    job_run = JobRun.objects.create(job=job, wait_time=wait_time)
+    if not (fork_server and fork_server.launch(job_run)):
+        launcher = JobRunLauncher(job_run)
+        launcher.start()
+        launcher.join()
     return job_run  # type: ignore
 
 
@@ -46,3 +64,70 @@ class JobRunLauncher(multiprocessing.Process):
             subprocess.run(
                 command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
             )
+
+
+class JobRunForkServer(multiprocessing.Process):
+    """
+    Long-lived process which launches job runs in forked processes.
+
+    The fork server is forked from a process which already has Django
+    set up, so the job runs launched by it don't have to pay for the
+    Django startup.  Each job run is executed in its own daemon process
+    forked from the fork server, so a crashing job doesn't affect the
+    other jobs, and the jobs are run to their completion even if the
+    fork server is terminated.  The Django management commands are run
+    in-process, see `job_running.ManagementCommandProcess`.
+
+    The fork server must be started before the database connections are
+    opened, since they cannot be shared by the processes.
+    """
+
+    def __init__(self) -> None:
+        (self._receiver, self._sender) = multiprocessing.Pipe(duplex=False)
+        super().__init__(daemon=True)
+
+    def start(self) -> None:
+        # Make sure that there are no connections to share
+        db.connections.close_all()
+        super().start()
+        self._receiver.close()
+
+    def launch(self, job_run: JobRun) -> bool:
+        """
+        Launch the job run in a process forked from the fork server.
+
+        :return: False if the fork server is not running
+        """
+        if not self.is_alive():
+            return False
+        try:
+            self._sender.send(job_run.pk)
+        except OSError:  # E.g. BrokenPipeError if the fork server died
+            return False
+        return True
+
+    def run(self) -> None:
+        self._sender.close()
+        while True:
+            try:
+                job_run_id = self._receiver.recv()
+            except EOFError:  # The launching process has exited
+                return
+
+            pid = os.fork()
+            if pid == 0:  # In the child process
+                try:
+                    with daemon.DaemonContext(umask=0o022, detach_process=True):
+                        _execute_job_run_by_id(job_run_id)
+                finally:
+                    os._exit(0)
+
+            # The child process exits right after detaching the daemon
+            os.waitpid(pid, 0)
+
+
+def _execute_job_run_by_id(job_run_id: int) -> None:
+    try:
+        execute_job_run(JobRun.objects.get(pk=job_run_id), in_process=True)
+    finally:
+        db.connections.close_all()
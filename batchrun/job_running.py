@@ -1,27 +1,59 @@
+import os
+import socket
 import subprocess
+import sys
 import threading
+import time
+import traceback
 from shutil import copyfileobj
-from typing import BinaryIO, cast
+from typing import BinaryIO, List, Optional, Union, cast
 
 from django import db
+from django.core.management import call_command
 
 from ._times import utc_now
-from .enums import LogEntryKind
+from .enums import CommandType, LogEntryKind
+from .log_partitions import ensure_partition
 from .models import JobRun, JobRunLogEntry
 
+#: Maximum time (in seconds) that the output of a job is kept in the
+#: log buffer before it is saved to the database
+LOG_FLUSH_INTERVAL = 1.0
 
-def execute_job_run(job_run: JobRun) -> None:
-    command = job_run.job.get_command_line()
-    pipe = subprocess.Popen(
-        command,
-        bufsize=0,  # unbuffered
-        stdin=subprocess.DEVNULL,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-    )
+#: Maximum number of log entries kept in the log buffer
+LOG_BUFFER_SIZE = 1000
+
+#: Time (in seconds) between the checks whether a forked management
+#: command has exited
+PROCESS_POLL_INTERVAL = 0.05
+
+
+def execute_job_run(job_run: JobRun, in_process: bool = False) -> None:
+    """
+    Execute a job run and log its output to the database.
+
+    :param in_process:
+      Run a Django management command in a process forked from this
+      process instead of starting a new Django process for it
+    """
+    job = job_run.job
+    pipe: Union["subprocess.Popen[bytes]", ManagementCommandProcess]
+    if in_process and job.command.type == CommandType.DJANGO_MANAGE:
+        pipe = ManagementCommandProcess(
+            job.command.name, job.command.format_arguments(job.arguments)
+        )
+    else:
+        pipe = subprocess.Popen(
+            job.get_command_line(),
+            bufsize=0,  # unbuffered
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
 
     job_run.pid = pipe.pid
-    job_run.save(update_fields=["pid"])
+    job_run.hostname = socket.gethostname()
+    job_run.save(update_fields=["pid", "hostname"])
 
     stdout_collector_thread = OutputCollectorThread(
         job_run, LogEntryKind.STDOUT, cast(BinaryIO, pipe.stdout)
@@ -32,7 +64,18 @@ def execute_job_run(job_run: JobRun) -> None:
     stdout_collector_thread.start()
     stderr_collector_thread.start()
 
-    pipe.wait()
+    log_writers = [
+        stdout_collector_thread.log_writer,
+        stderr_collector_thread.log_writer,
+    ]
+    while True:
+        try:
+            pipe.wait(timeout=LOG_FLUSH_INTERVAL)
+            break
+        except subprocess.TimeoutExpired:
+            # Save the output of a job that writes only now and then
+            for log_writer in log_writers:
+                log_writer.flush_if_due()
 
     job_run.stopped_at = utc_now()
     job_run.exit_code = pipe.returncode
@@ -42,6 +85,80 @@ def execute_job_run(job_run: JobRun) -> None:
     stderr_collector_thread.join()
 
 
+class ManagementCommandProcess:
+    """
+    Django management command running in a forked process.
+
+    Has the parts of the subprocess.Popen interface which are used by
+    execute_job_run.  The output of the command is readable from the
+    stdout and stderr pipes.
+    """
+
+    def __init__(self, name: str, args: List[str]) -> None:
+        self.args = [name] + args
+        (stdout_read_fd, stdout_write_fd) = os.pipe()
+        (stderr_read_fd, stderr_write_fd) = os.pipe()
+
+        # The forked process must not share the database connections
+        db.connections.close_all()
+
+        self.pid = os.fork()
+        if self.pid == 0:  # In the child process
+            exit_code = 1
+            try:
+                os.close(stdout_read_fd)
+                os.close(stderr_read_fd)
+                devnull_fd = os.open(os.devnull, os.O_RDONLY)
+                os.dup2(devnull_fd, sys.stdin.fileno())
+                os.dup2(stdout_write_fd, sys.stdout.fileno())
+                os.dup2(stderr_write_fd, sys.stderr.fileno())
+                exit_code = _call_management_command(name, args)
+            finally:
+                # Never return to the code of the parent process
+                os._exit(exit_code)
+
+        os.close(stdout_write_fd)
+        os.close(stderr_write_fd)
+        self.stdout = os.fdopen(stdout_read_fd, "rb", buffering=0)
+        self.stderr = os.fdopen(stderr_read_fd, "rb", buffering=0)
+        self.returncode: Optional[int] = None
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.returncode is None:
+            (pid, status) = os.waitpid(self.pid, os.WNOHANG)
+            if pid:
+                if os.WIFSIGNALED(status):
+                    self.returncode = -os.WTERMSIG(status)
+                else:
+                    self.returncode = os.WEXITSTATUS(status)
+            elif deadline is not None and time.monotonic() >= deadline:
+                raise subprocess.TimeoutExpired(self.args, cast(float, timeout))
+            else:
+                time.sleep(PROCESS_POLL_INTERVAL)
+        return self.returncode
+
+
+def _call_management_command(name: str, args: List[str]) -> int:
+    exit_code = 0
+    try:
+        call_command(name, *args)
+    except SystemExit as error:
+        if error.code is None or isinstance(error.code, int):
+            exit_code = error.code or 0
+        else:
+            sys.stderr.write(f"{error.code}\n")
+            exit_code = 1
+    except BaseException:
+        traceback.print_exc()
+        exit_code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        db.connections.close_all()
+    return exit_code
+
+
 class OutputCollectorThread(threading.Thread):
     def __init__(self, job_run: JobRun, kind: LogEntryKind, stream: BinaryIO) -> None:
         self.log_writer = LogWriter(job_run, kind)
@@ -53,41 +170,91 @@ class OutputCollectorThread(threading.Thread):
         try:
             copyfileobj(self.stream, self.log_writer, self._chunk_size)
         finally:
+            self.log_writer.flush()
+
             # Close the database connection to free up resources.  See
             # the comments from JobRunnerAndFollower.run.
             db.connection.close()
 
 
 class LogWriter:
-    def __init__(self, job_run: JobRun, kind: LogEntryKind) -> None:
+    """
+    Writer that stores the written output as log entries of a job run.
+
+    The entries are buffered and saved with bulk_create when the buffer
+    is full, when the buffer is older than the flush interval or when
+    flush is called.
+    """
+
+    def __init__(
+        self,
+        job_run: JobRun,
+        kind: LogEntryKind,
+        buffer_size: int = LOG_BUFFER_SIZE,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+    ) -> None:
         self.job_run = job_run
         self.kind = kind
         self.coding = "utf-8"
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
         self._line_number = 1
         self._number_within_line = 1
+        self._buffer: List[JobRunLogEntry] = []
+        self._buffered_since: Optional[float] = None
+        self._lock = threading.Lock()
+        ensure_partition(job_run.started_at)
 
     def write(self, data: bytes) -> int:
         timestamp = utc_now()
         text = data.decode(self.coding, errors="replace")
 
-        # Split the text to lines and store each in a separate record
-        for line in text.splitlines(keepends=True):
-            JobRunLogEntry.objects.create(
-                run=self.job_run,
-                kind=self.kind.value,
-                line_number=self._line_number,
-                number=self._number_within_line,
-                time=timestamp,
-                text=line,
-            )
-            if line.endswith(_line_end_characters):
-                self._line_number += 1
-                self._number_within_line = 1
-            else:
-                self._number_within_line += 1
+        with self._lock:
+            if self._buffered_since is None:
+                self._buffered_since = time.monotonic()
+
+            # Split the text to lines and store each in a separate record
+            for line in text.splitlines(keepends=True):
+                self._buffer.append(
+                    JobRunLogEntry(
+                        run=self.job_run,
+                        kind=self.kind.value,
+                        line_number=self._line_number,
+                        number=self._number_within_line,
+                        time=timestamp,
+                        text=line,
+                        run_started_at=self.job_run.started_at,
+                    )
+                )
+                if line.endswith(_line_end_characters):
+                    self._line_number += 1
+                    self._number_within_line = 1
+                else:
+                    self._number_within_line += 1
+
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+        else:
+            self.flush_if_due()
 
         return len(data)
 
+    def flush_if_due(self) -> None:
+        buffered_since = self._buffered_since
+        if buffered_since is not None and (
+            time.monotonic() - buffered_since >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._buffer:
+                JobRunLogEntry.objects.bulk_create(
+                    self._buffer, batch_size=self.buffer_size
+                )
+            self._buffer = []
+            self._buffered_since = None
+
 
 _line_end_characters = (  # Note: Must be tuple for str.endswith
     "\n",  # Line Feed
@@ -0,0 +1,152 @@
+"""
+Monthly partitions of the job run log entries.
+
+The log entry table is partitioned by the start time of the run of the
+entries, one partition per month (in UTC).  All entries of a run are in
+the same partition, so the logs of old runs can be removed by dropping
+whole partitions instead of deleting the rows one by one.
+"""
+import gzip
+import os
+import re
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from django.db import DatabaseError, connection, transaction
+
+from .models import JobRun, JobRunLogEntry
+
+_PARTITION_NAME_SUFFIX_FORMAT = "_y{year:04d}m{month:02d}"
+_PARTITION_NAME_SUFFIX_RE = re.compile(r"_y(?P<year>\d{4})m(?P<month>\d{2})$")
+
+
+def get_month_start(dt: datetime) -> datetime:
+    dt = dt.astimezone(timezone.utc)
+    return datetime(dt.year, dt.month, 1, tzinfo=timezone.utc)
+
+
+def get_next_month_start(month_start: datetime) -> datetime:
+    if month_start.month == 12:
+        return month_start.replace(year=month_start.year + 1, month=1)
+    return month_start.replace(month=month_start.month + 1)
+
+
+def get_partition_name(month_start: datetime) -> str:
+    return JobRunLogEntry._meta.db_table + _PARTITION_NAME_SUFFIX_FORMAT.format(
+        year=month_start.year, month=month_start.month
+    )
+
+
+def _partition_exists(name: str) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [name])
+        return cursor.fetchone()[0] is not None
+
+
+def ensure_partition(run_started_at: datetime) -> str:
+    """
+    Create the partition for the log entries of a run if it's missing.
+
+    :return: Name of the partition.
+    """
+    month_start = get_month_start(run_started_at)
+    name = get_partition_name(month_start)
+
+    if _partition_exists(name):
+        return name
+
+    quoted_name = connection.ops.quote_name(name)
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            # PostgreSQL 10 doesn't support keys or indexes in the
+            # partitioned table, so they are created to each partition
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} ("
+                "PRIMARY KEY (id), "
+                "FOREIGN KEY (run_id) REFERENCES {run_table} (id) "
+                "DEFERRABLE INITIALLY DEFERRED"
+                ") FOR VALUES FROM (%s) TO (%s)".format(
+                    name=quoted_name,
+                    table=connection.ops.quote_name(JobRunLogEntry._meta.db_table),
+                    run_table=connection.ops.quote_name(JobRun._meta.db_table),
+                ),
+                # The bounds must be literals in PostgreSQL 10
+                [
+                    month_start.isoformat(),
+                    get_next_month_start(month_start).isoformat(),
+                ],
+            )
+            for column in ["run_id", "time"]:
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS {index} ON {name} ({column})".format(
+                        index=connection.ops.quote_name(f"{name}_{column}"),
+                        name=quoted_name,
+                        column=column,
+                    )
+                )
+    except DatabaseError:
+        # Another process may have created it at the same time
+        if not _partition_exists(name):
+            raise
+
+    return name
+
+
+def get_partitions() -> List[Tuple[str, datetime]]:
+    """
+    Get the existing partitions ordered by month.
+
+    :return: List of (partition name, month start) pairs.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+            "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+            "WHERE parent.relname = %s",
+            [JobRunLogEntry._meta.db_table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = _PARTITION_NAME_SUFFIX_RE.search(name)
+        if match:
+            month_start = datetime(
+                int(match.group("year")),
+                int(match.group("month")),
+                1,
+                tzinfo=timezone.utc,
+            )
+            partitions.append((name, month_start))
+
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def archive_partition(name: str, archive_dir: str) -> str:
+    """
+    Export the log entries of a partition to a gzipped CSV file.
+
+    :return: Path of the archive file.
+    """
+    path = os.path.join(archive_dir, "{}.csv.gz".format(name))
+
+    with gzip.open(path, "wb") as archive_file, connection.cursor() as cursor:
+        cursor.copy_expert(
+            "COPY (SELECT * FROM {} ORDER BY id) TO STDOUT "
+            "WITH (FORMAT csv, HEADER)".format(connection.ops.quote_name(name)),
+            archive_file,
+        )
+
+    return path
+
+
+def drop_partition(name: str, archive_dir: Optional[str] = None) -> None:
+    """
+    Drop a partition, optionally archiving its log entries first.
+    """
+    if archive_dir:
+        archive_partition(name, archive_dir)
+
+    with connection.cursor() as cursor:
+        cursor.execute("DROP TABLE {}".format(connection.ops.quote_name(name)))
@@ -1,3 +1,4 @@
+import argparse
 from typing import Any
 
 from django.core.management.base import BaseCommand
@@ -8,5 +9,14 @@ from ...scheduler import run_scheduler_loop
 class Command(BaseCommand):
     help = "Batch Run Scheduler"
 
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "--fork-server",
+            action="store_true",
+            help="Launch the jobs from a warm fork server, which runs the "
+            "management commands without starting a new Django process",
+        )
+
     def handle(self, *args: Any, **options: Any) -> None:
-        run_scheduler_loop()
+        run_scheduler_loop(use_fork_server=options["fork_server"])
@@ -3,19 +3,31 @@ from typing import Any
 
 from dateutil.relativedelta import relativedelta
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from safedelete import HARD_DELETE  # type: ignore
 
+from ...log_partitions import drop_partition, get_month_start, get_partitions
 from ...models import JobRun
 
 
 class Command(BaseCommand):
-    help = "JobRunLogEntry cleaner"
+    help = (
+        "JobRunLogEntry cleaner. Drops the monthly log partitions which are "
+        "older than the retention period and deletes their job runs."
+    )
 
     @classmethod
     def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
         parser.add_argument("retain_n_days", type=int, nargs="?", default=7)
+        parser.add_argument(
+            "--archive-dir",
+            help="Export the log entries to gzipped CSV files to this directory "
+            "before dropping them",
+        )
 
     def handle(self, *args: Any, **options: Any) -> None:
         retain_n_days = options["retain_n_days"]
+        archive_dir = options["archive_dir"]
 
         latest_run = JobRun.objects.last()
         if not latest_run:
@@ -23,16 +35,25 @@ class Command(BaseCommand):
             return
 
         retain_from = latest_run.started_at - relativedelta(days=retain_n_days)
-        retain_from = retain_from.replace(hour=0, minute=0, second=0, microsecond=0)
-        runs_before_cutoff = JobRun.objects.filter(started_at__lt=retain_from)
+        # Only whole partitions are dropped, so the logs are kept from
+        # the beginning of the month of the retention limit
+        cutoff = get_month_start(retain_from)
+        # Including the runs which are soft deleted by an earlier version
+        runs = JobRun.objects.all_with_deleted()  # type: ignore
+        runs_before_cutoff = runs.filter(started_at__lt=cutoff)
         self.stdout.write(
             "Latest run started {}, sparing logs from jobs started after {}. JobRuns to delete {}, total {}".format(
-                latest_run.started_at,
-                retain_from,
-                runs_before_cutoff.count(),
-                JobRun.objects.count(),
+                latest_run.started_at, cutoff, runs_before_cutoff.count(), runs.count(),
             )
         )
-        runs_before_cutoff.delete()
+
+        for (name, month_start) in get_partitions():
+            if month_start >= cutoff:
+                break
+            self.stdout.write("Dropping log partition {}".format(name))
+            with transaction.atomic():
+                drop_partition(name, archive_dir)
+
+        runs_before_cutoff.delete(force_policy=HARD_DELETE)
 
         self.stdout.write("Done!")
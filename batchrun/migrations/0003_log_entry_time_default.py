@@ -0,0 +1,30 @@
+# Generated by Django 2.2.13 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+import batchrun._times
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("batchrun", "0002_add_safedelete_to_logs"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="jobrunlogentry",
+            options={
+                "ordering": ["run__started_at", "run", "time", "id"],
+                "verbose_name": "log entry of a job run",
+                "verbose_name_plural": "log entries of job runs",
+            },
+        ),
+        migrations.AlterField(
+            model_name="jobrunlogentry",
+            name="time",
+            field=models.DateTimeField(
+                db_index=True, default=batchrun._times.utc_now, verbose_name="time"
+            ),
+        ),
+    ]
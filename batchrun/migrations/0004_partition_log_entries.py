@@ -0,0 +1,182 @@
+# Generated by Django 2.2.13 on 2026-10-18 15:20
+
+import django.db.models.deletion
+from dateutil.relativedelta import relativedelta
+from django.db import migrations, models, transaction
+
+import batchrun._times
+
+#: Number of log entries copied to the partitioned table in one transaction
+COPY_BATCH_SIZE = 100000
+
+PARTITIONED_TABLE_SQL = """
+CREATE TABLE batchrun_jobrunlogentry (
+    id integer NOT NULL DEFAULT nextval('batchrun_jobrunlogentry_id_seq'),
+    kind varchar(30) NOT NULL,
+    line_number integer NOT NULL,
+    number integer NOT NULL,
+    time timestamp with time zone NOT NULL,
+    text text NOT NULL,
+    run_id integer NOT NULL,
+    deleted timestamp with time zone NULL,
+    run_started_at timestamp with time zone NOT NULL
+) PARTITION BY RANGE (run_started_at)
+"""
+
+# PostgreSQL 10 doesn't support keys or indexes in the partitioned table,
+# so they are created to each partition
+PARTITION_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS {name} PARTITION OF batchrun_jobrunlogentry (
+        PRIMARY KEY (id),
+        FOREIGN KEY (run_id) REFERENCES batchrun_jobrun (id)
+            DEFERRABLE INITIALLY DEFERRED
+    ) FOR VALUES FROM (%(start)s) TO (%(end)s)
+    """,
+    "CREATE INDEX IF NOT EXISTS {name}_run_id ON {name} (run_id)",
+    "CREATE INDEX IF NOT EXISTS {name}_time ON {name} (time)",
+]
+
+COPY_SQL = """
+INSERT INTO batchrun_jobrunlogentry
+(id, kind, line_number, number, time, text, run_id, deleted, run_started_at)
+SELECT entry.id, entry.kind, entry.line_number, entry.number, entry.time,
+    entry.text, entry.run_id, entry.deleted, run.started_at
+FROM batchrun_jobrunlogentry_old entry
+JOIN batchrun_jobrun run ON run.id = entry.run_id
+WHERE entry.id > %s AND entry.id <= %s
+"""
+
+
+def partition_log_entries(apps, schema_editor):
+    """
+    Replace the log entry table with a table partitioned by month.
+
+    The partitions are created with the same names and bounds as the
+    batchrun.log_partitions module creates them.
+
+    The entries are copied in batches, each in its own transaction, so
+    that a large log table isn't copied in one long transaction.  If the
+    migration is interrupted, running it again continues the copying
+    from where it was left.
+    """
+    connection = schema_editor.connection
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT to_regclass('batchrun_jobrunlogentry_old'), "
+            "(SELECT relkind FROM pg_class WHERE relname = 'batchrun_jobrunlogentry')"
+        )
+        (old_table, relkind) = cursor.fetchone()
+        if old_table is None:
+            if relkind == "p":
+                # Already partitioned and copied
+                return
+
+            cursor.execute(
+                "ALTER TABLE batchrun_jobrunlogentry "
+                "RENAME TO batchrun_jobrunlogentry_old"
+            )
+            cursor.execute(
+                "ALTER SEQUENCE batchrun_jobrunlogentry_id_seq OWNED BY NONE"
+            )
+            cursor.execute(PARTITIONED_TABLE_SQL)
+
+        _create_partitions(cursor)
+
+    with connection.cursor() as cursor:
+        # The new entries written during the copying have larger ids than
+        # the old entries, so they are left out of the resumed position
+        cursor.execute(
+            "SELECT coalesce(max(id), 0) FROM batchrun_jobrunlogentry "
+            "WHERE id <= (SELECT max(id) FROM batchrun_jobrunlogentry_old)"
+        )
+        (copied_id,) = cursor.fetchone()
+
+    while True:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT max(id) FROM ("
+                "SELECT id FROM batchrun_jobrunlogentry_old "
+                "WHERE id > %s ORDER BY id LIMIT %s"
+                ") batch",
+                [copied_id, COPY_BATCH_SIZE],
+            )
+            (last_id,) = cursor.fetchone()
+            if last_id is None:
+                break
+
+            cursor.execute(COPY_SQL, [copied_id, last_id])
+            copied_id = last_id
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute("DROP TABLE batchrun_jobrunlogentry_old")
+        cursor.execute(
+            "ALTER SEQUENCE batchrun_jobrunlogentry_id_seq "
+            "OWNED BY batchrun_jobrunlogentry.id"
+        )
+
+
+def _create_partitions(cursor):
+    cursor.execute(
+        "SELECT DISTINCT date_trunc('month', run.started_at AT TIME ZONE 'UTC') "
+        "FROM batchrun_jobrunlogentry_old entry "
+        "JOIN batchrun_jobrun run ON run.id = entry.run_id"
+    )
+    for (month_start,) in cursor.fetchall():
+        name = "batchrun_jobrunlogentry_y{:04d}m{:02d}".format(
+            month_start.year, month_start.month
+        )
+        # The bounds must be literals in PostgreSQL 10
+        bounds = {
+            "start": month_start.strftime("%Y-%m-%d 00:00:00+00"),
+            "end": (month_start + relativedelta(months=1)).strftime(
+                "%Y-%m-%d 00:00:00+00"
+            ),
+        }
+        for sql in PARTITION_SQL:
+            cursor.execute(sql.format(name=name), bounds)
+
+
+class Migration(migrations.Migration):
+
+    # The log entries are copied in several transactions
+    atomic = False
+
+    dependencies = [
+        ("batchrun", "0003_log_entry_time_default"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name="jobrunlogentry",
+                    name="run_started_at",
+                    field=models.DateTimeField(
+                        editable=False, verbose_name="run start time"
+                    ),
+                ),
+                # The indexes are created to each partition
+                migrations.AlterField(
+                    model_name="jobrunlogentry",
+                    name="run",
+                    field=models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="log_entries",
+                        to="batchrun.JobRun",
+                        verbose_name="run",
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="jobrunlogentry",
+                    name="time",
+                    field=models.DateTimeField(
+                        default=batchrun._times.utc_now, verbose_name="time"
+                    ),
+                ),
+            ],
+            database_operations=[migrations.RunPython(partition_log_entries)],
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.13 on 2026-10-18 16:05
+
+from django.db import migrations
+
+CREATE_TRIGGERS_SQL = """
+CREATE FUNCTION batchrun_notify_scheduler() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('batchrun_scheduler', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER batchrun_jobrunqueueitem_notify_scheduler
+    AFTER INSERT ON batchrun_jobrunqueueitem
+    FOR EACH STATEMENT EXECUTE PROCEDURE batchrun_notify_scheduler();
+
+CREATE TRIGGER batchrun_scheduledjob_notify_scheduler
+    AFTER INSERT OR UPDATE ON batchrun_scheduledjob
+    FOR EACH STATEMENT EXECUTE PROCEDURE batchrun_notify_scheduler();
+"""
+
+DROP_TRIGGERS_SQL = """
+DROP TRIGGER batchrun_scheduledjob_notify_scheduler ON batchrun_scheduledjob;
+DROP TRIGGER batchrun_jobrunqueueitem_notify_scheduler ON batchrun_jobrunqueueitem;
+DROP FUNCTION batchrun_notify_scheduler();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("batchrun", "0004_partition_log_entries"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGGERS_SQL, DROP_TRIGGERS_SQL),
+    ]
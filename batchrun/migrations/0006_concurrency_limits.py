@@ -0,0 +1,90 @@
+# Generated by Django 2.2.13 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+# The scheduler is woken up when a job run stops, so that it can launch
+# the job runs which were held back by it
+CREATE_TRIGGER_SQL = """
+CREATE TRIGGER batchrun_jobrun_notify_scheduler
+    AFTER UPDATE OF stopped_at ON batchrun_jobrun
+    FOR EACH STATEMENT EXECUTE PROCEDURE batchrun_notify_scheduler();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER batchrun_jobrun_notify_scheduler ON batchrun_jobrun;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("batchrun", "0005_scheduler_notifications"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="exclusion_group",
+            field=models.CharField(
+                blank=True,
+                help_text=(
+                    "Jobs in the same exclusion group are never run at the same "
+                    "time. E.g. jobs that put a heavy load on the database can be "
+                    "put in the same group."
+                ),
+                max_length=200,
+                verbose_name="exclusion group",
+            ),
+        ),
+        migrations.AddField(
+            model_name="job",
+            name="max_concurrent_runs",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text=(
+                    "Maximum number of runs of this job that may run at the same "
+                    "time. Leave empty for no limit."
+                ),
+                null=True,
+                verbose_name="maximum number of concurrent runs",
+            ),
+        ),
+        migrations.AddField(
+            model_name="job",
+            name="priority",
+            field=models.IntegerField(
+                default=0,
+                help_text=(
+                    "Jobs with a higher priority are run first when several jobs "
+                    "are due at the same time."
+                ),
+                verbose_name="priority",
+            ),
+        ),
+        migrations.AddField(
+            model_name="jobrun",
+            name="wait_time",
+            field=models.DurationField(
+                blank=True,
+                help_text=(
+                    "Time from the scheduled run time to the start of the run, "
+                    "e.g. when the run was held back by the concurrency limits"
+                ),
+                null=True,
+                verbose_name="wait time",
+            ),
+        ),
+        migrations.AddField(
+            model_name="jobrunqueueitem",
+            name="held_back_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text=(
+                    "Time when the run was first held back by the concurrency limits"
+                ),
+                null=True,
+                verbose_name="hold back time",
+            ),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER_SQL, DROP_TRIGGER_SQL),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.13 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("batchrun", "0006_concurrency_limits"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobrun",
+            name="hostname",
+            field=models.CharField(
+                blank=True,
+                help_text=(
+                    "Name of the host where the process of the job run is/was running"
+                ),
+                max_length=255,
+                verbose_name="hostname",
+            ),
+        ),
+    ]
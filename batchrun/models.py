@@ -82,11 +82,13 @@ class Command(SafeDeleteModel):
             base_command = [sys.executable, get_django_manage_py(), self.name]
         else:
             raise ValueError("Unknown command type: {}".format(self.type))
-        formatted_args = [
+        return base_command + self.format_arguments(arguments)
+
+    def format_arguments(self, arguments: Dict[str, Any]) -> List[str]:
+        return [
             param_template.format(arguments)
             for param_template in shlex.split(self.parameter_format_string)
         ]
-        return base_command + formatted_args
 
 
 class Job(TimeStampedSafeDeleteModel):
@@ -121,6 +123,34 @@ class Job(TimeStampedSafeDeleteModel):
         ),
     )
 
+    priority = models.IntegerField(
+        default=0,
+        verbose_name=_("priority"),
+        help_text=_(
+            "Jobs with a higher priority are run first when several jobs "
+            "are due at the same time."
+        ),
+    )
+    max_concurrent_runs = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("maximum number of concurrent runs"),
+        help_text=_(
+            "Maximum number of runs of this job that may run at the same "
+            "time. Leave empty for no limit."
+        ),
+    )
+    exclusion_group = models.CharField(
+        max_length=200,
+        blank=True,
+        verbose_name=_("exclusion group"),
+        help_text=_(
+            "Jobs in the same exclusion group are never run at the same "
+            "time. E.g. jobs that put a heavy load on the database can be "
+            "put in the same group."
+        ),
+    )
+
     class Meta:
         verbose_name = _("job")
         verbose_name_plural = _("jobs")
@@ -247,8 +277,19 @@ class ScheduledJob(TimeStampedSafeDeleteModel):
                 item = items.get_or_create(run_at=time, scheduled_job=self)[0]
                 fresh_ids.append(item.pk)
 
-        # Delete old items
-        items.exclude(pk__in=fresh_ids).delete()
+        # Delete old items.  The first held back item of an enabled job
+        # is kept, since it is run late instead of being dropped.  The
+        # later held back runs are run with it, not each on its own.
+        old_items = items.exclude(pk__in=fresh_ids)
+        if self.enabled:
+            held_back_item = (
+                old_items.filter(assigned_at=None, held_back_at__isnull=False)
+                .order_by("run_at")
+                .first()
+            )
+            if held_back_item:
+                old_items = old_items.exclude(pk=held_back_item.pk)
+        old_items.delete()
 
 
 class JobRun(SafeDeleteModel):
@@ -267,6 +308,12 @@ class JobRun(SafeDeleteModel):
             "Records the process id of the process, " "which is/was executing this job"
         ),
     )
+    hostname = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_("hostname"),
+        help_text=_("Name of the host where the process of the job run is/was running"),
+    )
     started_at = models.DateTimeField(
         auto_now_add=True, db_index=True, verbose_name=_("start time")
     )
@@ -274,6 +321,15 @@ class JobRun(SafeDeleteModel):
         null=True, blank=True, verbose_name=_("stop time")
     )
     exit_code = models.IntegerField(null=True, blank=True, verbose_name=_("exit code"))
+    wait_time = models.DurationField(
+        null=True,
+        blank=True,
+        verbose_name=_("wait time"),
+        help_text=_(
+            "Time from the scheduled run time to the start of the run, "
+            "e.g. when the run was held back by the concurrency limits"
+        ),
+    )
 
     class Meta:
         verbose_name = _("job run")
@@ -292,24 +348,35 @@ class JobRunLogEntry(SafeDeleteModel):
     entry generally stores a line of output from either stdout or stderr
     stream.  The source stream is stored into the "kind" field.
     Additionally a creation timestamp is recorded to the "time" field.
+
+    The entries are stored in monthly partitions by the start time of
+    their run, so that the old logs can be removed by dropping whole
+    partitions.
     """
 
+    # The indexes of the run and the time are created to each partition
+    # instead of the partitioned table, see the log_partitions module.
     run = models.ForeignKey(
         JobRun,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name="log_entries",
         verbose_name=_("run"),
     )
     kind = EnumField(LogEntryKind, max_length=30, verbose_name=_("kind"))
     line_number = models.IntegerField(verbose_name=_("line number"))
     number = models.IntegerField(verbose_name=_("number"))  # within line
-    time = models.DateTimeField(
-        auto_now_add=True, db_index=True, verbose_name=_("time")
-    )
+    time = models.DateTimeField(default=utc_now, verbose_name=_("time"))
     text = models.TextField(null=False, blank=True, verbose_name=_("text"))
 
+    # Copy of the start time of the run.  The table is partitioned by
+    # this, see the log_partitions module.
+    run_started_at = models.DateTimeField(
+        editable=False, verbose_name=_("run start time")
+    )
+
     class Meta:
-        ordering = ["run__started_at", "run", "time"]
+        ordering = ["run__started_at", "run", "time", "id"]
         verbose_name = _("log entry of a job run")
         verbose_name_plural = _("log entries of job runs")
 
@@ -332,7 +399,15 @@ class JobRunQueueItemQuerySet(BaseQueryset):
     def remove_old_items(self, limit: Optional[datetime] = None) -> None:
         if limit is None:
             limit = utc_now() - GRACE_PERIOD_LENGTH
-        self.filter(run_at__lt=limit).delete()
+        # The first held back item of each scheduled job is run late
+        # instead of being dropped
+        held_back_item_ids = list(
+            self.filter(assigned_at=None, held_back_at__isnull=False)
+            .order_by("scheduled_job", "run_at")
+            .distinct("scheduled_job")
+            .values_list("pk", flat=True)
+        )
+        self.filter(run_at__lt=limit).exclude(pk__in=held_back_item_ids).delete()
 
     def refresh(self) -> None:
         self.remove_old_items()
@@ -357,6 +432,12 @@ class JobRunQueueItem(models.Model):
     assignee_pid = models.IntegerField(
         null=True, blank=True, verbose_name=_("assignee process id (PID)")
     )
+    held_back_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("hold back time"),
+        help_text=_("Time when the run was first held back by the concurrency limits"),
+    )
 
     objects = JobRunQueueItemQuerySet.as_manager()
 
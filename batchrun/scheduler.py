@@ -1,17 +1,44 @@
 import os
+import select
+import socket
 import time
-from typing import NoReturn
+from datetime import datetime, timezone
+from typing import List, NoReturn, Optional, Sequence
 
-from django.db import transaction
+from django.db import connection, models, transaction
 
 from ._times import utc_now
-from .job_launching import run_job
-from .models import JobRunQueueItem
+from .constants import (
+    HELD_BACK_CHECK_INTERVAL,
+    LAUNCH_TIMEOUT_LENGTH,
+    LOST_JOB_RUN_EXIT_CODE,
+)
+from .job_launching import JobRunForkServer, run_job
+from .models import Job, JobRun, JobRunQueueItem
+from .utils import get_max_concurrent_runs
 
-POLL_INTERVAL = 10.0  # seconds
+#: Name of the PostgreSQL notification channel which wakes up the
+#: scheduler.  Notifications are sent by database triggers when job run
+#: queue items are inserted, scheduled jobs are saved or job runs stop.
+NOTIFICATION_CHANNEL = "batchrun_scheduler"
 
 
-def run_scheduler_loop() -> NoReturn:
+def run_scheduler_loop(use_fork_server: bool = False) -> NoReturn:
+    """
+    Run the scheduled jobs when they are due.
+
+    :param use_fork_server:
+      Launch the jobs with a warm fork server instead of starting new
+      Django processes for them, see `job_launching.JobRunForkServer`
+    """
+    fork_server: Optional[JobRunForkServer] = None
+    if use_fork_server:
+        # Started before the LISTEN, which opens a database connection
+        fork_server = JobRunForkServer()
+        fork_server.start()
+
+    listen_for_notifications()
+
     # Make sure that the job run queue is up to date
     JobRunQueueItem.objects.refresh()  # type: ignore
 
@@ -19,25 +46,32 @@ def run_scheduler_loop() -> NoReturn:
     queue_items = JobRunQueueItem.objects.to_run().order_by("run_at")  # type: ignore
 
     while True:
-        first_item = queue_items.first()
-        if not first_item:
-            # Nothing in the queue, check again after poll interval
-            time.sleep(POLL_INTERVAL)
-            continue
+        # The changes made before this are seen by the queries below
+        clear_notifications()
 
-        secs_to_first = (first_item.run_at - utc_now()).total_seconds()
+        now = utc_now()
+        due_items = list(
+            queue_items.filter(run_at__lte=now)
+            .select_related("scheduled_job__job")
+            .order_by("-scheduled_job__job__priority", "run_at")
+        )
+        item = get_runnable_item(due_items)
 
-        if secs_to_first > POLL_INTERVAL:
-            # Let's check the queue again after poll interval, since a
-            # new first item could be added mean while
-            time.sleep(POLL_INTERVAL)
-            continue
+        # The due items before the runnable one are held back by the
+        # concurrency limits.  Mark them so that they are not dropped.
+        held_back_items = due_items[: due_items.index(item)] if item else due_items
+        if held_back_items:
+            queue_items.filter(
+                pk__in=[x.pk for x in held_back_items], held_back_at=None
+            ).update(held_back_at=now)
 
-        time.sleep(max(secs_to_first, 0.0))
+        if not item:
+            wait_for_notification(get_wait_timeout(queue_items, held_back_items))
+            continue
 
         with transaction.atomic():
             locked_item = (
-                queue_items.filter(pk=first_item.pk)
+                queue_items.filter(pk=item.pk)
                 .select_for_update(skip_locked=True)
                 .first()
             )
@@ -51,7 +85,168 @@ def run_scheduler_loop() -> NoReturn:
             locked_item.assignee_pid = os.getpid()
             locked_item.save(update_fields=["assigned_at", "assignee_pid"])
 
-        run_job(first_item.scheduled_job.job)
+        run_job(item.scheduled_job.job, fork_server, scheduled_at=item.run_at)
 
-        first_item.scheduled_job.update_run_queue()
+        item.scheduled_job.update_run_queue()
         queue_items.remove_old_items()
+
+
+def get_runnable_item(
+    due_items: Sequence[JobRunQueueItem],
+) -> Optional[JobRunQueueItem]:
+    """
+    Get the first of the due items whose job may be run now.
+
+    The job of an item is held back if running it would exceed the
+    global or the job's limit of concurrent runs, or if a job in the same
+    exclusion group is running.  The items held back by the limits of
+    their job don't block the items after them.
+    """
+    if not due_items:
+        return None
+
+    running_jobs = get_running_jobs()
+    max_concurrent_runs = get_max_concurrent_runs()
+    if max_concurrent_runs is not None and len(running_jobs) >= max_concurrent_runs:
+        return None
+
+    for item in due_items:
+        job = item.scheduled_job.job
+        job_run_count = sum(1 for x in running_jobs if x.pk == job.pk)
+        if job.max_concurrent_runs is not None and (
+            job_run_count >= job.max_concurrent_runs
+        ):
+            continue
+        if job.exclusion_group and any(
+            x.exclusion_group == job.exclusion_group for x in running_jobs
+        ):
+            continue
+        return item
+
+    return None
+
+
+def get_running_jobs() -> List[Job]:
+    """
+    Get the jobs of the running job runs.
+
+    A job is listed once for each of its running job runs.  The job runs
+    that are found to have stopped without recording it are marked as
+    stopped, so that they aren't checked again.
+    """
+    job_runs = JobRun.objects.filter(stopped_at=None).select_related("job")
+    running_jobs = []
+    for job_run in job_runs:
+        if _is_running(job_run):
+            running_jobs.append(job_run.job)
+        else:
+            JobRun.objects.filter(pk=job_run.pk, stopped_at=None).update(
+                stopped_at=utc_now(), exit_code=LOST_JOB_RUN_EXIT_CODE
+            )
+    return running_jobs
+
+
+def _is_running(job_run: JobRun) -> bool:
+    if job_run.pid is None:
+        # The process hasn't been started yet
+        return job_run.started_at > utc_now() - LAUNCH_TIMEOUT_LENGTH
+
+    if job_run.hostname and job_run.hostname != socket.gethostname():
+        # The process can only be checked on its own host
+        return True
+
+    try:
+        os.kill(job_run.pid, 0)
+    except ProcessLookupError:
+        # The job run has crashed without recording its stopping
+        return False
+    except PermissionError:
+        pass
+
+    # A process started after the launch timeout has reused the PID of a
+    # crashed job run
+    start_time = _get_process_start_time(job_run.pid)
+    return start_time is None or (
+        start_time <= job_run.started_at + LAUNCH_TIMEOUT_LENGTH
+    )
+
+
+def _get_process_start_time(pid: int) -> Optional[datetime]:
+    """
+    Get the start time of a process from the Linux proc file system.
+
+    :return: The start time, or None if it's not available
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as stat_file:
+            stat = stat_file.read()
+        with open("/proc/stat") as system_stat_file:
+            boot_time = next(
+                int(line.split()[1])
+                for line in system_stat_file
+                if line.startswith("btime ")
+            )
+    except (OSError, StopIteration):
+        return None
+
+    # The fields are counted from the end of the command name, since it
+    # may contain spaces.  The start time is the 22nd field.
+    start_ticks = int(stat[stat.rindex(")") + 2 :].split()[19])
+    return datetime.fromtimestamp(
+        boot_time + start_ticks / os.sysconf("SC_CLK_TCK"), timezone.utc
+    )
+
+
+def get_wait_timeout(
+    queue_items: "models.QuerySet[JobRunQueueItem]",
+    held_back_items: Sequence[JobRunQueueItem],
+) -> Optional[float]:
+    """
+    Get the time to wait for the next item to be due.
+
+    :return: Timeout in seconds, or None if there is nothing to wait for
+    """
+    timeout = HELD_BACK_CHECK_INTERVAL if held_back_items else None
+
+    next_item = queue_items.filter(run_at__gt=utc_now()).first()
+    if next_item:
+        secs_to_next = (next_item.run_at - utc_now()).total_seconds()
+        timeout = secs_to_next if timeout is None else min(timeout, secs_to_next)
+
+    return timeout
+
+
+def listen_for_notifications() -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(f"LISTEN {NOTIFICATION_CHANNEL}")
+
+
+def clear_notifications() -> None:
+    pg_connection = connection.connection
+    pg_connection.poll()
+    del pg_connection.notifies[:]
+
+
+def wait_for_notification(timeout: Optional[float] = None) -> bool:
+    """
+    Wait until a notification is received or the timeout expires.
+
+    Must be called outside of a transaction, since the notifications are
+    delivered between the transactions.
+
+    :param timeout: Maximum time to wait in seconds, or None to wait
+      without a time limit
+    :return: True if a notification was received
+    """
+    pg_connection = connection.connection
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    while not pg_connection.notifies:
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            return False
+        select.select([pg_connection], [], [], remaining)
+        pg_connection.poll()
+
+    del pg_connection.notifies[:]
+    return True
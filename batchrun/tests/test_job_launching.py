@@ -0,0 +1,19 @@
+from typing import Any
+
+from ..job_launching import JobRunForkServer
+from ..models import JobRun
+
+
+def test_fork_server_launch_fails_if_fork_server_is_not_running() -> None:
+    fork_server = JobRunForkServer()
+
+    assert not fork_server.launch(JobRun(pk=1))
+
+
+def test_fork_server_launch_fails_if_pipe_is_broken(monkeypatch: Any) -> None:
+    fork_server = JobRunForkServer()
+    # The fork server has died and closed its end of the pipe
+    fork_server._receiver.close()
+    monkeypatch.setattr(fork_server, "is_alive", lambda: True)
+
+    assert not fork_server.launch(JobRun(pk=1))
@@ -0,0 +1,82 @@
+import pytest
+
+from ..enums import CommandType, LogEntryKind
+from ..job_running import LogWriter, ManagementCommandProcess
+from ..models import Command, Job, JobRun, JobRunLogEntry
+
+
+@pytest.fixture
+def job_run() -> JobRun:
+    command = Command.objects.create(type=CommandType.EXECUTABLE, name="echo")
+    job = Job.objects.create(name="Echo", command=command)
+    return JobRun.objects.create(job=job)
+
+
+def get_entries(job_run: JobRun) -> list:
+    return list(
+        JobRunLogEntry.objects.filter(run=job_run).values_list(
+            "line_number", "number", "text"
+        )
+    )
+
+
+@pytest.mark.django_db
+def test_log_writer_buffers_entries(
+    job_run: JobRun, django_assert_num_queries: object
+) -> None:
+    log_writer = LogWriter(job_run, LogEntryKind.STDOUT, flush_interval=60)
+
+    with django_assert_num_queries(0):  # type: ignore
+        assert log_writer.write(b"first line\nsecond ") == 18
+        log_writer.write(b"line\nthird")
+        log_writer.write(b" line\r\n")
+
+    with django_assert_num_queries(1):  # type: ignore
+        log_writer.flush()
+
+    assert get_entries(job_run) == [
+        (1, 1, "first line\n"),
+        (2, 1, "second "),
+        (2, 2, "line\n"),
+        (3, 1, "third"),
+        (3, 2, " line\r\n"),
+    ]
+
+
+@pytest.mark.django_db
+def test_log_writer_flushes_full_buffer(job_run: JobRun) -> None:
+    log_writer = LogWriter(job_run, LogEntryKind.STDERR, buffer_size=3)
+
+    log_writer.write(b"1\n2\n")
+    assert get_entries(job_run) == []
+
+    log_writer.write(b"3\n4\n")
+    assert len(get_entries(job_run)) == 4
+
+
+@pytest.mark.django_db
+def test_log_writer_flushes_old_buffer(job_run: JobRun) -> None:
+    log_writer = LogWriter(job_run, LogEntryKind.STDOUT, flush_interval=0)
+
+    log_writer.write(b"line\n")
+
+    assert get_entries(job_run) == [(1, 1, "line\n")]
+
+
+def test_management_command_process() -> None:
+    process = ManagementCommandProcess("check", [])
+
+    output = process.stdout.read() + process.stderr.read()
+
+    assert process.wait() == 0
+    assert b"System check identified" in output
+
+
+def test_management_command_process_exit_code() -> None:
+    process = ManagementCommandProcess("no_such_command", [])
+
+    process.stdout.read()
+    error_output = process.stderr.read()
+
+    assert process.wait() == 1
+    assert b"Unknown command" in error_output
@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+
+import pytz
+
+from ..log_partitions import get_month_start, get_next_month_start, get_partition_name
+
+
+def test_get_month_start_uses_utc() -> None:
+    helsinki = pytz.timezone("Europe/Helsinki")
+    dt = helsinki.localize(datetime(2020, 3, 1, 1, 30))
+
+    assert get_month_start(dt) == datetime(2020, 2, 1, tzinfo=timezone.utc)
+
+
+def test_get_next_month_start() -> None:
+    assert get_next_month_start(datetime(2020, 11, 1, tzinfo=timezone.utc)) == datetime(
+        2020, 12, 1, tzinfo=timezone.utc
+    )
+    assert get_next_month_start(datetime(2020, 12, 1, tzinfo=timezone.utc)) == datetime(
+        2021, 1, 1, tzinfo=timezone.utc
+    )
+
+
+def test_get_partition_name() -> None:
+    month_start = datetime(2020, 2, 1, tzinfo=timezone.utc)
+
+    assert get_partition_name(month_start) == "batchrun_jobrunlogentry_y2020m02"
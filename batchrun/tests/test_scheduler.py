@@ -0,0 +1,161 @@
+import os
+import subprocess
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import pytest
+
+from .._times import utc_now
+from ..constants import LOST_JOB_RUN_EXIT_CODE
+from ..enums import CommandType
+from ..models import Command, Job, JobRun, JobRunQueueItem, ScheduledJob, Timezone
+from ..scheduler import (
+    clear_notifications,
+    get_runnable_item,
+    get_running_jobs,
+    listen_for_notifications,
+    wait_for_notification,
+)
+
+
+def create_job(name: str, **kwargs: Any) -> Job:
+    command = Command.objects.create(type=CommandType.EXECUTABLE, name="true")
+    return Job.objects.create(name=name, command=command, **kwargs)
+
+
+def queue_item(job: Job) -> JobRunQueueItem:
+    return JobRunQueueItem(scheduled_job=ScheduledJob(job=job))
+
+
+def start_run(job: Job) -> JobRun:
+    # Running in the test process, so that the process is alive
+    return JobRun.objects.create(job=job, pid=os.getpid())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_saving_scheduled_job_wakes_up_scheduler() -> None:
+    command = Command.objects.create(type=CommandType.EXECUTABLE, name="echo")
+    job = Job.objects.create(name="Echo", command=command)
+    timezone = Timezone.objects.create(name="Europe/Helsinki")
+    listen_for_notifications()
+    clear_notifications()
+
+    assert not wait_for_notification(timeout=0.1)
+
+    ScheduledJob.objects.create(job=job, timezone=timezone, minutes="0")
+
+    assert wait_for_notification(timeout=5)
+    assert not wait_for_notification(timeout=0.1)
+
+
+@pytest.mark.django_db
+def test_runnable_item_respects_job_limit() -> None:
+    limited_job = create_job("Limited", max_concurrent_runs=1, priority=1)
+    other_job = create_job("Other")
+    items = [queue_item(limited_job), queue_item(other_job)]
+
+    assert get_runnable_item(items) is items[0]
+
+    start_run(limited_job)
+
+    assert get_runnable_item(items) is items[1]
+
+
+@pytest.mark.django_db
+def test_runnable_item_respects_exclusion_group() -> None:
+    heavy_job = create_job("Heavy", exclusion_group="database")
+    other_heavy_job = create_job("Other heavy", exclusion_group="database")
+    items = [queue_item(other_heavy_job)]
+
+    run = start_run(heavy_job)
+
+    assert get_runnable_item(items) is None
+
+    run.stopped_at = run.started_at
+    run.save()
+
+    assert get_runnable_item(items) is items[0]
+
+
+@pytest.mark.django_db
+def test_runnable_item_respects_global_limit(settings: Any) -> None:
+    settings.BATCHRUN_MAX_CONCURRENT_RUNS = 1
+    job = create_job("Job")
+    items = [queue_item(job)]
+
+    assert get_runnable_item(items) is items[0]
+
+    start_run(job)
+
+    assert get_runnable_item(items) is None
+
+
+@pytest.mark.django_db
+def test_crashed_run_is_marked_stopped() -> None:
+    job = create_job("Job")
+    process = subprocess.Popen(["true"])
+    process.wait()
+    run = JobRun.objects.create(job=job, pid=process.pid)
+
+    assert get_running_jobs() == []
+
+    run.refresh_from_db()
+    assert run.stopped_at is not None
+    assert run.exit_code == LOST_JOB_RUN_EXIT_CODE
+
+
+@pytest.mark.django_db
+def test_run_with_reused_pid_is_marked_stopped() -> None:
+    job = create_job("Job")
+    run = start_run(job)
+    # The test process was started long after the run
+    JobRun.objects.filter(pk=run.pk).update(
+        started_at=datetime(2000, 1, 1, tzinfo=timezone.utc)
+    )
+
+    assert get_running_jobs() == []
+
+    run.refresh_from_db()
+    assert run.exit_code == LOST_JOB_RUN_EXIT_CODE
+
+
+@pytest.mark.django_db
+def test_run_on_other_host_is_running() -> None:
+    job = create_job("Job")
+    process = subprocess.Popen(["true"])
+    process.wait()
+    JobRun.objects.create(job=job, pid=process.pid, hostname="other-host")
+
+    assert get_running_jobs() == [job]
+
+
+@pytest.mark.django_db
+def test_held_back_runs_of_a_job_are_collapsed() -> None:
+    job = create_job("Job")
+    scheduled_job = ScheduledJob.objects.create(
+        job=job, timezone=Timezone.objects.create(name="UTC"), minutes="0"
+    )
+    now = utc_now()
+    held_back_items = [
+        JobRunQueueItem.objects.create(
+            scheduled_job=scheduled_job,
+            run_at=now - timedelta(hours=hours),
+            held_back_at=now - timedelta(hours=hours),
+        )
+        for hours in [3, 2, 1]
+    ]
+
+    JobRunQueueItem.objects.remove_old_items()
+
+    assert list(JobRunQueueItem.objects.exclude(held_back_at=None)) == [
+        held_back_items[0]
+    ]
+
+    JobRunQueueItem.objects.create(
+        scheduled_job=scheduled_job, run_at=now - timedelta(hours=1), held_back_at=now
+    )
+    scheduled_job.update_run_queue()
+
+    assert list(JobRunQueueItem.objects.exclude(held_back_at=None)) == [
+        held_back_items[0]
+    ]
@@ -1,5 +1,6 @@
 import os
 import sys
+from typing import Optional
 
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
@@ -23,3 +24,12 @@ def get_django_manage_py(max_depth: int = 3) -> str:
         tries_left -= 1
         directory = os.path.dirname(directory)
     raise EnvironmentError("Cannot find manage.py")
+
+
+def get_max_concurrent_runs() -> Optional[int]:
+    max_concurrent_runs = getattr(settings, "BATCHRUN_MAX_CONCURRENT_RUNS", None)
+    if max_concurrent_runs is not None and not isinstance(max_concurrent_runs, int):
+        raise ImproperlyConfigured(
+            "BATCHRUN_MAX_CONCURRENT_RUNS should be an integer or None"
+        )
+    return max_concurrent_runs
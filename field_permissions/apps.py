@@ -12,3 +12,7 @@ class FieldPermissionsConfig(AppConfig):
             create_permissions,
             dispatch_uid="field_permissions.management.create_permissions",
         )
+
+        from .registry import field_permissions
+
+        field_permissions.build_indexes()
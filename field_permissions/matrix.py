@@ -0,0 +1,82 @@
+class FieldPermissionMatrix:
+    """The field permissions of one user
+
+    Answers the same as user.has_perm for the field permissions, but
+    without formatting the permission names and going through the
+    authentication backends for every field. The permissions are
+    resolved once per model and the changes to the fields once per
+    serializer class."""
+
+    def __init__(self, permissions, is_superuser=False):
+        self.permissions = permissions
+        self.is_superuser = is_superuser
+        self._models = {}
+        self._serializer_field_changes = {}
+
+    @classmethod
+    def for_user(cls, user):
+        if not user or not user.is_authenticated or not user.is_active:
+            return cls(frozenset())
+
+        if user.is_superuser:
+            return cls(frozenset(), is_superuser=True)
+
+        return cls(frozenset(user.get_all_permissions()))
+
+    def _get_model_permissions(self, model):
+        opts = model._meta
+
+        if model not in self._models:
+            self._models[model] = (
+                "{}.change_{}_".format(opts.app_label, opts.model_name),
+                "{}.view_{}_".format(opts.app_label, opts.model_name),
+                {},
+            )
+
+        return self._models[model]
+
+    def get_field_permission(self, model, field_name):
+        """Returns "change", "view" or None"""
+        if self.is_superuser:
+            return "change"
+
+        (change_prefix, view_prefix, field_permissions) = self._get_model_permissions(
+            model
+        )
+
+        if field_name not in field_permissions:
+            if change_prefix + field_name in self.permissions:
+                field_permissions[field_name] = "change"
+            elif view_prefix + field_name in self.permissions:
+                field_permissions[field_name] = "view"
+            else:
+                field_permissions[field_name] = None
+
+        return field_permissions[field_name]
+
+    def get_serializer_field_changes(self, serializer, model, field_names):
+        """Returns the names of the fields that should be read only and
+        the names of the fields that should be removed from the serializer"""
+        key = (serializer.__class__, model, field_names)
+
+        if key not in self._serializer_field_changes:
+            self._serializer_field_changes[key] = serializer.get_field_changes(
+                self, model, field_names
+            )
+
+        return self._serializer_field_changes[key]
+
+
+def get_field_permission_matrix(request):
+    """Returns the field permission matrix of the user of the request
+
+    The matrix is created only once per request. It isn't shared between
+    the requests, so changes to the permissions apply from the next
+    request on."""
+    matrix = getattr(request, "_field_permission_matrix", None)
+
+    if matrix is None:
+        matrix = FieldPermissionMatrix.for_user(getattr(request, "user", None))
+        request._field_permission_matrix = matrix
+
+    return matrix
@@ -6,6 +6,10 @@ FIELD_PERMISSION_TYPES = ["view", "change"]
 class FieldPermissionsModelRegistry(object):
     def __init__(self):
         self._registry = {}
+        # The configurations of the registered models by the model name
+        self._model_names = {}
+        # The precomputed fields and permissions of the registered models
+        self._model_indexes = {}
 
     def register(self, cls, include_fields=None, exclude_fields=None):
         if not issubclass(cls, Model):
@@ -21,34 +25,58 @@ class FieldPermissionsModelRegistry(object):
             "include_fields": include_fields,
             "exclude_fields": exclude_fields,
         }
+        self._model_names[cls._meta.model_name] = self._registry[cls]
+        self._model_indexes = {}
 
-    def in_registry(self, klass):
-        model_name = klass._meta.model_name
+    def build_indexes(self):
+        """Precomputes the fields and the permissions of the registered models
 
-        return model_name in [klass._meta.model_name for klass in self._registry.keys()]
+        Called when the apps are ready, because the related fields of
+        the models are not known before that."""
+        for klass in self._registry.keys():
+            self._get_model_index(klass)
 
-    def get_include_fields_for(self, klass):
-        model_name = klass._meta.model_name
+    def in_registry(self, klass):
+        return klass._meta.model_name in self._model_names
 
-        for klass, conf in self._registry.items():
-            if klass._meta.model_name == model_name:
-                return conf["include_fields"]
+    def get_include_fields_for(self, klass):
+        conf = self._model_names.get(klass._meta.model_name)
 
-        return []
+        return conf["include_fields"] if conf else []
 
     def get_exclude_fields_for(self, klass):
-        model_name = klass._meta.model_name
+        conf = self._model_names.get(klass._meta.model_name)
 
-        for klass, conf in self._registry.items():
-            if klass._meta.model_name == model_name:
-                return conf["exclude_fields"]
-
-        return []
+        return conf["exclude_fields"] if conf else []
 
     def get_models(self):
         return self._registry.keys()
 
     def get_model_fields(self, klass):
+        return list(self._get_model_index(klass)["fields"])
+
+    def get_field_permissions_for_model(self, klass):
+        return list(self._get_model_index(klass)["permissions"])
+
+    def _get_model_index(self, klass):
+        if klass in self._model_indexes:
+            return self._model_indexes[klass]
+
+        index = {
+            "fields": self._get_model_fields(klass),
+            "permissions": self._get_field_permissions_for_model(klass),
+        }
+
+        # Only the registered models are cached. The historical models used
+        # in the migrations are different classes with the same model name.
+        # The related fields are known when the models are ready, which is
+        # already the case when the apps' ready methods are called.
+        if klass in self._registry and klass._meta.apps.models_ready:
+            self._model_indexes[klass] = index
+
+        return index
+
+    def _get_model_fields(self, klass):
         opts = klass._meta
         include_fields = self.get_include_fields_for(klass)
         exclude_fields = self.get_exclude_fields_for(klass)
@@ -64,7 +92,7 @@ class FieldPermissionsModelRegistry(object):
 
         return fields
 
-    def get_field_permissions_for_model(self, klass):
+    def _get_field_permissions_for_model(self, klass):
         opts = klass._meta
         include_fields = self.get_include_fields_for(klass)
         exclude_fields = self.get_exclude_fields_for(klass)
@@ -1,3 +1,4 @@
+from field_permissions.matrix import get_field_permission_matrix
 from field_permissions.registry import field_permissions
 
 
@@ -13,18 +14,13 @@ class FieldPermissionsSerializerMixin:
     initialized in the parent serializer.
     """
 
-    def modify_fields_by_field_permissions(self):
-        if "request" not in self.context:
-            return
-
-        model = self.Meta.model
-
-        if not field_permissions.in_registry(model):
-            return
-
-        user = self.context["request"].user
-        field_names = list(self.fields)
+    def get_field_changes(self, matrix, model, field_names):
+        """Returns the names of the fields that should be read only and
+        the names of the fields that should be removed according to the
+        permissions in the field permission matrix"""
         excluded_field_names = field_permissions.get_exclude_fields_for(model)
+        read_only_field_names = []
+        removed_field_names = []
 
         for field_name in field_names:
             permission_check_field_name = field_name
@@ -37,25 +33,45 @@ class FieldPermissionsSerializerMixin:
             if permission_check_field_name in excluded_field_names:
                 continue
 
-            if user.has_perm(
-                "{}.change_{}_{}".format(
-                    model._meta.app_label,
-                    model._meta.model_name,
-                    permission_check_field_name,
-                )
-            ):
+            permission = matrix.get_field_permission(model, permission_check_field_name)
+
+            if permission == "change":
                 continue
 
-            if user.has_perm(
-                "{}.view_{}_{}".format(
-                    model._meta.app_label,
-                    model._meta.model_name,
-                    permission_check_field_name,
-                )
-            ):
-                self.fields[field_name].read_only = True
+            if permission == "view":
+                read_only_field_names.append(field_name)
             else:
-                del self.fields[field_name]
+                removed_field_names.append(field_name)
+
+        return read_only_field_names, removed_field_names
+
+    def modify_fields_by_field_permissions(self):
+        if "request" not in self.context:
+            return
+
+        # The fields need to be modified only once per serializer instance
+        # even though to_representation is called for every instance in a list
+        if getattr(self, "_fields_modified_by_field_permissions", False):
+            return
+
+        model = self.Meta.model
+
+        if not field_permissions.in_registry(model):
+            return
+
+        matrix = get_field_permission_matrix(self.context["request"])
+        (
+            read_only_field_names,
+            removed_field_names,
+        ) = matrix.get_serializer_field_changes(self, model, tuple(self.fields))
+
+        for field_name in read_only_field_names:
+            self.fields[field_name].read_only = True
+
+        for field_name in removed_field_names:
+            del self.fields[field_name]
+
+        self._fields_modified_by_field_permissions = True
 
     def to_representation(self, instance):
         self.modify_fields_by_field_permissions()
@@ -93,3 +93,39 @@ def test_get_field_permissions_for_model():
         "view_dummy_second_sub",
         "change_dummy_second_sub",
     ]
+
+
+@pytest.mark.django_db
+def test_model_indexes_are_rebuilt_on_register():
+    from field_permissions.registry import FieldPermissionsModelRegistry
+
+    field_permissions = FieldPermissionsModelRegistry()
+    field_permissions.register(Dummy)
+    field_permissions.build_indexes()
+
+    assert Dummy in field_permissions._model_indexes
+    assert len(field_permissions.get_field_permissions_for_model(Dummy)) == 12
+
+    field_permissions.register(Dummy, include_fields=["field1"])
+
+    perms = field_permissions.get_field_permissions_for_model(Dummy)
+    assert [codename for (codename, name) in perms] == [
+        "view_dummy_field1",
+        "change_dummy_field1",
+    ]
+    assert field_permissions.get_include_fields_for(Dummy) == ["field1"]
+
+
+@pytest.mark.django_db
+def test_model_indexes_are_built_before_apps_are_ready(monkeypatch):
+    from field_permissions.registry import FieldPermissionsModelRegistry
+
+    # The indexes are built in AppConfig.ready, when the models are ready
+    # but the apps are not
+    monkeypatch.setattr(Dummy._meta.apps, "ready", False)
+
+    field_permissions = FieldPermissionsModelRegistry()
+    field_permissions.register(Dummy)
+    field_permissions.build_indexes()
+
+    assert Dummy in field_permissions._model_indexes
@@ -0,0 +1,127 @@
+import pytest
+from django.contrib.auth.models import Group, Permission, User
+from django.contrib.contenttypes.models import ContentType
+from django.test import RequestFactory
+from rest_framework import serializers
+
+from field_permissions.matrix import get_field_permission_matrix
+from field_permissions.registry import field_permissions
+from field_permissions.serializers import FieldPermissionsSerializerMixin
+from field_permissions.tests.dummy_app.models import Dummy
+
+
+class DummySerializer(FieldPermissionsSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Dummy
+        fields = ("id", "field1", "field2", "field3")
+
+
+@pytest.fixture
+def dummy_field_permissions(monkeypatch):
+    monkeypatch.setattr(field_permissions, "_registry", {})
+    monkeypatch.setattr(field_permissions, "_model_names", {})
+    monkeypatch.setattr(field_permissions, "_model_indexes", {})
+    field_permissions.register(Dummy, exclude_fields=["id"])
+
+    content_type = ContentType.objects.get_for_model(Dummy)
+    for (codename, name) in field_permissions.get_field_permissions_for_model(Dummy):
+        Permission.objects.get_or_create(
+            codename=codename, content_type=content_type, defaults={"name": name}
+        )
+
+    return field_permissions
+
+
+def get_dummy_permission(codename):
+    return Permission.objects.get(
+        codename=codename, content_type=ContentType.objects.get_for_model(Dummy)
+    )
+
+
+def make_request(user):
+    request = RequestFactory().get("/")
+    request.user = user
+
+    return request
+
+
+@pytest.mark.django_db
+def test_serializer_fields_modified_by_field_permissions(dummy_field_permissions):
+    user = User.objects.create(username="test_user")
+    group = Group.objects.create(name="test_group")
+    group.permissions.add(
+        get_dummy_permission("change_dummy_field1"),
+        get_dummy_permission("view_dummy_field2"),
+    )
+    user.groups.add(group)
+
+    request = make_request(user)
+    instances = [Dummy.objects.create(field1="test1"), Dummy(field1="test2")]
+    serializer = DummySerializer(instances, many=True, context={"request": request})
+
+    assert [set(item.keys()) for item in serializer.data] == [
+        {"id", "field1", "field2"},
+        {"id", "field1", "field2"},
+    ]
+
+    fields = serializer.child.fields
+    assert not fields["field1"].read_only
+    assert fields["field2"].read_only
+    assert "field3" not in fields
+
+
+@pytest.mark.django_db
+def test_field_permission_matrix_is_created_once_per_request(
+    dummy_field_permissions, django_assert_num_queries
+):
+    user = User.objects.create(username="test_user")
+    user.user_permissions.add(get_dummy_permission("view_dummy_field1"))
+    request = make_request(User.objects.get(pk=user.pk))
+
+    with django_assert_num_queries(2):
+        matrix = get_field_permission_matrix(request)
+
+    with django_assert_num_queries(0):
+        assert get_field_permission_matrix(request) is matrix
+        assert matrix.get_field_permission(Dummy, "field1") == "view"
+        assert matrix.get_field_permission(Dummy, "field2") is None
+
+    # The permissions are read again for the next request
+    request = make_request(User.objects.get(pk=user.pk))
+    with django_assert_num_queries(2):
+        get_field_permission_matrix(request)
+
+
+@pytest.mark.django_db
+def test_field_permission_matrix_follows_group_permission_changes(
+    dummy_field_permissions,
+):
+    user = User.objects.create(username="test_user")
+    group = Group.objects.create(name="test_group")
+    user.groups.add(group)
+
+    matrix = get_field_permission_matrix(make_request(user))
+    assert matrix.get_field_permission(Dummy, "field1") is None
+
+    group.permissions.add(get_dummy_permission("change_dummy_field1"))
+
+    matrix = get_field_permission_matrix(make_request(User.objects.get(pk=user.pk)))
+    assert matrix.get_field_permission(Dummy, "field1") == "change"
+
+    group.delete()
+
+    matrix = get_field_permission_matrix(make_request(User.objects.get(pk=user.pk)))
+    assert matrix.get_field_permission(Dummy, "field1") is None
+
+
+@pytest.mark.django_db
+def test_field_permission_matrix_superuser_and_inactive_user(dummy_field_permissions):
+    superuser = User.objects.create(username="superuser", is_superuser=True)
+    inactive_user = User.objects.create(username="inactive_user", is_active=False)
+    inactive_user.user_permissions.add(get_dummy_permission("change_dummy_field1"))
+
+    matrix = get_field_permission_matrix(make_request(superuser))
+    assert matrix.get_field_permission(Dummy, "field3") == "change"
+
+    matrix = get_field_permission_matrix(make_request(inactive_user))
+    assert matrix.get_field_permission(Dummy, "field1") is None
@@ -1,26 +1,133 @@
+import datetime
+from contextlib import contextmanager
 from decimal import ROUND_HALF_UP, Decimal
 
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
-
-from leasing.enums import InvoiceType, RentCycle
+from django.db import connection
+from django.db.models import Prefetch
+from django.test.utils import CaptureQueriesContext
+
+from leasing.calculation.bulk import get_rent_calculation_prefetches
+from leasing.calculation.index import get_index_table
+from leasing.enums import InvoiceType, RentCycle, TenantContactType
+from leasing.models import Lease, LeaseArea, TenantContact
+from leasing.models.invoice import InvoiceRow
+from leasing.models.land_area import LeaseAreaAddress
 from leasing.models.utils import get_next_business_day, is_business_day
 
 from .sales_order import BillingParty1, LineItem, OrderParty
 
 
+def get_invoice_sales_order_prefetches():
+    """Returns the prefetch lookups for everything that
+    InvoiceSalesOrderAdapter reads from an invoice
+
+    When the invoices are prefetched with these, the adapter doesn't
+    need to query the database for the data of the sales order."""
+    return [
+        Prefetch(
+            "lease",
+            queryset=Lease.objects.select_related(
+                "type",
+                "municipality",
+                "district",
+                "identifier",
+                "intended_use",
+                "lessor",
+            ),
+        ),
+        # In case the leases of the invoices were already fetched
+        # without the related objects above
+        "lease__type",
+        "lease__municipality",
+        "lease__district",
+        "lease__identifier",
+        "lease__intended_use",
+        "lease__lessor",
+        Prefetch(
+            "lease__lease_areas",
+            queryset=LeaseArea.objects.defer("geometry").order_by("id"),
+        ),
+        Prefetch(
+            "lease__lease_areas__addresses",
+            queryset=LeaseAreaAddress.objects.order_by("-is_primary", "id"),
+        ),
+        *get_rent_calculation_prefetches(prefix="lease__"),
+        "recipient",
+        "credited_invoice",
+        Prefetch(
+            "rows",
+            queryset=InvoiceRow.objects.select_related(
+                "receivable_type", "tenant"
+            ).order_by("id"),
+        ),
+        Prefetch(
+            "rows__tenant__tenantcontact_set",
+            queryset=TenantContact.objects.select_related("contact"),
+        ),
+    ]
+
+
+def get_tenantcontacts_for_period(tenant, contact_type, start_date, end_date):
+    """Returns the same tenant contacts as Tenant.get_tenantcontacts_for_period
+    but filtered from the prefetched tenant contacts of the tenant"""
+    tenantcontacts = [
+        tenantcontact
+        for tenantcontact in tenant.tenantcontact_set.all()
+        if tenantcontact.type == contact_type
+        and (tenantcontact.end_date is None or tenantcontact.end_date >= start_date)
+        and (
+            not end_date
+            or tenantcontact.start_date is None
+            or tenantcontact.start_date <= end_date
+        )
+    ]
+
+    # Same order as order_by("-start_date") in PostgreSQL (nulls first)
+    return sorted(
+        tenantcontacts,
+        key=lambda tc: (tc.start_date is None, tc.start_date or datetime.date.min),
+        reverse=True,
+    )
+
+
+@contextmanager
+def assert_no_queries(description):
+    """Fails if the database is queried inside the block when DEBUG is on"""
+    if not settings.DEBUG:
+        yield
+        return
+
+    with CaptureQueriesContext(connection) as context:
+        yield
+
+    assert not context.captured_queries, "{} made {} queries: {}".format(
+        description,
+        len(context.captured_queries),
+        [query["sql"] for query in context.captured_queries],
+    )
+
+
 class InvoiceSalesOrderAdapter:
+    """Sets the values of a SalesOrder from an Invoice
+
+    The invoice should be fetched with the prefetches from
+    get_invoice_sales_order_prefetches."""
+
     def __init__(
         self,
         invoice=None,
         sales_order=None,
         receivable_type_rent=None,
         receivable_type_collateral=None,
+        index_table=None,
     ):
         self.invoice = invoice
         self.sales_order = sales_order
         self.receivable_type_rent = receivable_type_rent
         self.receivable_type_collateral = receivable_type_collateral
+        self.index_table = index_table
 
     def get_bill_text(self):
         if (
@@ -30,31 +137,32 @@ class InvoiceSalesOrderAdapter:
             invoice_year = self.invoice.billing_period_start_date.year
 
             # TODO: Which rent
-            rent = self.invoice.lease.get_active_rents_on_period(
+            rents = self.invoice.lease.get_active_rents_on_period(
                 self.invoice.billing_period_start_date,
                 self.invoice.billing_period_end_date,
-            ).first()
+            )
         else:
             invoice_year = self.invoice.invoicing_date.year
 
-            rent = self.invoice.lease.get_active_rents_on_period(
+            rents = self.invoice.lease.get_active_rents_on_period(
                 self.invoice.invoicing_date, self.invoice.invoicing_date
-            ).first()
+            )
+        rent = next(iter(rents), None)
 
+        # The yearly rent is only shown on the invoice, so the amounts left
+        # in the rent adjustments must not be changed (i.e. dry run).
         rent_calculation = self.invoice.lease.calculate_rent_amount_for_year(
-            invoice_year
+            invoice_year, dry_run=True, index_table=self.index_table
         )
         year_rent = rent_calculation.get_total_amount()
 
         real_property_identifier = ""
         address = ""
 
-        first_lease_area = self.invoice.lease.lease_areas.first()
+        first_lease_area = next(iter(self.invoice.lease.lease_areas.all()), None)
         if first_lease_area:
             real_property_identifier = first_lease_area.identifier
-            lease_area_address = first_lease_area.addresses.order_by(
-                "-is_primary"
-            ).first()
+            lease_area_address = next(iter(first_lease_area.addresses.all()), None)
 
             if lease_area_address:
                 address = lease_area_address.address
@@ -131,19 +239,28 @@ class InvoiceSalesOrderAdapter:
         if not tenant or not self.invoice.billing_period_start_date:
             return self.invoice.recipient
 
-        # This method returns the TENANT contact if there's no BILLING contact
-        tenant_billingcontact = tenant.get_billing_tenantcontacts(
-            self.invoice.billing_period_start_date, self.invoice.billing_period_end_date
-        ).first()
+        # Use the TENANT contact if there's no BILLING contact
+        # (like Tenant.get_billing_tenantcontacts)
+        tenantcontacts = get_tenantcontacts_for_period(
+            tenant,
+            TenantContactType.BILLING,
+            self.invoice.billing_period_start_date,
+            self.invoice.billing_period_end_date,
+        ) or get_tenantcontacts_for_period(
+            tenant,
+            TenantContactType.TENANT,
+            self.invoice.billing_period_start_date,
+            self.invoice.billing_period_end_date,
+        )
 
-        if not tenant_billingcontact:
+        if not tenantcontacts:
             return self.invoice.recipient
-        return tenant_billingcontact.contact
+        return tenantcontacts[0].contact
 
     def get_po_number(self):
         # Simply return the first reference ("viite") we come across
-        for invoice_row in self.invoice.rows.filter(tenant__isnull=False):
-            if invoice_row.tenant.reference:
+        for invoice_row in self.invoice.rows.all():
+            if invoice_row.tenant and invoice_row.tenant.reference:
                 return invoice_row.tenant.reference[:35]
 
     def set_dates(self):
@@ -222,9 +339,17 @@ class InvoiceSalesOrderAdapter:
                 if not start_date and not end_date:
                     start_date = end_date = self.invoice.invoicing_date
 
-                tenant_contact = invoice_row.tenant.get_tenant_tenantcontacts(
-                    start_date, end_date
-                ).first()
+                tenant_contact = next(
+                    iter(
+                        get_tenantcontacts_for_period(
+                            invoice_row.tenant,
+                            TenantContactType.TENANT,
+                            start_date,
+                            end_date,
+                        )
+                    ),
+                    None,
+                )
 
                 if tenant_contact and tenant_contact.contact:
                     line_item.line_text_l2 = "{}  ".format(
@@ -262,25 +387,34 @@ class InvoiceSalesOrderAdapter:
         return "2826"
 
     def set_values(self):
-        self.sales_order.set_bill_texts_from_string(self.get_bill_text())
+        # Setting the dates and the references may save the adjusted due
+        # date and the invoice number. Everything else is read from the
+        # prefetched data.
+        self.set_dates()
+        self.set_references()
 
-        contact_to_be_billed = self.get_contact_to_bill()
+        if self.index_table is None:
+            self.index_table = get_index_table()
 
-        order_party = OrderParty()
-        order_party.from_contact(contact_to_be_billed)
-        self.sales_order.order_party = order_party
+        with assert_no_queries(
+            "InvoiceSalesOrderAdapter for invoice id {}".format(self.invoice.id)
+        ):
+            self.sales_order.set_bill_texts_from_string(self.get_bill_text())
 
-        billing_party1 = BillingParty1()
-        billing_party1.from_contact(contact_to_be_billed)
-        self.sales_order.billing_party1 = billing_party1
+            contact_to_be_billed = self.get_contact_to_bill()
 
-        self.sales_order.sales_office = self.get_sales_office()
-        self.sales_order.po_number = self.get_po_number()
-        self.sales_order.order_type = self.get_order_type()
-        self.sales_order.original_order = self.get_original_order()
+            order_party = OrderParty()
+            order_party.from_contact(contact_to_be_billed)
+            self.sales_order.order_party = order_party
 
-        self.set_dates()
-        self.set_references()
+            billing_party1 = BillingParty1()
+            billing_party1.from_contact(contact_to_be_billed)
+            self.sales_order.billing_party1 = billing_party1
+
+            self.sales_order.sales_office = self.get_sales_office()
+            self.sales_order.po_number = self.get_po_number()
+            self.sales_order.order_type = self.get_order_type()
+            self.sales_order.original_order = self.get_original_order()
 
-        line_items = self.get_line_items()
-        self.sales_order.line_items = line_items
+            line_items = self.get_line_items()
+            self.sales_order.line_items = line_items
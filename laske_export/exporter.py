@@ -2,28 +2,38 @@ import json
 import logging
 import os
 import tempfile
+from collections import defaultdict
+from contextlib import ExitStack
 
 import paramiko
 import pysftp
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db.models import QuerySet, prefetch_related_objects
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
+from lxml import etree
 from paramiko.py3compat import decodebytes
 
-from laske_export.document.invoice_sales_order_adapter import InvoiceSalesOrderAdapter
+from laske_export.document.invoice_sales_order_adapter import (
+    InvoiceSalesOrderAdapter,
+    get_invoice_sales_order_prefetches,
+)
 from laske_export.document.land_use_agreement_invoice_sales_order_adapter import (
     LandUseAgreementInvoiceSalesOrderAdapter,
 )
 from laske_export.document.sales_order import SalesOrder, SalesOrderContainer
 from laske_export.enums import LaskeExportLogInvoiceStatus
 from laske_export.models import LaskeExportLog, LaskeExportLogInvoiceItem
+from leasing.calculation.index import get_index_table
 from leasing.enums import InvoiceType
 from leasing.models import Invoice, ReceivableType
 from leasing.models.land_use_agreement import LandUseAgreementInvoice
 
 logger = logging.getLogger(__name__)
 
+EXPORT_CHUNK_SIZE = 500
+
 
 def set_constant_laske_values(sales_order):
     for key, val in settings.LASKE_VALUES.items():
@@ -34,6 +44,99 @@ class LaskeExporterException(Exception):
     pass
 
 
+class SalesOrderXmlWriter:
+    """Writes sales orders to SBO_SalesOrderContainer XML files one at a time
+
+    If max_file_size (in bytes) is set, a new file is started when the next
+    sales order would make the current file larger than that. The files
+    after the first one get a running number suffix in the filename."""
+
+    def __init__(self, directory, filename, max_file_size=None):
+        self.directory = directory
+        self.filename = filename
+        self.max_file_size = max_file_size
+        self.filenames = []
+
+        self._exit_stack = None
+        self._fp = None
+        self._xf = None
+        self._sales_order_count = 0
+        self._closing_tag_size = len(
+            "</{}>\n".format(SalesOrderContainer.Meta.element_name).encode("utf-8")
+        )
+
+    def _get_next_filename(self):
+        if not self.filenames:
+            return self.filename
+
+        (name, extension) = os.path.splitext(self.filename)
+
+        return "{}_{:02}{}".format(name, len(self.filenames) + 1, extension)
+
+    def _open(self):
+        filename = self._get_next_filename()
+        self.filenames.append(filename)
+
+        self._exit_stack = ExitStack()
+        self._fp = self._exit_stack.enter_context(
+            open(os.path.join(self.directory, filename), "wb")
+        )
+        self._xf = self._exit_stack.enter_context(
+            etree.xmlfile(self._fp, encoding="utf-8")
+        )
+        self._xf.write_declaration()
+        self._exit_stack.enter_context(
+            self._xf.element(SalesOrderContainer.Meta.element_name)
+        )
+        self._xf.write("\n")
+        self._sales_order_count = 0
+
+    def _is_full(self, element):
+        if not self.max_file_size or not self._sales_order_count:
+            return False
+
+        self._xf.flush()
+        element_size = len(etree.tostring(element, encoding="utf-8", pretty_print=True))
+
+        return (
+            self._fp.tell() + element_size + self._closing_tag_size > self.max_file_size
+        )
+
+    def write(self, sales_order):
+        """Writes the sales order and returns the name of its file"""
+        element = sales_order.to_etree()
+
+        if self._xf is not None and self._is_full(element):
+            self.close()
+
+        if self._xf is None:
+            self._open()
+
+        self._xf.write(element, pretty_print=True)
+        self._sales_order_count += 1
+
+        return self.filenames[-1]
+
+    def remove_files(self, filenames):
+        """Removes the written files, e.g. when they couldn't be sent"""
+        self.close()
+
+        for filename in filenames:
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        if self._exit_stack is None:
+            return
+
+        self._exit_stack.close()
+        self._exit_stack = None
+        self._fp = None
+        self._xf = None
+
+
 class LaskeExporter:
     def __init__(self):
         self.message_output = None
@@ -118,125 +221,178 @@ class LaskeExporter:
 
         self.message_output.write(message)
 
-    def export_invoices(self, invoices):
+    def get_export_filename(self, laske_export_log_entry):
+        return "MTIL_IN_{}_{:08}.xml".format(
+            settings.LASKE_VALUES["sender_id"], laske_export_log_entry.id
+        )
+
+    def export_invoices(self, invoices, max_file_size=None):  # noqa: C901
         """
-        :type invoices: list of Invoice | Invoice
+        :type invoices: list of Invoice | Invoice | QuerySet
+        :type max_file_size: int | None
         :rtype: LaskeExportLog
+
+        The invoices are handled in chunks and the sales orders are written
+        to the export file one by one, so that only one chunk of invoices
+        is kept in memory at a time. If max_file_size (in bytes, defaults to
+        settings.LASKE_EXPORT_MAX_FILE_SIZE) is set, the export is split into
+        several files that are at most that size.
         """
         if isinstance(invoices, Invoice):
             invoices = [invoices]
 
+        if max_file_size is None:
+            max_file_size = settings.LASKE_EXPORT_MAX_FILE_SIZE
+
         # TODO: Make configurable
         receivable_type_rent = ReceivableType.objects.get(pk=1)
         receivable_type_collateral = ReceivableType.objects.get(pk=8)
 
+        index_table = get_index_table()
+
         now = timezone.now()
         laske_export_log_entry = LaskeExportLog.objects.create(started_at=now)
 
-        sales_orders = []
-        log_invoices = []
+        if isinstance(invoices, QuerySet):
+            invoice_ids = list(invoices.values_list("id", flat=True))
+        else:
+            invoice_ids = [invoice.id for invoice in invoices]
+
         invoice_count = 0
+        invoice_ids_by_filename = defaultdict(list)
+        sent_filenames = []
 
-        self.write_to_output("Going through {} invoices".format(len(invoices)))
+        self.write_to_output("Going through {} invoices".format(len(invoice_ids)))
 
-        for invoice in invoices:
-            invoice_log_item = LaskeExportLogInvoiceItem(
-                invoice=invoice, laskeexportlog=laske_export_log_entry
-            )
-            log_invoices.append(invoice_log_item)
+        writer = SalesOrderXmlWriter(
+            settings.LASKE_EXPORT_ROOT,
+            self.get_export_filename(laske_export_log_entry),
+            max_file_size=max_file_size,
+        )
 
-            try:
-                self.write_to_output(" Invoice id {}".format(invoice.id))
-
-                # If this invoice is a credit note, but the credited invoice has
-                # not been sent to SAP, don't send the credit invoice either.
-                # TODO This doesn't check if the credited invoice would be sent
-                #   in this same export. Need to check if the SAP can handle it.
-                if invoice.type == InvoiceType.CREDIT_NOTE and (
-                    not invoice.credited_invoice
-                    or not invoice.credited_invoice.sent_to_sap_at
-                ):
-                    if invoice.credited_invoice:
-                        self.write_to_output(
-                            " Not sending invoice id {} because the credited invoice (id {}) "
-                            "has not been sent to SAP.".format(
-                                invoice.id, invoice.credited_invoice.id
-                            )
+        try:
+            for invoice_chunk in self._get_invoice_chunks(invoices, invoice_ids):
+                log_invoices = []
+
+                try:
+                    for invoice in invoice_chunk:
+                        invoice_log_item = LaskeExportLogInvoiceItem(
+                            invoice=invoice, laskeexportlog=laske_export_log_entry
                         )
-                    else:
-                        self.write_to_output(
-                            " Not sending invoice id {} because the credited invoice is unknown.".format(
-                                invoice.id
+                        log_invoices.append(invoice_log_item)
+
+                        try:
+                            self.write_to_output(" Invoice id {}".format(invoice.id))
+
+                            # If this invoice is a credit note, but the credited invoice has
+                            # not been sent to SAP, don't send the credit invoice either.
+                            # TODO This doesn't check if the credited invoice would be sent
+                            #   in this same export. Need to check if the SAP can handle it.
+                            if invoice.type == InvoiceType.CREDIT_NOTE and (
+                                not invoice.credited_invoice
+                                or not invoice.credited_invoice.sent_to_sap_at
+                            ):
+                                if invoice.credited_invoice:
+                                    self.write_to_output(
+                                        " Not sending invoice id {} because the credited invoice (id {}) "
+                                        "has not been sent to SAP.".format(
+                                            invoice.id, invoice.credited_invoice.id
+                                        )
+                                    )
+                                else:
+                                    self.write_to_output(
+                                        " Not sending invoice id {} because the credited invoice is unknown.".format(
+                                            invoice.id
+                                        )
+                                    )
+
+                                continue
+
+                            if not invoice.invoicing_date:
+                                invoice.invoicing_date = now.date()
+                                invoice.save()
+
+                            sales_order = SalesOrder()
+                            set_constant_laske_values(sales_order)
+
+                            adapter = InvoiceSalesOrderAdapter(
+                                invoice=invoice,
+                                sales_order=sales_order,
+                                receivable_type_rent=receivable_type_rent,
+                                receivable_type_collateral=receivable_type_collateral,
+                                index_table=index_table,
                             )
-                        )
-
-                    continue
-
-                if not invoice.invoicing_date:
-                    invoice.invoicing_date = now.date()
-                    invoice.save()
+                            adapter.set_values()
 
-                sales_order = SalesOrder()
-                set_constant_laske_values(sales_order)
+                            sales_order.validate()
 
-                adapter = InvoiceSalesOrderAdapter(
-                    invoice=invoice,
-                    sales_order=sales_order,
-                    receivable_type_rent=receivable_type_rent,
-                    receivable_type_collateral=receivable_type_collateral,
-                )
-                adapter.set_values()
-
-                sales_order.validate()
-
-                sales_orders.append(sales_order)
+                            filename = writer.write(sales_order)
+                            invoice_ids_by_filename[filename].append(invoice.id)
 
-                invoice_count += 1
+                            invoice_count += 1
 
-                self.write_to_output(
-                    " Added invoice id {} as invoice number {}".format(
-                        invoice.id, invoice.number
-                    )
-                )
+                            self.write_to_output(
+                                " Added invoice id {} as invoice number {}".format(
+                                    invoice.id, invoice.number
+                                )
+                            )
 
-                invoice_log_item.status = LaskeExportLogInvoiceStatus.SENT
-            except ValidationError as err:
-                self.write_to_output(
-                    "Validation error occurred in #{} ({}) invoice. Errors: {}".format(
-                        invoice.number, invoice.id, "; ".join(err.messages)
-                    )
-                )
-                logger.warning(err, exc_info=True)
-                invoice_log_item.status = LaskeExportLogInvoiceStatus.FAILED
-                invoice_log_item.information = json.dumps(err.message_dict)
-            finally:
-                invoice_log_item.save()
+                            invoice_log_item.status = LaskeExportLogInvoiceStatus.SENT
+                        except ValidationError as err:
+                            self.write_to_output(
+                                "Validation error occurred in #{} ({}) invoice. Errors: {}".format(
+                                    invoice.number, invoice.id, "; ".join(err.messages)
+                                )
+                            )
+                            logger.warning(err, exc_info=True)
+                            invoice_log_item.status = LaskeExportLogInvoiceStatus.FAILED
+                            invoice_log_item.information = json.dumps(err.message_dict)
+                finally:
+                    # Save the log items of the chunk even if the export fails
+                    LaskeExportLogInvoiceItem.objects.bulk_create(log_invoices)
+        except Exception:
+            # A partially written export is not sent
+            writer.remove_files(writer.filenames)
+            raise
+        finally:
+            writer.close()
 
         if invoice_count > 0:
             self.write_to_output(
                 "Added {} invoices to the export".format(invoice_count)
             )
 
-            sales_order_container = SalesOrderContainer()
-            sales_order_container.sales_orders = sales_orders
-
-            export_filename = "MTIL_IN_{}_{:08}.xml".format(
-                settings.LASKE_VALUES["sender_id"], laske_export_log_entry.id
-            )
-
-            self.write_to_output("Export filename: {}".format(export_filename))
-
-            xml_string = sales_order_container.to_xml_string()
-
-            self.save_to_file(xml_string, export_filename)
-
-            self.write_to_output("Sending...")
-
-            self.send(export_filename)
-
-            self.write_to_output("Done.")
+            sent_filenames = []
+            try:
+                for export_filename in writer.filenames:
+                    self.write_to_output("Export filename: {}".format(export_filename))
+
+                    self.write_to_output("Sending...")
+
+                    self.send(export_filename)
+                    sent_filenames.append(export_filename)
+
+                    # Marked right away so that the invoices of the sent files
+                    # aren't sent again if sending a later file fails
+                    Invoice.objects.filter(
+                        id__in=invoice_ids_by_filename[export_filename]
+                    ).update(sent_to_sap_at=now)
+
+                    self.write_to_output("Done.")
+            except Exception:
+                # The invoices of the files that weren't sent are exported
+                # again to new files
+                writer.remove_files(
+                    [
+                        filename
+                        for filename in writer.filenames
+                        if filename not in sent_filenames
+                    ]
+                )
+                raise
 
-            Invoice.objects.filter(id__in=[o.id for o in invoices]).update(
+            # The invoices left out of the export are marked as handled too
+            Invoice.objects.filter(id__in=invoice_ids, sent_to_sap_at=None).update(
                 sent_to_sap_at=now
             )
 
@@ -247,6 +403,28 @@ class LaskeExporter:
 
         return laske_export_log_entry
 
+    def _get_invoice_chunks(self, invoices, invoice_ids):
+        """Yields the invoices in chunks with the data needed for the
+        sales orders prefetched"""
+        for i in range(0, len(invoice_ids), EXPORT_CHUNK_SIZE):
+            chunk_ids = invoice_ids[i : i + EXPORT_CHUNK_SIZE]
+
+            if isinstance(invoices, QuerySet):
+                invoices_by_id = Invoice.objects.in_bulk(chunk_ids)
+                invoice_chunk = [
+                    invoices_by_id[invoice_id]
+                    for invoice_id in chunk_ids
+                    if invoice_id in invoices_by_id
+                ]
+            else:
+                invoice_chunk = invoices[i : i + EXPORT_CHUNK_SIZE]
+
+            prefetch_related_objects(
+                invoice_chunk, *get_invoice_sales_order_prefetches()
+            )
+
+            yield invoice_chunk
+
     def export_land_use_agreement_invoices(self, invoices):
         """
         :type invoices: list of Invoice | Invoice
@@ -3,15 +3,18 @@ import glob
 import os
 import sys
 import tempfile
+from collections import defaultdict, namedtuple
 from decimal import ROUND_HALF_UP, Decimal
 from pathlib import Path
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 
 from laske_export.models import LaskePaymentsLog
 from leasing.models import Invoice, Vat
+from leasing.models.auditlog import log_created_objects, update_audit_log_object_owners
 from leasing.models.invoice import InvoicePayment
 
 
@@ -19,6 +22,53 @@ def get_import_dir():
     return os.path.join(settings.LASKE_EXPORT_ROOT, "payments")
 
 
+PaymentRecord = namedtuple(
+    "PaymentRecord", ["filing_code", "invoice_number", "amount", "payment_date"]
+)
+
+
+def parse_payment_line(line):
+    """Parses a fixed width payment line into a PaymentRecord
+
+    Raises ValueError with the reason if the line can't be imported."""
+    filing_code = line[27:43].strip()
+    if filing_code[:3] != "288":
+        raise ValueError("filing code ({}) should start with 288".format(filing_code))
+
+    try:
+        invoice_number = int(line[43:63])
+    except ValueError:
+        raise ValueError("no invoice number provided in payment row")
+
+    amount = Decimal("{}.{}".format(line[77:85], line[85:87]))
+    try:
+        payment_date = datetime.date(
+            year=2000 + int(line[21:23]), month=int(line[23:25]), day=int(line[25:27]),
+        )
+    except ValueError:
+        raise ValueError("malformed date in payment row: {}.".format(line[21:27]))
+
+    return PaymentRecord(
+        filing_code=filing_code,
+        invoice_number=invoice_number,
+        amount=amount,
+        payment_date=payment_date,
+    )
+
+
+def get_vat_for_date(vats, the_date):
+    """Returns the VAT for the date like Vat.objects.get_for_date
+
+    vats should be ordered by the start date in descending order."""
+    for vat in vats:
+        if vat.start_date <= the_date and (
+            vat.end_date is None or vat.end_date >= the_date
+        ):
+            return vat
+
+    return None
+
+
 class Command(BaseCommand):
     help = "Get payments from Laske"
 
@@ -161,23 +211,134 @@ class Command(BaseCommand):
         ]
 
     def get_payment_lines_from_file(self, filename):
+        with open(filename, "rt", encoding="latin-1") as fp:
+            for line in fp:
+                line = line.strip("\n")
+                if len(line) != 90:
+                    continue
+                if line[0] not in ["3", "5", "7"]:
+                    continue
+
+                yield line
+
+    def get_payment_records_from_file(self, filename):
         result = []
 
-        with open(filename, "rt", encoding="latin-1") as fp:
-            lines = fp.readlines()
+        for line in self.get_payment_lines_from_file(filename):
+            try:
+                payment_record = parse_payment_line(line)
+            except ValueError as e:
+                self.stderr.write("  Skipped row: {}".format(e))
+                continue
 
-        for line in lines:
-            line = line.strip("\n")
-            if len(line) != 90:
+            self.stdout.write(
+                " Invoice #{} amount: {} date: {} filing code: {}".format(
+                    payment_record.invoice_number,
+                    payment_record.amount,
+                    payment_record.payment_date,
+                    payment_record.filing_code,
+                )
+            )
+
+            result.append(payment_record)
+
+        return result
+
+    def import_payment_records(  # noqa: C901
+        self, payment_records, laske_payments_log_entry
+    ):
+        """Saves the payments of one file
+
+        The invoices, the existing payments and the VAT percents are fetched
+        once for the whole file. The payments are saved with one query and
+        the sum of the new payments of each paid invoice is applied to its
+        amounts once."""
+        invoices = {
+            invoice.number: invoice
+            for invoice in Invoice.objects.filter(
+                number__in={record.invoice_number for record in payment_records}
+            ).select_related("lease")
+        }
+        existing_payments = set(
+            InvoicePayment.objects.filter(invoice__in=invoices.values()).values_list(
+                "invoice_id", "paid_amount", "paid_date"
+            )
+        )
+        vats = list(Vat.objects.order_by("-start_date"))
+
+        new_payments = []
+        paid_invoices = {}
+        paid_amounts = defaultdict(Decimal)
+        for payment_record in payment_records:
+            amount = payment_record.amount
+            payment_date = payment_record.payment_date
+
+            invoice = invoices.get(payment_record.invoice_number)
+            if invoice is None:
+                self.stderr.write(
+                    '  Skipped row: invoice number "{}" does not exist.'.format(
+                        payment_record.invoice_number
+                    )
+                )
                 continue
-            if line[0] not in ["3", "5", "7"]:
+
+            if invoice.lease.is_subject_to_vat:
+                vat = get_vat_for_date(vats, payment_date)
+                if not vat:
+                    self.stdout.write(
+                        "  Lease is subject to VAT but no VAT percent found for payment date {}!".format(
+                            payment_date
+                        )
+                    )
+                    continue
+
+                amount_without_vat = Decimal(
+                    100 * amount / (100 + vat.percent)
+                ).quantize(Decimal(".01"), rounding=ROUND_HALF_UP)
+
+                self.stdout.write(
+                    "  Lease is subject to VAT. Amount: {} - VAT {}% = {}".format(
+                        amount, vat.percent, amount_without_vat
+                    )
+                )
+
+                amount = amount_without_vat
+
+            # If the invoice is paid in parts, the different payments will have the same filing_code.
+            # Avoiding duplicate payments by checking only the filing_code will skip legit payments
+            # so we'll only the skip adding the payments which match on date and amount as well.
+            # NB! It's still possible that someone pays e.g. a 40€ invoice with two separate 20€ payments
+            # ...but that situation is so rare that we'll handle it manually.
+            payment_key = (invoice.id, amount, payment_date)
+            if payment_key in existing_payments:
+                self.stdout.write(
+                    "  Skipped row: payment with same paid_date and paid_amount exists!"
+                )
                 continue
 
-            result.append(line)
+            existing_payments.add(payment_key)
+            new_payments.append(
+                InvoicePayment(
+                    invoice=invoice,
+                    paid_amount=amount,
+                    paid_date=payment_date,
+                    filing_code=payment_record.filing_code,
+                )
+            )
+            paid_invoices[invoice.id] = invoice
+            paid_amounts[invoice.id] += amount
+
+        new_payments = InvoicePayment.objects.bulk_create(new_payments)
+        log_created_objects(new_payments)
+        update_audit_log_object_owners(new_payments)
+        laske_payments_log_entry.payments.add(*new_payments)
 
-        return result
+        for invoice in paid_invoices.values():
+            invoice.update_amounts_incrementally(paid_amount=paid_amounts[invoice.id])
+
+        return new_payments
 
-    def handle(self, *args, **options):  # NOQA C901 'Command.handle' is too complex
+    def handle(self, *args, **options):
         self.check_import_directory()
 
         self.stdout.write(
@@ -208,108 +369,18 @@ class Command(BaseCommand):
             )
 
             try:
-                lines = self.get_payment_lines_from_file(filename)
+                payment_records = self.get_payment_records_from_file(filename)
             except UnicodeDecodeError as e:
                 self.stderr.write(
                     "Error: failed to read file {}! Error {}".format(filename, str(e))
                 )
                 continue
 
-            for line in lines:
-                filing_code = line[27:43].strip()
-                if filing_code[:3] != "288":
-                    self.stderr.write(
-                        "  Skipped row: filing code ({}) should start with 288".format(
-                            filing_code
-                        )
-                    )
-                    continue
-
-                try:
-                    invoice_number = int(line[43:63])
-                except ValueError:
-                    self.stderr.write(
-                        "  Skipped row: no invoice number provided in payment row"
-                    )
-                    continue
-
-                amount = Decimal("{}.{}".format(line[77:85], line[85:87]))
-                try:
-                    payment_date = datetime.date(
-                        year=2000 + int(line[21:23]),
-                        month=int(line[23:25]),
-                        day=int(line[25:27]),
-                    )
-                except ValueError:
-                    self.stderr.write(
-                        "  Skipped row: malformed date in payment row: {}.".format(
-                            invoice_number, line[21:27]
-                        )
-                    )
-                    continue
-
-                self.stdout.write(
-                    " Invoice #{} amount: {} date: {} filing code: {}".format(
-                        invoice_number, amount, payment_date, filing_code
-                    )
-                )
-
-                try:
-                    invoice = Invoice.objects.get(number=invoice_number)
-                except Invoice.DoesNotExist:
-                    self.stderr.write(
-                        '  Skipped row: invoice number "{}" does not exist.'.format(
-                            invoice_number
-                        )
-                    )
-                    continue
-
-                if invoice.lease.is_subject_to_vat:
-                    vat = Vat.objects.get_for_date(payment_date)
-                    if not vat:
-                        self.stdout.write(
-                            "  Lease is subject to VAT but no VAT percent found for payment date {}!".format(
-                                payment_date
-                            )
-                        )
-                        continue
-
-                    amount_without_vat = Decimal(
-                        100 * amount / (100 + vat.percent)
-                    ).quantize(Decimal(".01"), rounding=ROUND_HALF_UP)
-
-                    self.stdout.write(
-                        "  Lease is subject to VAT. Amount: {} - VAT {}% = {}".format(
-                            amount, vat.percent, amount_without_vat
-                        )
-                    )
-
-                    amount = amount_without_vat
-
-                # If the invoice is paid in parts, the different payments will have the same filing_code.
-                # Avoiding duplicate payments by checking only the filing_code will skip legit payments
-                # so we'll only the skip adding the payments which match on date and amount as well.
-                # NB! It's still possible that someone pays e.g. a 40€ invoice with two separate 20€ payments
-                # ...but that situation is so rare that we'll handle it manually.
-                if invoice.payments.filter(
-                    paid_amount=amount, paid_date=payment_date
-                ).exists():
-                    self.stdout.write(
-                        "  Skipped row: payment with same paid_date and paid_amount exists!"
-                    )
-                    continue
-
-                invoice_payment = InvoicePayment.objects.create(
-                    invoice=invoice,
-                    paid_amount=amount,
-                    paid_date=payment_date,
-                    filing_code=filing_code,
-                )
-                laske_payments_log_entry.payments.add(invoice_payment)
-                invoice.update_amounts()
+            with transaction.atomic():
+                self.import_payment_records(payment_records, laske_payments_log_entry)
 
-            laske_payments_log_entry.ended_at = timezone.now()
-            laske_payments_log_entry.is_finished = True
-            laske_payments_log_entry.save()
+                laske_payments_log_entry.ended_at = timezone.now()
+                laske_payments_log_entry.is_finished = True
+                laske_payments_log_entry.save()
 
         self.stdout.write("Done.")
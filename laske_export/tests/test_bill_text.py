@@ -4,10 +4,14 @@ from decimal import Decimal
 import pytest
 from django.utils.crypto import get_random_string
 
-from laske_export.document.invoice_sales_order_adapter import InvoiceSalesOrderAdapter
+from laske_export.document.invoice_sales_order_adapter import (
+    InvoiceSalesOrderAdapter,
+    get_invoice_sales_order_prefetches,
+)
 from laske_export.document.sales_order import SalesOrder
+from laske_export.exporter import set_constant_laske_values
 from leasing.enums import ContactType, DueDatesType, RentCycle, TenantContactType
-from leasing.models import ReceivableType
+from leasing.models import Invoice, ReceivableType
 
 
 @pytest.mark.django_db
@@ -285,3 +289,109 @@ def test_one_primary_and_nonprimary_addresses_in_leasearea(
     assert "Ensisijainen testiosoite" in adapter.get_bill_text()
     assert "Jokutoinen osoite" not in adapter.get_bill_text()
     assert "Toissijainen osoite" not in adapter.get_bill_text()
+
+
+@pytest.mark.django_db
+def test_set_values_with_prefetched_invoice_makes_no_queries(
+    django_db_setup,
+    settings,
+    lease_factory,
+    rent_factory,
+    contact_factory,
+    tenant_factory,
+    tenant_rent_share_factory,
+    tenant_contact_factory,
+    invoice_factory,
+    invoice_row_factory,
+    lease_area_factory,
+    lease_area_address_factory,
+):
+    settings.DEBUG = True
+
+    lease = lease_factory(
+        type_id=1, municipality_id=1, district_id=5, notice_period_id=1
+    )
+
+    rent_factory(
+        lease=lease,
+        cycle=RentCycle.APRIL_TO_MARCH,
+        due_dates_type=DueDatesType.FIXED,
+        due_dates_per_year=1,
+    )
+
+    lease_area = lease_area_factory(
+        lease=lease, identifier=get_random_string(), area=1000, section_area=1000
+    )
+    lease_area_address_factory(
+        lease_area=lease_area,
+        is_primary=True,
+        address="Ensisijainen testiosoite",
+        postal_code="00550",
+        city="Helsinki",
+    )
+
+    tenant1 = tenant_factory(
+        lease=lease, share_numerator=1, share_denominator=1, reference="testreference"
+    )
+    tenant_rent_share_factory(
+        tenant=tenant1, intended_use_id=1, share_numerator=1, share_denominator=1
+    )
+    contact1 = contact_factory(
+        first_name="First name 1", last_name="Last name 1", type=ContactType.PERSON
+    )
+    tenant_contact_factory(
+        type=TenantContactType.TENANT,
+        tenant=tenant1,
+        contact=contact1,
+        start_date=datetime.date(year=2000, month=1, day=1),
+    )
+
+    billing_period_start_date = datetime.date(year=2017, month=7, day=1)
+    billing_period_end_date = datetime.date(year=2017, month=12, day=31)
+
+    invoice = invoice_factory(
+        lease=lease,
+        total_amount=Decimal("123.45"),
+        billed_amount=Decimal("123.45"),
+        outstanding_amount=Decimal("123.45"),
+        recipient=contact1,
+        billing_period_start_date=billing_period_start_date,
+        billing_period_end_date=billing_period_end_date,
+    )
+
+    receivable_type = ReceivableType.objects.get(pk=1)
+
+    invoice_row_factory(
+        invoice=invoice,
+        tenant=tenant1,
+        receivable_type=receivable_type,
+        billing_period_start_date=billing_period_start_date,
+        billing_period_end_date=billing_period_end_date,
+        amount=Decimal("123.45"),
+    )
+
+    # Generate the invoice number beforehand
+    invoice.generate_number()
+
+    sales_order = SalesOrder()
+    set_constant_laske_values(sales_order)
+    InvoiceSalesOrderAdapter(
+        invoice=Invoice.objects.get(pk=invoice.id),
+        sales_order=sales_order,
+        receivable_type_rent=receivable_type,
+    ).set_values()
+
+    prefetched_invoice = Invoice.objects.prefetch_related(
+        *get_invoice_sales_order_prefetches()
+    ).get(pk=invoice.id)
+
+    # set_values asserts that it doesn't query the database when DEBUG is on
+    prefetched_sales_order = SalesOrder()
+    set_constant_laske_values(prefetched_sales_order)
+    InvoiceSalesOrderAdapter(
+        invoice=prefetched_invoice,
+        sales_order=prefetched_sales_order,
+        receivable_type_rent=receivable_type,
+    ).set_values()
+
+    assert prefetched_sales_order.to_xml_string() == sales_order.to_xml_string()
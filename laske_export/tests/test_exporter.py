@@ -1,12 +1,15 @@
 import datetime
 import json
+import os
 from decimal import Decimal
 
 import pytest
+from django.conf import settings
 from django.core import mail
+from lxml import etree
 
 from laske_export.enums import LaskeExportLogInvoiceStatus
-from laske_export.exporter import LaskeExporter
+from laske_export.exporter import LaskeExporter, SalesOrderXmlWriter
 from laske_export.management.commands import send_invoices_to_laske
 from laske_export.models import LaskeExportLog
 from leasing.enums import ContactType
@@ -202,3 +205,74 @@ def test_send_invoices_to_laske_command_handle_with_unexpected_error(
     assert "X-Priority" in export_mail.extra_headers
     assert export_mail.extra_headers["X-Priority"] == "1"  # High
     assert laske_exporter_send_with_error__error_message in export_mail.body
+
+
+@pytest.mark.django_db
+def test_export_files_are_marked_sent_one_by_one(invoice, invoice_factory, monkeypatch):
+    other_invoice = invoice_factory(
+        lease=invoice.lease,
+        total_amount=Decimal("123.45"),
+        billed_amount=Decimal("123.45"),
+        outstanding_amount=Decimal("123.45"),
+        recipient=invoice.recipient,
+        billing_period_start_date=invoice.billing_period_start_date,
+        billing_period_end_date=invoice.billing_period_end_date,
+    )
+    sent_filenames = []
+
+    def send(self, filename):
+        if sent_filenames:
+            raise Exception("Connection lost")
+        sent_filenames.append(filename)
+
+    monkeypatch.setattr(LaskeExporter, "send", send)
+
+    # Every sales order is written to its own file
+    with pytest.raises(Exception, match="Connection lost"):
+        LaskeExporter().export_invoices([invoice, other_invoice], max_file_size=1)
+
+    invoice.refresh_from_db()
+    other_invoice.refresh_from_db()
+    assert invoice.sent_to_sap_at is not None
+    assert other_invoice.sent_to_sap_at is None
+
+    (filename,) = sent_filenames
+    assert os.listdir(settings.LASKE_EXPORT_ROOT).count(filename) == 1
+    assert not [
+        name
+        for name in os.listdir(settings.LASKE_EXPORT_ROOT)
+        if name.startswith(os.path.splitext(filename)[0] + "_")
+    ]
+
+
+class FakeSalesOrder:
+    def __init__(self, text):
+        self.text = text
+
+    def to_etree(self):
+        element = etree.Element("SBO_SalesOrder")
+        etree.SubElement(element, "Reference").text = self.text
+
+        return element
+
+
+def test_sales_order_xml_writer_splits_files(tmp_path):
+    writer = SalesOrderXmlWriter(str(tmp_path), "MTIL_IN_TEST.xml", max_file_size=300)
+    for i in range(5):
+        writer.write(FakeSalesOrder("{:040}".format(i)))
+    writer.close()
+
+    assert len(writer.filenames) > 1
+    assert writer.filenames[0] == "MTIL_IN_TEST.xml"
+    assert writer.filenames[1] == "MTIL_IN_TEST_02.xml"
+
+    references = []
+    for filename in writer.filenames:
+        path = tmp_path / filename
+        assert path.stat().st_size <= 300
+
+        root = etree.parse(str(path)).getroot()
+        assert root.tag == "SBO_SalesOrderContainer"
+        references.extend(root.xpath("//Reference/text()"))
+
+    assert references == ["{:040}".format(i) for i in range(5)]
@@ -0,0 +1,100 @@
+import datetime
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+
+from laske_export.management.commands.get_payments_from_laske import (
+    Command,
+    parse_payment_line,
+)
+from laske_export.models import LaskePaymentsLog
+from leasing.enums import ContactType, InvoiceState
+from leasing.models.invoice import InvoicePayment
+
+
+def make_payment_line(invoice_number, payment_date, amount, filing_code="2881"):
+    (euros, cents) = "{:.2f}".format(amount).split(".")
+
+    line = "3" + " " * 20
+    line += payment_date.strftime("%y%m%d")
+    line += filing_code.ljust(16)
+    line += str(invoice_number).zfill(20)
+    line += " " * 14
+    line += euros.zfill(8) + cents
+
+    return line.ljust(90)
+
+
+def test_parse_payment_line():
+    payment_record = parse_payment_line(
+        make_payment_line(123, datetime.date(year=2020, month=3, day=31), 45.6)
+    )
+
+    assert payment_record.filing_code == "2881"
+    assert payment_record.invoice_number == 123
+    assert payment_record.amount == Decimal("45.60")
+    assert payment_record.payment_date == datetime.date(year=2020, month=3, day=31)
+
+    with pytest.raises(ValueError):
+        parse_payment_line(
+            make_payment_line(
+                123, datetime.date(year=2020, month=3, day=31), 45.6, "1231"
+            )
+        )
+
+
+@pytest.mark.django_db
+def test_import_payment_records(
+    django_db_setup, lease_factory, contact_factory, invoice_factory
+):
+    lease = lease_factory(
+        type_id=1, municipality_id=1, district_id=5, notice_period_id=1
+    )
+    contact = contact_factory(
+        first_name="First name", last_name="Last name", type=ContactType.PERSON
+    )
+    invoice = invoice_factory(
+        lease=lease,
+        number=1001,
+        total_amount=Decimal(100),
+        billed_amount=Decimal(100),
+        outstanding_amount=Decimal(100),
+        recipient=contact,
+        billing_period_start_date=datetime.date(year=2020, month=1, day=1),
+        billing_period_end_date=datetime.date(year=2020, month=12, day=31),
+    )
+    invoice.rows.create(
+        receivable_type_id=1,
+        amount=Decimal(100),
+        billing_period_start_date=datetime.date(year=2020, month=1, day=1),
+        billing_period_end_date=datetime.date(year=2020, month=12, day=31),
+    )
+    payment_date = datetime.date(year=2020, month=3, day=31)
+
+    payment_records = [
+        parse_payment_line(make_payment_line(1001, payment_date, 40)),
+        # Same payment twice in the same file
+        parse_payment_line(make_payment_line(1001, payment_date, 40)),
+        parse_payment_line(make_payment_line(1001, payment_date, 60)),
+        # Unknown invoice
+        parse_payment_line(make_payment_line(9999, payment_date, 10)),
+    ]
+    log_entry = LaskePaymentsLog.objects.create(
+        filename="MR_OUT_TEST", started_at=datetime.datetime.now()
+    )
+
+    command = Command(stdout=StringIO(), stderr=StringIO())
+    new_payments = command.import_payment_records(payment_records, log_entry)
+
+    assert len(new_payments) == 2
+    assert InvoicePayment.objects.filter(invoice=invoice).count() == 2
+    assert log_entry.payments.count() == 2
+
+    invoice.refresh_from_db()
+    assert invoice.outstanding_amount == Decimal(0)
+    assert invoice.state == InvoiceState.PAID
+
+    # Importing the same file again doesn't add the payments again
+    assert command.import_payment_records(payment_records, log_entry) == []
+    assert InvoicePayment.objects.filter(invoice=invoice).count() == 2
@@ -0,0 +1,73 @@
+from django.db.models import Prefetch
+
+from leasing.calculation.index import get_index_table
+from leasing.models import (
+    ContractRent,
+    FixedInitialYearRent,
+    Rent,
+    RentAdjustment,
+    RentDueDate,
+)
+
+
+def get_rent_calculation_prefetches(prefix=""):
+    """Returns the Prefetch objects needed by the rent calculation
+
+    prefix is the lookup path to the lease (e.g. "lease__") when the
+    rents are prefetched through another model."""
+    return [
+        Prefetch(prefix + "rents", queryset=Rent.objects.order_by("id")),
+        Prefetch(
+            prefix + "rents__due_dates", queryset=RentDueDate.objects.order_by("id")
+        ),
+        Prefetch(
+            prefix + "rents__contract_rents",
+            queryset=ContractRent.objects.select_related("intended_use").order_by("id"),
+        ),
+        Prefetch(
+            prefix + "rents__fixed_initial_year_rents",
+            queryset=FixedInitialYearRent.objects.select_related(
+                "intended_use"
+            ).order_by("id"),
+        ),
+        Prefetch(
+            prefix + "rents__rent_adjustments",
+            queryset=RentAdjustment.objects.select_related("intended_use").order_by(
+                "id"
+            ),
+        ),
+    ]
+
+
+def prefetch_for_rent_calculation(leases):
+    """Adds the prefetches needed by the rent calculation to a lease queryset
+
+    The rents, due dates, contract rents, fixed initial year rents and
+    rent adjustments of all of the leases are fetched with one query
+    each. The rent calculation methods (e.g. Rent.get_amount_for_date_range)
+    use the prefetched items instead of querying the database again
+    for every rent and date range."""
+    return leases.select_related("type").prefetch_related(
+        *get_rent_calculation_prefetches()
+    )
+
+
+def calculate_rent_amounts_for_period(
+    leases, date_range_start, date_range_end, index_table=None
+):
+    """Calculates the rent amounts of many leases at once
+
+    Returns a dict of {lease: CalculationResult}. The results are the same
+    as from Lease.calculate_rent_amount_for_period, but the rents and the
+    indexes are loaded with a fixed number of queries regardless of the
+    number of leases."""
+    if index_table is None:
+        index_table = get_index_table()
+
+    results = {}
+    for lease in prefetch_for_rent_calculation(leases):
+        results[lease] = lease.calculate_rent_amount_for_period(
+            date_range_start, date_range_end, index_table=index_table
+        )
+
+    return results
@@ -1,7 +1,9 @@
+from bisect import bisect_right
 from decimal import ROUND_HALF_UP, Decimal
 
 from django.utils.translation import ugettext_lazy as _
 
+from leasing.calculation.profiling import profile_stage
 from leasing.calculation.result import CalculationNote
 from leasing.enums import IndexType
 
@@ -12,6 +14,74 @@ def int_floor(value, precision):
     return value // precision * precision
 
 
+_index_table = None
+
+
+class IndexTable:
+    """In-memory lookup table of the indexes and the legacy index numbers
+
+    Holds the index numbers by year and month and the 1914 and 1938
+    legacy numbers by index so that the rent calculation doesn't
+    have to query them separately for every billing period."""
+
+    def __init__(self, indexes, legacy_indexes, version=None):
+        self.version = version
+        self._indexes = {(index.year, index.month): index for index in indexes}
+        self.year_average_indexes = sorted(
+            [index for index in self._indexes.values() if index.month is None],
+            key=lambda index: index.year,
+        )
+        self._years = [index.year for index in self.year_average_indexes]
+        self._legacy_indexes = {
+            legacy_index.index_id: legacy_index for legacy_index in legacy_indexes
+        }
+
+    @classmethod
+    def load(cls, version=None):
+        from leasing.models.rent import Index, LegacyIndex
+
+        return cls(Index.objects.all(), LegacyIndex.objects.all(), version=version)
+
+    def get(self, year, month=None):
+        return self._indexes.get((year, month))
+
+    def get_latest_for_year(self, year):
+        """Returns the latest year average index for year
+
+        Same as IndexManager.get_latest_for_year"""
+        position = bisect_right(self._years, year - 1)
+
+        if not position:
+            return None
+
+        return self.year_average_indexes[position - 1]
+
+    def get_legacy_index(self, index):
+        from leasing.models.rent import LegacyIndex
+
+        try:
+            return self._legacy_indexes[index.id]
+        except KeyError:
+            raise LegacyIndex.DoesNotExist("LegacyIndex matching query does not exist.")
+
+
+def get_index_table():
+    """Returns the index table of this process
+
+    The table is loaded once per process and reloaded only when the
+    indexes change (see leasing.models.table_version.get_table_version)."""
+    global _index_table
+    from leasing.models.rent import Index, LegacyIndex
+    from leasing.models.table_version import get_table_version
+
+    version = get_table_version(Index, LegacyIndex)
+
+    if _index_table is None or _index_table.version != version:
+        _index_table = IndexTable.load(version=version)
+
+    return _index_table
+
+
 class IndexCalculation:
     def __init__(
         self,
@@ -21,6 +91,7 @@ class IndexCalculation:
         precision=None,
         x_value=None,
         y_value=None,
+        index_table=None,
     ):
         self.explanation_items = []
         self.notes = []
@@ -30,6 +101,7 @@ class IndexCalculation:
         self.precision = precision
         self.x_value = x_value
         self.y_value = y_value
+        self.index_table = index_table
 
     def _add_ratio_explanation(self, ratio):
         ratio_explanation_item = ExplanationItem(
@@ -120,17 +192,20 @@ class IndexCalculation:
 
         return ratio * self.amount
 
+    def get_legacy_index(self):
+        index_table = self.index_table
+        if index_table is None:
+            index_table = get_index_table()
+
+        return index_table.get_legacy_index(self.index)
+
     def get_index_value(self):
         # TODO: error check
         if self.index.__class__ and self.index.__class__.__name__ == "Index":
             if self.index_type == IndexType.TYPE_1:
-                from leasing.models.rent import LegacyIndex
-
-                index_value = LegacyIndex.objects.get(index=self.index).number_1914
+                index_value = self.get_legacy_index().number_1914
             elif self.index_type == IndexType.TYPE_2:
-                from leasing.models.rent import LegacyIndex
-
-                index_value = LegacyIndex.objects.get(index=self.index).number_1938
+                index_value = self.get_legacy_index().number_1938
             else:
                 index_value = self.index.number
         else:
@@ -138,6 +213,7 @@ class IndexCalculation:
 
         return index_value
 
+    @profile_stage("index_calculation")
     def calculate(self):  # NOQA
         index_value = self.get_index_value()
 
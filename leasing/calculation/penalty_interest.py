@@ -0,0 +1,165 @@
+import calendar
+import datetime
+from bisect import bisect_left
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.utils import timezone
+
+from leasing.models.utils import get_next_business_days, get_range_overlap
+
+
+class InterestRateTable:
+    """The interest rates sorted by their start date
+
+    Lets the penalty interest of many invoices to be calculated with
+    the interest rates loaded from the database only once."""
+
+    def __init__(self, interest_rates):
+        self.interest_rates = sorted(interest_rates, key=lambda x: x.start_date)
+        self._start_dates = [
+            interest_rate.start_date for interest_rate in self.interest_rates
+        ]
+
+    @classmethod
+    def load(cls, start_year, end_year):
+        from leasing.models import InterestRate
+
+        return cls(
+            InterestRate.objects.filter(
+                start_date__year__gte=start_year, start_date__year__lte=end_year
+            )
+        )
+
+    def get_for_years(self, start_year, end_year):
+        """Returns the interest rates starting in the years between
+        start_year and end_year (inclusive) ordered by the start date"""
+        if start_year > end_year:
+            return []
+
+        first = bisect_left(
+            self._start_dates, datetime.date(year=start_year, month=1, day=1)
+        )
+        last = bisect_left(
+            self._start_dates, datetime.date(year=end_year + 1, month=1, day=1)
+        )
+
+        return self.interest_rates[first:last]
+
+
+def calculate_penalty_interest_with_rates(
+    outstanding_amount, interest_start_date, interest_end_date, interest_rate_table
+):
+    penalty_interest_data = {
+        "interest_start_date": interest_start_date,
+        "interest_end_date": interest_end_date,
+        "outstanding_amount": outstanding_amount,
+        "total_interest_amount": Decimal(0),
+        "interest_periods": [],
+    }
+
+    total_interest_amount = Decimal(0)
+
+    for interest_rate in interest_rate_table.get_for_years(
+        interest_start_date.year, interest_end_date.year
+    ):
+        overlap = get_range_overlap(
+            interest_rate.start_date,
+            interest_rate.end_date,
+            interest_start_date,
+            interest_end_date,
+        )
+        if not overlap or not overlap[0] or not overlap[1]:
+            continue
+
+        days_between = (overlap[1] - overlap[0]).days + 1  # Inclusive
+
+        # TODO: which divisor to use
+        # divisor = 360
+        if calendar.isleap(interest_rate.start_date.year):
+            divisor = 366
+        else:
+            divisor = 365
+
+        interest_amount = (
+            outstanding_amount
+            * (interest_rate.penalty_rate / 100)
+            / divisor
+            * days_between
+        )
+
+        penalty_interest_data["interest_periods"].append(
+            {
+                "start_date": overlap[0],
+                "end_date": overlap[1],
+                "penalty_rate": interest_rate.penalty_rate,
+                "interest_amount": interest_amount,
+            }
+        )
+
+        total_interest_amount += interest_amount
+
+    penalty_interest_data["total_interest_amount"] = total_interest_amount.quantize(
+        Decimal(".01"), rounding=ROUND_HALF_UP
+    )
+
+    return penalty_interest_data
+
+
+def calculate_penalty_interests(invoices, calculation_date=None):
+    """Calculates the penalty interest of many invoices at once
+
+    Returns a dict of {invoice: penalty interest data}. The data is the same
+    as from Invoice.calculate_penalty_interest, but the interest rates and
+    the bank holidays are loaded only once for all of the invoices."""
+    if not calculation_date:
+        calculation_date = timezone.now().date()
+
+    results = {}
+    invoices_with_interest = []
+    for invoice in invoices:
+        if not invoice.outstanding_amount:
+            results[invoice] = {
+                "interest_start_date": None,
+                "interest_end_date": None,
+                "outstanding_amount": invoice.outstanding_amount,
+                "total_interest_amount": Decimal(0),
+                "interest_periods": [],
+            }
+        else:
+            invoices_with_interest.append(invoice)
+
+    if not invoices_with_interest:
+        return results
+
+    interest_start_dates = get_next_business_days(
+        [invoice.due_date for invoice in invoices_with_interest]
+    )
+    interest_rate_table = InterestRateTable.load(
+        min(interest_start_dates).year, calculation_date.year
+    )
+
+    for (invoice, interest_start_date) in zip(
+        invoices_with_interest, interest_start_dates
+    ):
+        results[invoice] = calculate_penalty_interest_with_rates(
+            invoice.outstanding_amount,
+            interest_start_date,
+            calculation_date,
+            interest_rate_table,
+        )
+
+    return results
+
+
+def calculate_accrued_penalty_interest(invoices, calculation_date=None):
+    """Returns the total penalty interest accrued on the invoices
+    by the calculation date"""
+    return sum(
+        (
+            penalty_interest_data["total_interest_amount"]
+            for penalty_interest_data in calculate_penalty_interests(
+                invoices, calculation_date=calculation_date
+            ).values()
+        ),
+        Decimal(0),
+    )
@@ -0,0 +1,177 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+
+from django.db import connection
+
+_local = threading.local()
+
+
+class CalculationStageProfile:
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.time = 0.0
+        self.query_count = 0
+        self.query_time = 0.0
+
+    @property
+    def python_time(self):
+        return max(0.0, self.time - self.query_time)
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "time": self.time,
+            "query_count": self.query_count,
+            "query_time": self.query_time,
+            "python_time": self.python_time,
+        }
+
+
+class CalculationProfile:
+    """Query counts, query time and Python time of the calculation stages
+
+    The numbers of a stage include the stages called inside it."""
+
+    def __init__(self):
+        self.stages = OrderedDict()
+        self.query_count = 0
+        self.query_time = 0.0
+        self.time = 0.0
+
+    def get_stage(self, name):
+        if name not in self.stages:
+            self.stages[name] = CalculationStageProfile(name)
+
+        return self.stages[name]
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.query_time += time.perf_counter() - start
+
+    def as_dict(self):
+        return {
+            "time": self.time,
+            "query_count": self.query_count,
+            "query_time": self.query_time,
+            "stages": {name: stage.as_dict() for (name, stage) in self.stages.items()},
+        }
+
+    def to_header_value(self):
+        """Returns the profile in the Server-Timing header like format
+        used in the X-Calculation-Profile header"""
+        items = [
+            "total;queries={};query_ms={:.1f};ms={:.1f}".format(
+                self.query_count, self.query_time * 1000, self.time * 1000
+            )
+        ]
+        for stage in self.stages.values():
+            items.append(
+                "{};count={};queries={};query_ms={:.1f};python_ms={:.1f}".format(
+                    stage.name,
+                    stage.count,
+                    stage.query_count,
+                    stage.query_time * 1000,
+                    stage.python_time * 1000,
+                )
+            )
+
+        return ", ".join(items)
+
+    def __str__(self):
+        lines = [
+            "Total: {:.1f} ms, {} queries ({:.1f} ms)".format(
+                self.time * 1000, self.query_count, self.query_time * 1000
+            )
+        ]
+        for stage in self.stages.values():
+            lines.append(
+                "  {}: {} calls, {} queries ({:.1f} ms), python {:.1f} ms".format(
+                    stage.name,
+                    stage.count,
+                    stage.query_count,
+                    stage.query_time * 1000,
+                    stage.python_time * 1000,
+                )
+            )
+
+        return "\n".join(lines)
+
+
+def get_active_profile():
+    return getattr(_local, "profile", None)
+
+
+@contextmanager
+def profile_calculation():
+    """Profiles the calculation stages run inside the block
+
+    Usage:
+        with profile_calculation() as profile:
+            lease.determine_payable_rents_and_periods(start_date, end_date)
+        print(profile)
+
+    Only the queries made with the default database connection in the
+    current thread are counted."""
+    previous_profile = get_active_profile()
+    profile = CalculationProfile()
+    _local.profile = profile
+
+    start = time.perf_counter()
+    try:
+        with connection.execute_wrapper(profile.execute_wrapper):
+            yield profile
+    finally:
+        profile.time = time.perf_counter() - start
+        _local.profile = previous_profile
+
+
+class profile_stage:  # noqa: N801
+    """Records the time and the queries of a calculation stage to the
+    active profile. Can be used as a decorator or as a context manager.
+
+    Does nothing if there is no active profile (see profile_calculation)."""
+
+    def __init__(self, name):
+        self.name = name
+        self._profile = None
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if get_active_profile() is None:
+                return func(*args, **kwargs)
+
+            with profile_stage(self.name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    def __enter__(self):
+        self._profile = get_active_profile()
+        if self._profile is not None:
+            self._start = time.perf_counter()
+            self._query_count = self._profile.query_count
+            self._query_time = self._profile.query_time
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._profile is None:
+            return False
+
+        stage = self._profile.get_stage(self.name)
+        stage.count += 1
+        stage.time += time.perf_counter() - self._start
+        stage.query_count += self._profile.query_count - self._query_count
+        stage.query_time += self._profile.query_time - self._query_time
+        self._profile = None
+
+        return False
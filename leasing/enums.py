@@ -603,3 +603,20 @@ class PlanUnitStatus(Enum):
     class Labels:
         PRESENT = pgettext_lazy("Plan Unit Status", "Present")
         PENDING = pgettext_lazy("Plan Unit Status", "Pending")
+
+
+class ReportJobState(Enum):
+    """
+    In Finnish: Raporttiajon tila
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    class Labels:
+        QUEUED = pgettext_lazy("Report job state", "Queued")
+        RUNNING = pgettext_lazy("Report job state", "Running")
+        SUCCEEDED = pgettext_lazy("Report job state", "Succeeded")
+        FAILED = pgettext_lazy("Report job state", "Failed")
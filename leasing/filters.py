@@ -45,6 +45,26 @@ class CoalesceOrderingFilter(OrderingFilter):
         return queryset
 
 
+class SearchRankOrderingFilter(OrderingFilter):
+    """Ordering filter that orders the results of a free text search by relevance
+
+    If the queryset is annotated with search_rank and the ordering is not
+    given in the query parameters, the results are ordered by the rank
+    first and then by the default ordering of the view.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+
+        if (
+            not request.query_params.get(self.ordering_param)
+            and "search_rank" in queryset.query.annotations
+        ):
+            return ["-search_rank"] + list(ordering or [])
+
+        return ordering
+
+
 class CollectionCourtDecisionFilter(FilterSet):
     lease = filters.NumberFilter()
 
@@ -0,0 +1,41 @@
+import datetime
+
+from dateutil import parser
+from django.core.management.base import BaseCommand
+
+from leasing.calculation.penalty_interest import calculate_accrued_penalty_interest
+from leasing.enums import InvoiceState, InvoiceType
+from leasing.models import Invoice
+
+
+class Command(BaseCommand):
+    help = "Calculates the penalty interest accrued on all of the open invoices"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            type=str,
+            help="Calculate the interest until this date (default: today)",
+        )
+
+    def handle(self, *args, **options):
+        calculation_date = datetime.date.today()
+        if options["date"]:
+            calculation_date = parser.parse(options["date"]).date()
+
+        invoices = Invoice.objects.filter(
+            type=InvoiceType.CHARGE,
+            state=InvoiceState.OPEN,
+            outstanding_amount__gt=0,
+            due_date__lt=calculation_date,
+        ).only("id", "due_date", "outstanding_amount")
+
+        accrued_interest = calculate_accrued_penalty_interest(
+            invoices, calculation_date=calculation_date
+        )
+
+        self.stdout.write(
+            "Accrued penalty interest on {} open invoices on {}: {} euro".format(
+                len(invoices), calculation_date, accrued_interest
+            )
+        )
@@ -6,6 +6,9 @@ from django.core.management.base import BaseCommand
 from django.db.models import Q
 from django.utils import timezone
 
+from leasing.calculation.bulk import prefetch_for_rent_calculation
+from leasing.calculation.index import get_index_table
+
 # from leasing.enums import IndexType, InvoiceState, InvoiceType, LeaseState, RentCycle, RentType
 # from leasing.models import Lease, PayableRent, ReceivableType
 from leasing.enums import LeaseState, RentCycle, RentType
@@ -23,11 +26,12 @@ class Command(BaseCommand):
     def handle(self, *args, **options):  # NOQA
         today = timezone.now().date()
 
-        leases = (
+        leases = prefetch_for_rent_calculation(
             Lease.objects.filter(state=LeaseState.LEASE)
             .filter(Q(end_date__isnull=True) | Q(end_date__gte=today))
             .order_by("start_date")
         )
+        index_table = get_index_table()
 
         workbook = xlsxwriter.Workbook("compare_payable_rents.xlsx")
         worksheet = workbook.add_worksheet()
@@ -61,7 +65,8 @@ class Command(BaseCommand):
         for lease in leases:
             self.stdout.write("Lease #{} {} ".format(lease.id, lease))
 
-            rent = lease.rents.first()
+            # The rents are prefetched in id order
+            rent = next(iter(lease.rents.all()), None)
             if not rent:
                 self.stdout.write(" No rent. Skipping")
                 continue
@@ -92,9 +97,13 @@ class Command(BaseCommand):
                 #     continue
 
                 try:
-                    calculated_amount = rent.get_amount_for_date_range(
-                        year_start, year_end
-                    ).quantize(Decimal(".01"), rounding=ROUND_HALF_UP)
+                    calculated_amount = (
+                        rent.get_amount_for_date_range(
+                            year_start, year_end, index_table=index_table
+                        )
+                        .get_total_amount()
+                        .quantize(Decimal(".01"), rounding=ROUND_HALF_UP)
+                    )
                 except AssertionError:
                     self.stdout.write(" Assertion error")
                     worksheet.write(row, 0, lease.get_identifier_string())
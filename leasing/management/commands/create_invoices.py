@@ -1,15 +1,211 @@
 import datetime
+import heapq
+import json
+import multiprocessing
+import os
+from collections import Counter
 from decimal import Decimal
+from functools import partial
 
 from dateutil.relativedelta import relativedelta
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
+from django.db import connections, transaction
 from django.db.models import Q
 
+from leasing.calculation.bulk import prefetch_for_rent_calculation
+from leasing.calculation.index import get_index_table
+from leasing.calculation.profiling import profile_calculation
 from leasing.enums import InvoiceState
 from leasing.models import Invoice, Lease
+from leasing.models.auditlog import log_created_objects, update_audit_log_object_owners
 from leasing.models.invoice import InvoiceRow, InvoiceSet
 
+PROFILE_SLOWEST_COUNT = 10
+
+
+def _get_invoice_key(invoice_data):
+    """Returns the fields that are used to find an already existing invoice"""
+    return (
+        invoice_data["lease"].id,
+        invoice_data["type"],
+        invoice_data["recipient"].id,
+        invoice_data["due_date"],
+        invoice_data["billing_period_start_date"],
+        invoice_data["billing_period_end_date"],
+        invoice_data["total_amount"],
+        invoice_data["billed_amount"],
+        invoice_data["state"],
+        invoice_data["invoiceset"].id if invoice_data["invoiceset"] else None,
+    )
+
+
+def create_invoices_for_shard(lease_ids, today, start_date, end_date):  # noqa: C901
+    """Creates the invoices for the leases in one shard
+
+    All of the invoices and rows of the shard are created in one transaction
+    using bulk_create. Returns the lease ids, the number of created invoices
+    and the output messages, because the worker processes can't write to the
+    command output themselves."""
+    messages = []
+    invoices = []
+    invoice_row_data_by_invoice = []
+
+    index_table = get_index_table()
+    leases = prefetch_for_rent_calculation(
+        Lease.objects.filter(id__in=lease_ids).order_by("id")
+    )
+
+    with transaction.atomic():
+        # Find the already existing invoices of the shard with one query
+        # instead of checking the invoices one by one
+        existing_invoices = Counter(
+            (
+                invoice.lease_id,
+                invoice.type,
+                invoice.recipient_id,
+                invoice.due_date,
+                invoice.billing_period_start_date,
+                invoice.billing_period_end_date,
+                invoice.total_amount,
+                invoice.billed_amount,
+                invoice.state,
+                invoice.invoiceset_id,
+            )
+            for invoice in Invoice.objects.filter(
+                lease_id__in=lease_ids,
+                generated=True,
+                due_date__range=(start_date, end_date),
+            )
+        )
+
+        for lease in leases:
+            period_rents = lease.determine_payable_rents_and_periods(
+                start_date, end_date, index_table=index_table
+            )
+
+            if not period_rents:
+                continue
+
+            messages.append("Lease #{} {}:".format(lease.id, lease.identifier))
+            for period_invoice_data in lease.calculate_invoices(period_rents):
+                invoiceset = None
+                if len(period_invoice_data) > 1:
+                    invoiceset, created = InvoiceSet.objects.get_or_create(
+                        lease=lease,
+                        billing_period_start_date=period_invoice_data[0].get(
+                            "billing_period_start_date"
+                        ),
+                        billing_period_end_date=period_invoice_data[0].get(
+                            "billing_period_end_date"
+                        ),
+                    )
+                    if not created:
+                        messages.append("  Invoiceset already exists.")
+
+                for invoice_data in period_invoice_data:
+                    invoice_data.pop("explanations")
+                    invoice_data.pop("calculation_result")
+                    invoice_row_data = invoice_data.pop("rows")
+
+                    invoice_data["generated"] = True
+                    invoice_data["invoiceset"] = invoiceset
+
+                    existing_count = existing_invoices[_get_invoice_key(invoice_data)]
+                    if existing_count == 1:
+                        messages.append(
+                            "Lease #{} {}: Invoice already exists.".format(
+                                lease.id, lease.identifier
+                            )
+                        )
+                        continue
+                    elif existing_count > 1:
+                        messages.append(
+                            "Lease #{} {}: Warning! Found multiple invoices. Not creating a new invoice.".format(
+                                lease.id, lease.identifier
+                            )
+                        )
+                        continue
+
+                    invoice_data["invoicing_date"] = today
+                    invoice_data["outstanding_amount"] = invoice_data["billed_amount"]
+                    # ensure 0€ total invoices get marked as PAID
+                    if invoice_data["outstanding_amount"] == Decimal(0):
+                        invoice_data["state"] = InvoiceState.PAID
+
+                    invoice = Invoice(**invoice_data)
+                    invoices.append(invoice)
+                    invoice_row_data_by_invoice.append((invoice, invoice_row_data))
+
+        Invoice.objects.bulk_create(invoices)
+
+        # The rows can be created only after the invoices have their ids
+        invoice_rows = InvoiceRow.objects.bulk_create(
+            [
+                InvoiceRow(invoice=invoice, **invoice_row_datum)
+                for invoice, invoice_row_data in invoice_row_data_by_invoice
+                for invoice_row_datum in invoice_row_data
+            ]
+        )
+
+        # bulk_create doesn't send the signals of the audit log
+        for objects in (invoices, invoice_rows):
+            log_created_objects(objects)
+            update_audit_log_object_owners(objects)
+
+    for invoice in invoices:
+        messages.append(
+            "  Invoice created. Lease #{} Invoice id {}.".format(
+                invoice.lease_id, invoice.id
+            )
+        )
+
+    return lease_ids, len(invoices), messages
+
+
+def _close_db_connections():
+    # The worker processes must not share the database connections
+    # of the parent process
+    connections.close_all()
+
+
+class InvoicingCheckpoint:
+    """Keeps track of the leases whose invoices have already been created
+
+    The ids of the finished leases are saved to a JSON file after every
+    shard so that an interrupted run can continue where it stopped. The
+    checkpoint is only used for the same billing month."""
+
+    def __init__(self, filename, start_date):
+        self.filename = filename
+        self.start_date = start_date
+        self.finished_lease_ids = set()
+
+        if not filename or not os.path.exists(filename):
+            return
+
+        with open(filename) as fp:
+            data = json.load(fp)
+
+        if data.get("start_date") == start_date.isoformat():
+            self.finished_lease_ids = set(data.get("finished_lease_ids", []))
+
+    def mark_finished(self, lease_ids):
+        self.finished_lease_ids.update(lease_ids)
+
+        if not self.filename:
+            return
+
+        tmp_filename = "{}.tmp".format(self.filename)
+        with open(tmp_filename, "w") as fp:
+            json.dump(
+                {
+                    "start_date": self.start_date.isoformat(),
+                    "finished_lease_ids": sorted(self.finished_lease_ids),
+                },
+                fp,
+            )
+        os.replace(tmp_filename, self.filename)
+
 
 class Command(BaseCommand):
     help = "A Bogus Invoice creator"
@@ -18,6 +214,30 @@ class Command(BaseCommand):
         parser.add_argument(
             "override", nargs="?", type=bool
         )  # force run even if it's not the 1st of the month
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=0,
+            help="Split the leases into shards and create the invoices for "
+            "them using this many worker processes",
+        )
+        parser.add_argument(
+            "--shard-size",
+            type=int,
+            default=200,
+            help="Number of leases in one shard (default 200)",
+        )
+        parser.add_argument(
+            "--checkpoint-file",
+            help="File to save the progress to when using --workers. "
+            "An interrupted run continues from the saved progress.",
+        )
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help="Profile the rent and invoice calculations of every lease and "
+            "print the slowest leases. Can't be used with --workers.",
+        )
 
     def handle(self, *args, **options):  # noqa: C901 TODO
         override = options.get("override", False)
@@ -47,18 +267,36 @@ class Command(BaseCommand):
             "Found {} leases, starting to create invoices".format(leases.count())
         )
 
-        invoice_count = 0
+        if options.get("workers"):
+            if options.get("profile"):
+                raise CommandError("--profile can't be used with --workers")
 
-        for lease in leases:
-            period_rents = lease.determine_payable_rents_and_periods(
-                start_of_next_month, end_of_next_month
+            self.create_invoices_in_shards(
+                leases, today, start_of_next_month, end_of_next_month, options
             )
+            return
 
-            if not period_rents:
+        invoice_count = 0
+        index_table = get_index_table()
+        lease_profiles = []
+
+        for lease in prefetch_for_rent_calculation(leases):
+            if options.get("profile"):
+                with profile_calculation() as profile:
+                    invoices_data = self.calculate_lease_invoices(
+                        lease, start_of_next_month, end_of_next_month, index_table
+                    )
+                lease_profiles.append((profile.time, lease.id, lease, profile))
+            else:
+                invoices_data = self.calculate_lease_invoices(
+                    lease, start_of_next_month, end_of_next_month, index_table
+                )
+
+            if invoices_data is None:
                 continue
 
             self.stdout.write("Lease #{} {}:".format(lease.id, lease.identifier))
-            for period_invoice_data in lease.calculate_invoices(period_rents):
+            for period_invoice_data in invoices_data:
                 invoiceset = None
                 if len(period_invoice_data) > 1:
                     billing_period_start_date = period_invoice_data[0].get(
@@ -131,3 +369,85 @@ class Command(BaseCommand):
             self.stdout.write("")
 
         self.stdout.write("{} invoices created".format(invoice_count))
+
+        if lease_profiles:
+            self.write_lease_profiles(lease_profiles)
+
+    def calculate_lease_invoices(self, lease, start_date, end_date, index_table):
+        """Returns the invoice data for the lease or None if there
+        are no rents to invoice"""
+        period_rents = lease.determine_payable_rents_and_periods(
+            start_date, end_date, index_table=index_table
+        )
+
+        if not period_rents:
+            return None
+
+        return lease.calculate_invoices(period_rents)
+
+    def write_lease_profiles(self, lease_profiles, count=PROFILE_SLOWEST_COUNT):
+        self.stdout.write(
+            "Calculation profiles of the {} slowest leases:".format(count)
+        )
+        for (_time, _lease_id, lease, profile) in heapq.nlargest(count, lease_profiles):
+            self.stdout.write("Lease #{} {}:".format(lease.id, lease.identifier))
+            self.stdout.write(str(profile))
+
+    def create_invoices_in_shards(self, leases, today, start_date, end_date, options):
+        checkpoint = InvoicingCheckpoint(options.get("checkpoint_file"), start_date)
+        if checkpoint.finished_lease_ids:
+            self.stdout.write(
+                "Continuing from a checkpoint. {} leases already done.".format(
+                    len(checkpoint.finished_lease_ids)
+                )
+            )
+
+        lease_ids = [
+            lease_id
+            for lease_id in leases.order_by("id").values_list("id", flat=True)
+            if lease_id not in checkpoint.finished_lease_ids
+        ]
+        shard_size = max(1, options["shard_size"])
+        shards = [
+            lease_ids[i : i + shard_size] for i in range(0, len(lease_ids), shard_size)
+        ]
+
+        self.stdout.write(
+            "Creating invoices for {} leases in {} shards using {} workers".format(
+                len(lease_ids), len(shards), options["workers"]
+            )
+        )
+
+        create_shard = partial(
+            create_invoices_for_shard,
+            today=today,
+            start_date=start_date,
+            end_date=end_date,
+        )
+
+        if options["workers"] == 1:
+            invoice_count = self._handle_shard_results(
+                map(create_shard, shards), checkpoint
+            )
+        else:
+            _close_db_connections()
+            with multiprocessing.Pool(
+                options["workers"], initializer=_close_db_connections
+            ) as pool:
+                invoice_count = self._handle_shard_results(
+                    pool.imap_unordered(create_shard, shards), checkpoint
+                )
+
+        self.stdout.write("{} invoices created".format(invoice_count))
+
+    def _handle_shard_results(self, results, checkpoint):
+        invoice_count = 0
+
+        for lease_ids, shard_invoice_count, messages in results:
+            for message in messages:
+                self.stdout.write(message)
+
+            checkpoint.mark_finished(lease_ids)
+            invoice_count += shard_invoice_count
+
+        return invoice_count
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from leasing.models import ReportJob
+
+
+class Command(BaseCommand):
+    help = "Deletes the report jobs whose results have expired and their result files"
+
+    def handle(self, *args, **options):
+        count = 0
+
+        for job in ReportJob.objects.filter(expires_at__lte=timezone.now()).iterator():
+            if job.result:
+                job.result.delete(save=False)
+            job.delete()
+            count += 1
+
+        self.stdout.write("Deleted {} expired report results".format(count))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from leasing.models import AuditLogObjectOwner
+from leasing.models.auditlog import (
+    create_audit_log_object_owners,
+    get_audit_log_owner_sources,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the owners of the audited objects used to find the audit log "
+        "entries of a lease or a contact"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Remove the existing owners before creating them again",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["clear"]:
+                AuditLogObjectOwner.objects.all().delete()
+
+            count = create_audit_log_object_owners(get_audit_log_owner_sources())
+
+        self.stdout.write("Found {} owners of the audited objects".format(count))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from leasing.models import Lease
+from leasing.models.lease_search import update_lease_search_documents
+
+
+class Command(BaseCommand):
+    help = "Recreates the search documents of the leases"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="The number of leases updated at a time (default 1000)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        lease_ids = list(Lease.all_objects.order_by("id").values_list("id", flat=True))
+        for i in range(0, len(lease_ids), batch_size):
+            update_lease_search_documents(lease_ids[i : i + batch_size])
+
+        self.stdout.write(
+            "Updated the search documents of {} leases".format(len(lease_ids))
+        )
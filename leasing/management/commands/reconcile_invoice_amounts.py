@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+
+from leasing.models import Invoice
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks the saved amounts and states of the invoices against amounts "
+        "calculated from the rows, payments and credit notes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Save the calculated amounts to the invoices that differ",
+        )
+        parser.add_argument(
+            "--lease",
+            type=int,
+            help="Check only the invoices of the lease with this id",
+        )
+
+    def handle(self, *args, **options):
+        invoices = Invoice.objects.select_related("invoiceset").order_by("id")
+        if options["lease"]:
+            invoices = invoices.filter(lease_id=options["lease"])
+
+        checked_count = 0
+        mismatch_count = 0
+        for invoice in invoices.iterator():
+            checked_count += 1
+            amounts = invoice.calculate_amounts()
+
+            mismatches = [
+                "{}: saved {} calculated {}".format(
+                    field_name, getattr(invoice, field_name), value
+                )
+                for (field_name, value) in amounts.items()
+                if getattr(invoice, field_name) != value
+            ]
+            if not mismatches:
+                continue
+
+            mismatch_count += 1
+            self.stdout.write(
+                "Invoice #{} (id {}): {}".format(
+                    invoice.number, invoice.id, ", ".join(mismatches)
+                )
+            )
+
+            if options["fix"]:
+                invoice.update_amounts()
+
+        self.stdout.write(
+            "Checked {} invoices, {} differ from the calculated amounts{}".format(
+                checked_count, mismatch_count, " (fixed)" if options["fix"] else ""
+            )
+        )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from leasing.models.area_overlap import get_area_overlaps, update_overlapping_leases
+
+
+class Command(BaseCommand):
+    help = (
+        "Finds the leases whose lease areas intersect with the area notes and "
+        "the basis of rents"
+    )
+
+    def handle(self, *args, **options):
+        for (overlap_model, model, field_name) in get_area_overlaps():
+            count = 0
+            for instance in model.objects.filter(geometry__isnull=False).iterator():
+                update_overlapping_leases(instance)
+                count += 1
+
+            self.stdout.write(
+                "Updated the overlapping leases of {} {}".format(
+                    count, model._meta.verbose_name_plural
+                )
+            )
@@ -0,0 +1,79 @@
+# Generated by Django 2.2.13 on 2026-10-18 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("leasing", "0026_land_use_agreement_estate_remove_unique"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuditLogObjectOwner",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_id", models.BigIntegerField(verbose_name="Object id")),
+                (
+                    "contact",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="leasing.Contact",
+                        verbose_name="Contact",
+                    ),
+                ),
+                (
+                    "content_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="contenttypes.ContentType",
+                        verbose_name="Content type",
+                    ),
+                ),
+                (
+                    "lease",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="leasing.Lease",
+                        verbose_name="Lease",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Audit log object owner",
+                "verbose_name_plural": "Audit log object owners",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="auditlogobjectowner",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(lease__isnull=False),
+                fields=("lease", "content_type", "object_id"),
+                name="leasing_auditlogobjectowner_lease_object_key",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="auditlogobjectowner",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(contact__isnull=False),
+                fields=("contact", "content_type", "object_id"),
+                name="leasing_auditlogobjectowner_contact_object_key",
+            ),
+        ),
+    ]
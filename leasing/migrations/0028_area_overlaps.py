@@ -0,0 +1,100 @@
+# Generated by Django 2.2.13 on 2026-10-18 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leasing", "0027_auditlogobjectowner"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeaseAreaNoteOverlap",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "area_note",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="leasing.AreaNote",
+                        verbose_name="Area note",
+                    ),
+                ),
+                (
+                    "lease",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="leasing.Lease",
+                        verbose_name="Lease",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Lease area note overlap",
+                "verbose_name_plural": "Lease area note overlaps",
+            },
+        ),
+        migrations.CreateModel(
+            name="LeaseBasisOfRentOverlap",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "basis_of_rent",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="leasing.BasisOfRent",
+                        verbose_name="Basis of rent",
+                    ),
+                ),
+                (
+                    "lease",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="leasing.Lease",
+                        verbose_name="Lease",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Lease basis of rent overlap",
+                "verbose_name_plural": "Lease basis of rent overlaps",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="leaseareanoteoverlap",
+            constraint=models.UniqueConstraint(
+                fields=("lease", "area_note"),
+                name="leasing_leaseareanoteoverlap_lease_area_note_key",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="leasebasisofrentoverlap",
+            constraint=models.UniqueConstraint(
+                fields=("lease", "basis_of_rent"),
+                name="leasing_leasebasisofrentoverlap_lease_basis_of_rent_key",
+            ),
+        ),
+    ]
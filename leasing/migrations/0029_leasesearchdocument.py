@@ -0,0 +1,59 @@
+# Generated by Django 2.2.13 on 2026-10-18 11:20
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leasing", "0028_area_overlaps"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name="LeaseSearchDocument",
+            fields=[
+                (
+                    "lease",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to="leasing.Lease",
+                        verbose_name="Lease",
+                    ),
+                ),
+                ("document", models.TextField(blank=True, verbose_name="Document"),),
+                (
+                    "search_vector",
+                    django.contrib.postgres.search.SearchVectorField(
+                        null=True, verbose_name="Search vector"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Lease search document",
+                "verbose_name_plural": "Lease search documents",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="leasesearchdocument",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["document"],
+                name="leasing_leasesearch_doc_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="leasesearchdocument",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="leasing_leasesearch_vector"
+            ),
+        ),
+    ]
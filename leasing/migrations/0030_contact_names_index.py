@@ -0,0 +1,23 @@
+# Generated by Django 2.2.13 on 2026-10-18 12:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leasing", "0029_leasesearchdocument"),
+    ]
+
+    operations = [
+        # Serves the default ordering of the contact list and the keyset
+        # pagination by it. Django 2.2 can't define expression indexes in
+        # the model.
+        migrations.RunSQL(
+            sql=(
+                "CREATE INDEX leasing_contact_names_idx ON leasing_contact "
+                "(COALESCE(name, last_name), first_name, id) WHERE deleted IS NULL"
+            ),
+            reverse_sql="DROP INDEX leasing_contact_names_idx",
+        ),
+    ]
@@ -0,0 +1,129 @@
+# Generated by Django 2.2.13 on 2026-10-18 13:05
+
+import django.contrib.postgres.fields.jsonb
+import django.core.serializers.json
+import enumfields.fields
+from django.conf import settings
+from django.db import migrations, models
+
+import leasing.enums
+import leasing.models.report_job
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("leasing", "0030_contact_names_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReportJob",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Time created"
+                    ),
+                ),
+                (
+                    "modified_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Time modified"),
+                ),
+                (
+                    "report_type",
+                    models.CharField(max_length=255, verbose_name="Report type"),
+                ),
+                (
+                    "input_hash",
+                    models.CharField(max_length=64, verbose_name="Input hash"),
+                ),
+                (
+                    "input_data",
+                    django.contrib.postgres.fields.jsonb.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        verbose_name="Input data",
+                    ),
+                ),
+                (
+                    "state",
+                    enumfields.fields.EnumField(
+                        default="queued",
+                        enum=leasing.enums.ReportJobState,
+                        max_length=30,
+                        verbose_name="State",
+                    ),
+                ),
+                (
+                    "progress",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="Progress"
+                    ),
+                ),
+                (
+                    "result",
+                    models.FileField(
+                        blank=True,
+                        null=True,
+                        upload_to=leasing.models.report_job.get_report_job_result_upload_to,
+                        verbose_name="Result",
+                    ),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Time started"
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Time finished"
+                    ),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Time expires"
+                    ),
+                ),
+                (
+                    "recipients",
+                    models.ManyToManyField(
+                        related_name="_reportjob_recipients_+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Recipients",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Report job",
+                "verbose_name_plural": "Report jobs",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="reportjob",
+            index=models.Index(
+                fields=["report_type", "input_hash"],
+                name="leasing_reportjob_input_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="reportjob",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(state__in=["queued", "running"]),
+                fields=("report_type", "input_hash"),
+                name="leasing_reportjob_in_progress_key",
+            ),
+        ),
+    ]
@@ -0,0 +1,138 @@
+# Generated by Django 2.2.13 on 2026-10-18 18:55
+
+from django.db import migrations
+
+# The owner lookups of leasing.models.auditlog as they were when this
+# migration was written as {model: [lookups]}. A lookup is either the path
+# from the object to its owner or a tuple of (source model, path to the
+# object, path to the owner).
+LEASE_OWNERS = {
+    "Lease": ["id"],
+    "RelatedLease": ["from_lease", "to_lease"],
+    "Tenant": ["lease"],
+    "TenantContact": ["tenant__lease"],
+    "TenantRentShare": ["tenant__lease"],
+    "Contact": [
+        ("TenantContact", "contact", "tenant__lease"),
+        ("Invoice", "recipient", "lease"),
+    ],
+    "Invoice": ["lease"],
+    "InvoiceNote": ["lease"],
+    "InvoiceRow": ["invoice__lease"],
+    "InvoicePayment": ["invoice__lease"],
+    "Rent": ["lease"],
+    "RentDueDate": ["rent__lease"],
+    "FixedInitialYearRent": ["rent__lease"],
+    "ContractRent": ["rent__lease"],
+    "RentAdjustment": ["rent__lease"],
+    "LeaseBasisOfRent": ["lease"],
+    "LeaseArea": ["lease"],
+    "LeaseAreaAddress": ["lease_area__lease"],
+    "ConstructabilityDescription": ["lease_area__lease"],
+    "Plot": ["lease_area__lease"],
+    "PlanUnit": ["lease_area__lease"],
+    "Decision": ["lease"],
+    "Condition": ["decision__lease"],
+    "Contract": ["lease"],
+    "ContractChange": ["contract__lease"],
+    "Collateral": ["contract__lease"],
+    "Comment": ["lease"],
+    "Inspection": ["lease"],
+    "CollectionLetter": ["lease"],
+    "CollectionNote": ["lease"],
+    "CollectionCourtDecision": ["lease"],
+    "InfillDevelopmentCompensation": [
+        (
+            "InfillDevelopmentCompensationLease",
+            "infill_development_compensation",
+            "lease",
+        )
+    ],
+    "InfillDevelopmentCompensationLease": ["lease"],
+    "InfillDevelopmentCompensationDecision": [
+        "infill_development_compensation_lease__lease"
+    ],
+    "InfillDevelopmentCompensationIntendedUse": [
+        "infill_development_compensation_lease__lease"
+    ],
+    "InfillDevelopmentCompensationAttachment": [
+        "infill_development_compensation_lease__lease"
+    ],
+}
+
+CONTACT_OWNERS = {
+    "Contact": ["id"],
+    "TenantContact": ["contact"],
+    "Invoice": ["recipient"],
+    "InvoicePayment": ["invoice__recipient"],
+}
+
+BATCH_SIZE = 1000
+
+
+def forwards_func(apps, schema_editor):
+    # Same as the rebuild_audit_log_index management command
+    AuditLogObjectOwner = apps.get_model("leasing", "AuditLogObjectOwner")
+    ContentType = apps.get_model("contenttypes", "ContentType")
+
+    for (owner_field, owners) in (
+        ("lease", LEASE_OWNERS),
+        ("contact", CONTACT_OWNERS),
+    ):
+        for (model_name, lookups) in owners.items():
+            model = apps.get_model("leasing", model_name)
+            content_type = None
+
+            for lookup in lookups:
+                if isinstance(lookup, str):
+                    lookup = (model_name, "id", lookup)
+
+                (source_model_name, object_path, owner_path) = lookup
+                source_model = apps.get_model("leasing", source_model_name)
+
+                # The base manager includes the soft deleted objects
+                queryset = source_model._base_manager.filter(
+                    **{
+                        "{}__isnull".format(object_path): False,
+                        "{}__isnull".format(owner_path): False,
+                    }
+                )
+
+                owners = []
+                for (object_id, owner_id) in (
+                    queryset.values_list(object_path, owner_path).distinct().iterator()
+                ):
+                    if content_type is None:
+                        content_type = ContentType.objects.get_for_model(model)
+
+                    owners.append(
+                        AuditLogObjectOwner(
+                            content_type=content_type,
+                            object_id=object_id,
+                            **{"{}_id".format(owner_field): owner_id}
+                        )
+                    )
+
+                    if len(owners) >= BATCH_SIZE:
+                        AuditLogObjectOwner.objects.bulk_create(
+                            owners, ignore_conflicts=True
+                        )
+                        owners = []
+
+                AuditLogObjectOwner.objects.bulk_create(owners, ignore_conflicts=True)
+
+
+def reverse_func(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("leasing", "0031_reportjob"),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards_func, reverse_func),
+    ]
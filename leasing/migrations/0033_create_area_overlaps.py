@@ -0,0 +1,47 @@
+# Generated by Django 2.2.13 on 2026-10-18 19:05
+
+from django.db import migrations
+
+# Same as the update_area_overlaps management command: the area notes and
+# the basis of rents that intersect with any of the lease areas of a lease.
+# The soft deleted objects don't overlap anything.
+CREATE_OVERLAPS_SQL = """
+INSERT INTO {overlap_table} (lease_id, {field_name}_id)
+SELECT DISTINCT lease_area.lease_id, other.id
+FROM leasing_leasearea lease_area
+JOIN {other_table} other ON ST_Intersects(other.geometry, lease_area.geometry)
+WHERE lease_area.deleted IS NULL AND other.deleted IS NULL
+ON CONFLICT DO NOTHING
+"""
+
+# The overlap tables, the names of the fields and the overlapping tables
+AREA_OVERLAPS = [
+    ("leasing_leaseareanoteoverlap", "area_note", "leasing_areanote"),
+    ("leasing_leasebasisofrentoverlap", "basis_of_rent", "leasing_basisofrent"),
+]
+
+
+def forwards_func(apps, schema_editor):
+    for (overlap_table, field_name, other_table) in AREA_OVERLAPS:
+        schema_editor.execute(
+            CREATE_OVERLAPS_SQL.format(
+                overlap_table=overlap_table,
+                field_name=field_name,
+                other_table=other_table,
+            )
+        )
+
+
+def reverse_func(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leasing", "0032_create_audit_log_object_owners"),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards_func, reverse_func),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 2.2.13 on 2026-10-18 19:20
+
+from django.db import migrations
+
+# Same as the rebuild_lease_search_index management command: the distinct
+# lowercased lease area identifiers, addresses and tenant contact names of
+# every lease, the soft deleted ones included, sorted and joined with
+# newlines. COLLATE "C" sorts the texts by their code points like Python.
+CREATE_DOCUMENTS_SQL = """
+INSERT INTO leasing_leasesearchdocument (lease_id, document, search_vector)
+SELECT lease.id, documents.document,
+    to_tsvector('simple'::regconfig, documents.document)
+FROM leasing_lease lease
+CROSS JOIN LATERAL (
+    SELECT coalesce(
+        string_agg(texts.value, E'\\n' ORDER BY texts.value COLLATE "C"), ''
+    ) AS document
+    FROM (
+        SELECT DISTINCT lower(all_texts.value) AS value
+        FROM (
+            SELECT lease_area.identifier AS value
+            FROM leasing_leasearea lease_area
+            WHERE lease_area.lease_id = lease.id
+            UNION ALL
+            SELECT address.address
+            FROM leasing_leaseareaaddress address
+            JOIN leasing_leasearea lease_area
+                ON lease_area.id = address.lease_area_id
+            WHERE lease_area.lease_id = lease.id
+            UNION ALL
+            SELECT unnest(ARRAY[contact.name, contact.first_name, contact.last_name])
+            FROM leasing_tenantcontact tenant_contact
+            JOIN leasing_tenant tenant ON tenant.id = tenant_contact.tenant_id
+            JOIN leasing_contact contact ON contact.id = tenant_contact.contact_id
+            WHERE tenant.lease_id = lease.id
+        ) all_texts
+        WHERE all_texts.value <> ''
+    ) texts
+) documents
+ON CONFLICT (lease_id) DO UPDATE SET
+    document = EXCLUDED.document,
+    search_vector = EXCLUDED.search_vector
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leasing", "0033_create_area_overlaps"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_DOCUMENTS_SQL, migrations.RunSQL.noop),
+    ]
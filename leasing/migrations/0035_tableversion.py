@@ -0,0 +1,61 @@
+# Generated by Django 2.2.13 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+CREATE_TRIGGERS_SQL = """
+CREATE SEQUENCE leasing_tableversion_version_seq;
+
+CREATE FUNCTION leasing_update_table_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO leasing_tableversion (table_name, version)
+    VALUES (TG_TABLE_NAME, nextval('leasing_tableversion_version_seq'))
+    ON CONFLICT (table_name) DO UPDATE SET version = EXCLUDED.version;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER leasing_index_update_table_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON leasing_index
+    FOR EACH STATEMENT EXECUTE PROCEDURE leasing_update_table_version();
+
+CREATE TRIGGER leasing_legacyindex_update_table_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON leasing_legacyindex
+    FOR EACH STATEMENT EXECUTE PROCEDURE leasing_update_table_version();
+"""
+
+DROP_TRIGGERS_SQL = """
+DROP TRIGGER leasing_legacyindex_update_table_version ON leasing_legacyindex;
+DROP TRIGGER leasing_index_update_table_version ON leasing_index;
+DROP FUNCTION leasing_update_table_version();
+DROP SEQUENCE leasing_tableversion_version_seq;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leasing", "0034_create_lease_search_documents"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TableVersion",
+            fields=[
+                (
+                    "table_name",
+                    models.CharField(
+                        max_length=255,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Table name",
+                    ),
+                ),
+                ("version", models.BigIntegerField(verbose_name="Version")),
+            ],
+            options={
+                "verbose_name": "Table version",
+                "verbose_name_plural": "Table versions",
+            },
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS_SQL, DROP_TRIGGERS_SQL),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.13 on 2026-10-18 19:25
+
+from django.db import migrations
+
+CREATE_TRIGGER_SQL = """
+CREATE TRIGGER leasing_bankholiday_update_table_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON leasing_bankholiday
+    FOR EACH STATEMENT EXECUTE PROCEDURE leasing_update_table_version();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER leasing_bankholiday_update_table_version ON leasing_bankholiday;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leasing", "0035_tableversion"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGGER_SQL, DROP_TRIGGER_SQL),
+    ]
@@ -1,5 +1,7 @@
 from .area import Area, AreaSource
 from .area_note import AreaNote
+from .area_overlap import LeaseAreaNoteOverlap, LeaseBasisOfRentOverlap
+from .auditlog import AuditLogObjectOwner
 from .basis_of_rent import (
     BasisOfRent,
     BasisOfRentBuildPermissionType,
@@ -66,6 +68,7 @@ from .lease import (
     StatisticalUse,
     SupportiveHousing,
 )
+from .lease_search import LeaseSearchDocument
 from .leasehold_transfer import (
     LeaseholdTransfer,
     LeaseholdTransferImportLog,
@@ -92,6 +95,8 @@ from .rent import (
     RentDueDate,
     RentIntendedUse,
 )
+from .report_job import ReportJob
+from .table_version import TableVersion
 from .tenant import Tenant, TenantContact
 from .ui_data import UiData
 from .vat import Vat
@@ -100,6 +105,7 @@ __all__ = [
     "Area",
     "AreaNote",
     "AreaSource",
+    "AuditLogObjectOwner",
     "BankHoliday",
     "BasisOfRent",
     "BasisOfRentBuildPermissionType",
@@ -155,12 +161,15 @@ __all__ = [
     "Lease",
     "LeaseArea",
     "LeaseAreaAttachment",
+    "LeaseAreaNoteOverlap",
     "LeaseBasisOfRent",
+    "LeaseBasisOfRentOverlap",
     "LeaseholdTransfer",
     "LeaseholdTransferImportLog",
     "LeaseholdTransferParty",
     "LeaseholdTransferProperty",
     "LeaseIdentifier",
+    "LeaseSearchDocument",
     "LeaseStateLog",
     "LeaseType",
     "Management",
@@ -183,10 +192,12 @@ __all__ = [
     "RentAdjustment",
     "RentDueDate",
     "RentIntendedUse",
+    "ReportJob",
     "ReservationProcedure",
     "SpecialProject",
     "StatisticalUse",
     "SupportiveHousing",
+    "TableVersion",
     "Tenant",
     "TenantContact",
     "UiData",
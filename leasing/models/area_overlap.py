@@ -0,0 +1,150 @@
+from django.apps import apps
+from django.contrib.gis.db import models
+from django.db.models import Q
+from django.utils.translation import pgettext_lazy
+from django.utils.translation import ugettext_lazy as _
+
+
+class LeaseAreaNoteOverlap(models.Model):
+    """An area note that intersects with the lease areas of a lease
+
+    Kept up to date by the signals of LeaseArea and AreaNote so that the
+    lease details don't need to compute the intersections on every request."""
+
+    lease = models.ForeignKey(
+        "leasing.Lease",
+        verbose_name=_("Lease"),
+        related_name="+",
+        on_delete=models.CASCADE,
+    )
+    area_note = models.ForeignKey(
+        "leasing.AreaNote",
+        verbose_name=_("Area note"),
+        related_name="+",
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["lease", "area_note"],
+                name="leasing_leaseareanoteoverlap_lease_area_note_key",
+            )
+        ]
+        verbose_name = pgettext_lazy("Model name", "Lease area note overlap")
+        verbose_name_plural = pgettext_lazy("Model name", "Lease area note overlaps")
+
+
+class LeaseBasisOfRentOverlap(models.Model):
+    """A basis of rent that intersects with the lease areas of a lease
+
+    Kept up to date by the signals of LeaseArea and BasisOfRent so that the
+    lease details don't need to compute the intersections on every request."""
+
+    lease = models.ForeignKey(
+        "leasing.Lease",
+        verbose_name=_("Lease"),
+        related_name="+",
+        on_delete=models.CASCADE,
+    )
+    basis_of_rent = models.ForeignKey(
+        "leasing.BasisOfRent",
+        verbose_name=_("Basis of rent"),
+        related_name="+",
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["lease", "basis_of_rent"],
+                name="leasing_leasebasisofrentoverlap_lease_basis_of_rent_key",
+            )
+        ]
+        verbose_name = pgettext_lazy("Model name", "Lease basis of rent overlap")
+        verbose_name_plural = pgettext_lazy(
+            "Model name", "Lease basis of rent overlaps"
+        )
+
+
+# The overlap models and the names of the fields of the overlapping models
+AREA_OVERLAPS = [
+    (LeaseAreaNoteOverlap, "area_note"),
+    (LeaseBasisOfRentOverlap, "basis_of_rent"),
+]
+
+
+def get_area_overlaps():
+    """Returns the overlaps as (overlap model, overlapping model, field name)"""
+    return [
+        (
+            overlap_model,
+            overlap_model._meta.get_field(field_name).related_model,
+            field_name,
+        )
+        for (overlap_model, field_name) in AREA_OVERLAPS
+    ]
+
+
+def _set_overlaps(overlap_model, field_name, value, other_field_name, other_values):
+    existing_values = set(
+        overlap_model.objects.filter(**{field_name: value}).values_list(
+            other_field_name, flat=True
+        )
+    )
+
+    removed_values = existing_values - other_values
+    if removed_values:
+        overlap_model.objects.filter(
+            **{field_name: value, "{}__in".format(other_field_name): removed_values}
+        ).delete()
+
+    overlap_model.objects.bulk_create(
+        [
+            overlap_model(**{field_name: value, other_field_name: other_value})
+            for other_value in other_values - existing_values
+        ]
+    )
+
+
+def update_lease_area_overlaps(lease_id):
+    """Finds the area notes and the basis of rents that intersect with
+    the lease areas of the lease
+
+    An object intersects with the union of the lease areas if it
+    intersects with any of the lease areas, so the union doesn't need
+    to be computed."""
+    geometries = (
+        apps.get_model("leasing", "LeaseArea")
+        .objects.filter(lease_id=lease_id, geometry__isnull=False)
+        .values_list("geometry", flat=True)
+    )
+
+    q = Q()
+    for geometry in geometries:
+        q |= Q(geometry__intersects=geometry)
+
+    for (overlap_model, model, field_name) in get_area_overlaps():
+        ids = set(model.objects.filter(q).values_list("id", flat=True)) if q else set()
+
+        _set_overlaps(overlap_model, "lease_id", lease_id, field_name + "_id", ids)
+
+
+def update_overlapping_leases(instance):
+    """Finds the leases whose lease areas intersect with the area note
+    or the basis of rent"""
+    for (overlap_model, model, field_name) in get_area_overlaps():
+        if not isinstance(instance, model):
+            continue
+
+        lease_ids = set()
+        if instance.geometry and not getattr(instance, "deleted", None):
+            lease_ids = set(
+                apps.get_model("leasing", "LeaseArea")
+                .objects.filter(geometry__intersects=instance.geometry)
+                .values_list("lease_id", flat=True)
+            )
+
+        _set_overlaps(
+            overlap_model, field_name + "_id", instance.id, "lease_id", lease_ids
+        )
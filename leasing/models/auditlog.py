@@ -0,0 +1,296 @@
+import json
+from functools import lru_cache
+
+from auditlog.diff import model_instance_diff
+from auditlog.models import LogEntry
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.db.models import Q
+from django.utils.encoding import smart_text
+from django.utils.translation import pgettext_lazy
+from django.utils.translation import ugettext_lazy as _
+
+# The objects whose audit log entries are shown in the audit log of a lease
+# as {model: [lookups]}. A lookup is either the path from the object to its
+# lease or a tuple of (source model, path to the object, path to the lease)
+# when the relation can only be followed from another model.
+AUDIT_LOG_LEASE_OWNERS = {
+    "leasing.Lease": ["id"],
+    "leasing.RelatedLease": ["from_lease", "to_lease"],
+    "leasing.Tenant": ["lease"],
+    "leasing.TenantContact": ["tenant__lease"],
+    "leasing.TenantRentShare": ["tenant__lease"],
+    "leasing.Contact": [
+        ("leasing.TenantContact", "contact", "tenant__lease"),
+        ("leasing.Invoice", "recipient", "lease"),
+    ],
+    "leasing.Invoice": ["lease"],
+    "leasing.InvoiceNote": ["lease"],
+    "leasing.InvoiceRow": ["invoice__lease"],
+    "leasing.InvoicePayment": ["invoice__lease"],
+    "leasing.Rent": ["lease"],
+    "leasing.RentDueDate": ["rent__lease"],
+    "leasing.FixedInitialYearRent": ["rent__lease"],
+    "leasing.ContractRent": ["rent__lease"],
+    "leasing.RentAdjustment": ["rent__lease"],
+    "leasing.LeaseBasisOfRent": ["lease"],
+    "leasing.LeaseArea": ["lease"],
+    "leasing.LeaseAreaAddress": ["lease_area__lease"],
+    "leasing.ConstructabilityDescription": ["lease_area__lease"],
+    "leasing.Plot": ["lease_area__lease"],
+    "leasing.PlanUnit": ["lease_area__lease"],
+    "leasing.Decision": ["lease"],
+    "leasing.Condition": ["decision__lease"],
+    "leasing.Contract": ["lease"],
+    "leasing.ContractChange": ["contract__lease"],
+    "leasing.Collateral": ["contract__lease"],
+    "leasing.Comment": ["lease"],
+    "leasing.Inspection": ["lease"],
+    "leasing.CollectionLetter": ["lease"],
+    "leasing.CollectionNote": ["lease"],
+    "leasing.CollectionCourtDecision": ["lease"],
+    "leasing.InfillDevelopmentCompensation": [
+        (
+            "leasing.InfillDevelopmentCompensationLease",
+            "infill_development_compensation",
+            "lease",
+        )
+    ],
+    "leasing.InfillDevelopmentCompensationLease": ["lease"],
+    "leasing.InfillDevelopmentCompensationDecision": [
+        "infill_development_compensation_lease__lease"
+    ],
+    "leasing.InfillDevelopmentCompensationIntendedUse": [
+        "infill_development_compensation_lease__lease"
+    ],
+    "leasing.InfillDevelopmentCompensationAttachment": [
+        "infill_development_compensation_lease__lease"
+    ],
+}
+
+# The objects whose audit log entries are shown in the audit log of a contact
+# as {model: [lookups]} like in AUDIT_LOG_LEASE_OWNERS
+AUDIT_LOG_CONTACT_OWNERS = {
+    "leasing.Contact": ["id"],
+    "leasing.TenantContact": ["contact"],
+    "leasing.Invoice": ["recipient"],
+    "leasing.InvoicePayment": ["invoice__recipient"],
+}
+
+
+class AuditLogObjectOwner(models.Model):
+    """Maps an audited object to the leases and the contacts whose audit
+    log its log entries are shown in
+
+    The owners are only added, never removed, so that the history of an
+    object stays in the audit log of a lease even if the object is later
+    moved elsewhere. Kept up to date by the post_save signals of the
+    audited models. The rebuild_audit_log_index management command
+    (re)creates the owners of the existing objects."""
+
+    content_type = models.ForeignKey(
+        ContentType,
+        verbose_name=_("Content type"),
+        related_name="+",
+        on_delete=models.CASCADE,
+    )
+    object_id = models.BigIntegerField(verbose_name=_("Object id"))
+    lease = models.ForeignKey(
+        "leasing.Lease",
+        verbose_name=_("Lease"),
+        related_name="+",
+        null=True,
+        on_delete=models.CASCADE,
+    )
+    contact = models.ForeignKey(
+        "leasing.Contact",
+        verbose_name=_("Contact"),
+        related_name="+",
+        null=True,
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["lease", "content_type", "object_id"],
+                condition=Q(lease__isnull=False),
+                name="leasing_auditlogobjectowner_lease_object_key",
+            ),
+            models.UniqueConstraint(
+                fields=["contact", "content_type", "object_id"],
+                condition=Q(contact__isnull=False),
+                name="leasing_auditlogobjectowner_contact_object_key",
+            ),
+        ]
+        verbose_name = pgettext_lazy("Model name", "Audit log object owner")
+        verbose_name_plural = pgettext_lazy("Model name", "Audit log object owners")
+
+
+@lru_cache(maxsize=None)
+def get_audit_log_owner_sources():
+    """Returns the owner lookups as a tuple of
+    (owner field, model, source model, path to the object, path to the owner)"""
+    sources = []
+
+    for (owner_field, owners) in (
+        ("lease", AUDIT_LOG_LEASE_OWNERS),
+        ("contact", AUDIT_LOG_CONTACT_OWNERS),
+    ):
+        for (model_label, lookups) in owners.items():
+            model = apps.get_model(model_label)
+
+            for lookup in lookups:
+                if isinstance(lookup, str):
+                    lookup = (model_label, "id", lookup)
+
+                (source_model_label, object_path, owner_path) = lookup
+                sources.append(
+                    (
+                        owner_field,
+                        model,
+                        apps.get_model(source_model_label),
+                        object_path,
+                        owner_path,
+                    )
+                )
+
+    return tuple(sources)
+
+
+def get_audit_log_owner_source_models():
+    return {source[2] for source in get_audit_log_owner_sources()}
+
+
+def get_audit_log_owner_models(owner_field):
+    return {
+        source[1]
+        for source in get_audit_log_owner_sources()
+        if source[0] == owner_field
+    }
+
+
+def _get_all_objects(model):
+    # Include the soft deleted objects
+    return getattr(model, "all_objects", model._default_manager).all()
+
+
+def create_audit_log_object_owners(sources, source_ids=None, batch_size=1000):
+    """Adds the missing owners of the objects found with the owner lookups
+
+    Only the source model objects with the source_ids are used if given.
+    Returns the number of owners found (including the existing ones)."""
+    content_types = ContentType.objects.get_for_models(
+        *{source[1] for source in sources}
+    )
+    count = 0
+
+    for (owner_field, model, source_model, object_path, owner_path) in sources:
+        queryset = _get_all_objects(source_model).filter(
+            **{
+                "{}__isnull".format(object_path): False,
+                "{}__isnull".format(owner_path): False,
+            }
+        )
+        if source_ids is not None:
+            queryset = queryset.filter(id__in=source_ids)
+
+        owners = []
+        for (object_id, owner_id) in (
+            queryset.values_list(object_path, owner_path).distinct().iterator()
+        ):
+            owners.append(
+                AuditLogObjectOwner(
+                    content_type=content_types[model],
+                    object_id=object_id,
+                    **{"{}_id".format(owner_field): owner_id}
+                )
+            )
+
+            if len(owners) >= batch_size:
+                AuditLogObjectOwner.objects.bulk_create(owners, ignore_conflicts=True)
+                count += len(owners)
+                owners = []
+
+        AuditLogObjectOwner.objects.bulk_create(owners, ignore_conflicts=True)
+        count += len(owners)
+
+    return count
+
+
+def update_audit_log_object_owners(instances):
+    """Adds the missing owners of the objects that the instances link
+    to their leases or contacts
+
+    Called when the instances are saved. Must be called separately for
+    the instances created with bulk_create."""
+    instances = list(instances)
+    if not instances:
+        return
+
+    model = instances[0].__class__
+    sources = [source for source in get_audit_log_owner_sources() if source[2] == model]
+    if not sources:
+        return
+
+    create_audit_log_object_owners(
+        sources, source_ids=[instance.pk for instance in instances]
+    )
+
+
+def log_created_objects(instances):
+    """Adds the audit log entries of the objects created with bulk_create
+
+    bulk_create doesn't send the signals that auditlog uses to log the
+    created objects."""
+    instances = list(instances)
+    if not instances:
+        return
+
+    content_type = ContentType.objects.get_for_model(instances[0].__class__)
+
+    LogEntry.objects.bulk_create(
+        [
+            LogEntry(
+                content_type=content_type,
+                object_pk=str(instance.pk),
+                object_id=instance.pk,
+                object_repr=smart_text(instance),
+                action=LogEntry.Action.CREATE,
+                changes=json.dumps(model_instance_diff(None, instance)),
+            )
+            for instance in instances
+        ]
+    )
+
+
+def log_updated_objects(changes):
+    """Adds the audit log entries of the objects updated with QuerySet.update
+
+    changes is an iterable of (previous instance, updated instance) pairs.
+    QuerySet.update doesn't send the signals that auditlog uses to log the
+    updated objects."""
+    changes = [
+        (instance, model_instance_diff(previous, instance))
+        for (previous, instance) in changes
+    ]
+    changes = [(instance, diff) for (instance, diff) in changes if diff]
+    if not changes:
+        return
+
+    content_type = ContentType.objects.get_for_model(changes[0][0].__class__)
+
+    LogEntry.objects.bulk_create(
+        [
+            LogEntry(
+                content_type=content_type,
+                object_pk=str(instance.pk),
+                object_id=instance.pk,
+                object_repr=smart_text(instance),
+                action=LogEntry.Action.UPDATE,
+                changes=json.dumps(diff),
+            )
+            for (instance, diff) in changes
+        ]
+    )
@@ -1,10 +1,10 @@
-import calendar
+import copy
 from decimal import ROUND_HALF_UP, Decimal
 from fractions import Fraction
 
 from auditlog.registry import auditlog
 from django.db import models, transaction
-from django.db.models import Sum
+from django.db.models import F, Sum
 from django.utils import timezone
 from django.utils.translation import pgettext_lazy
 from django.utils.translation import ugettext_lazy as _
@@ -14,8 +14,9 @@ from sequences import get_next_value
 from field_permissions.registry import field_permissions
 from leasing.enums import InvoiceDeliveryMethod, InvoiceState, InvoiceType
 from leasing.models import Contact
+from leasing.models.auditlog import log_updated_objects
 from leasing.models.mixins import TimeStampedSafeDeleteModel
-from leasing.models.utils import get_next_business_day, get_range_overlap
+from leasing.models.utils import get_next_business_day
 
 
 class ReceivableType(models.Model):
@@ -351,35 +352,27 @@ class Invoice(TimeStampedSafeDeleteModel):
             if other_invoice:
                 other_invoice.update_amounts()
 
-    def update_amounts(self):
+    def calculate_amounts(self):
+        """Calculates the amounts and the state of the invoice from the rows,
+        the payments and the credit notes without saving anything"""
         rows_sum = self.rows.aggregate(sum=Sum("amount"))["sum"]
         if not rows_sum:
             rows_sum = Decimal(0)
 
-        self.billed_amount = rows_sum
+        billed_amount = rows_sum
 
         if not self.invoiceset:
-            self.total_amount = rows_sum
+            total_amount = rows_sum
         else:
             # Sum amounts from all of the rows in the same type of invoices in this invoiceset
-            invoiceset_rows_sum = InvoiceRow.objects.filter(
+            total_amount = InvoiceRow.objects.filter(
                 invoice__invoiceset=self.invoiceset,
                 invoice__type=self.type,
                 invoice__deleted__isnull=True,
                 deleted__isnull=True,
             ).aggregate(sum=Sum("amount"))["sum"]
-            if not invoiceset_rows_sum:
-                invoiceset_rows_sum = Decimal(0)
-
-            # Update sum to all of the same type invoices in this invoiceset
-            self.invoiceset.invoices.filter(
-                type=self.type, deleted__isnull=True
-            ).exclude(id=self.id).update(total_amount=invoiceset_rows_sum)
-
-            # Need to set self total_amount separately because the
-            # total_amount is not automatically refreshed from the
-            # database
-            self.total_amount = invoiceset_rows_sum
+            if not total_amount:
+                total_amount = Decimal(0)
 
         payments_total = self.payments.aggregate(sum=Sum("paid_amount"))["sum"]
         if not payments_total:
@@ -397,23 +390,114 @@ class Invoice(TimeStampedSafeDeleteModel):
         if self.collection_charge:
             collection_charge = self.collection_charge
 
-        self.outstanding_amount = max(
+        outstanding_amount = max(
             Decimal(0),
-            self.billed_amount
-            + collection_charge
-            - payments_total
-            - total_credited_amount,
+            billed_amount + collection_charge - payments_total - total_credited_amount,
         )
+
+        state = self.state
         # Don't mark as refunded unless credited amount is nonzero
         if total_credited_amount != Decimal(0) and total_credited_amount.compare(
-            self.billed_amount
+            billed_amount
         ) != Decimal(-1):
-            self.state = InvoiceState.REFUNDED
-        elif self.type == InvoiceType.CHARGE and self.outstanding_amount == Decimal(0):
-            self.state = InvoiceState.PAID
+            state = InvoiceState.REFUNDED
+        elif self.type == InvoiceType.CHARGE and outstanding_amount == Decimal(0):
+            state = InvoiceState.PAID
+
+        return {
+            "billed_amount": billed_amount,
+            "total_amount": total_amount,
+            "outstanding_amount": outstanding_amount,
+            "state": state,
+        }
+
+    def update_amounts(self):
+        amounts = self.calculate_amounts()
+
+        if self.invoiceset:
+            # Update sum to all of the same type invoices in this invoiceset
+            self.invoiceset.invoices.filter(
+                type=self.type, deleted__isnull=True
+            ).exclude(id=self.id).update(total_amount=amounts["total_amount"])
+
+        self.billed_amount = amounts["billed_amount"]
+        self.total_amount = amounts["total_amount"]
+        self.outstanding_amount = amounts["outstanding_amount"]
+        self.state = amounts["state"]
 
         self.save()
 
+    def update_amounts_incrementally(
+        self, paid_amount=Decimal(0), row_amount=Decimal(0)
+    ):
+        """Applies a change in the payments or the rows to the saved amounts
+
+        paid_amount is the change in the sum of the payments and row_amount
+        the change in the sum of the rows of this invoice. The amounts are
+        changed with atomic F() updates instead of calculating them again
+        from all of the rows, payments and credit notes. Like save(), the
+        update sets the modified time and adds the audit log entries of the
+        changed invoices.
+
+        The change can only be applied as is if the state of the invoice
+        stays the same. If the outstanding amount would not stay above zero
+        or (when the rows change) the invoice has been credited, the amounts
+        are calculated again with update_amounts instead."""
+        with transaction.atomic():
+            if row_amount and self.credit_invoices.exists():
+                self.update_amounts()
+                return
+
+            now = timezone.now()
+
+            # The outstanding amount is never saved as negative. Because of
+            # that the change can't be applied to an outstanding amount that
+            # is zero or would become zero.
+            updated = Invoice.objects.filter(
+                id=self.id,
+                outstanding_amount__gt=max(Decimal(0), paid_amount - row_amount),
+            ).update(
+                outstanding_amount=F("outstanding_amount") + row_amount - paid_amount,
+                billed_amount=F("billed_amount") + row_amount,
+                modified_at=now,
+            )
+            if not updated:
+                self.update_amounts()
+                return
+
+            changed_invoices = Invoice.objects.filter(id=self.id)
+            if row_amount:
+                if self.invoiceset:
+                    changed_invoices = self.invoiceset.invoices.filter(
+                        type=self.type, deleted__isnull=True
+                    )
+
+                changed_invoices.update(
+                    total_amount=F("total_amount") + row_amount, modified_at=now
+                )
+
+            # The previous amounts are derived from the updated ones, because
+            # the amounts of this instance may be older than the saved ones
+            changes = []
+            for invoice in changed_invoices:
+                previous = copy.copy(invoice)
+                previous.total_amount -= row_amount
+                if invoice.id == self.id:
+                    previous.billed_amount -= row_amount
+                    previous.outstanding_amount += paid_amount - row_amount
+                changes.append((previous, invoice))
+
+            log_updated_objects(changes)
+
+        self.refresh_from_db(
+            fields=[
+                "billed_amount",
+                "total_amount",
+                "outstanding_amount",
+                "modified_at",
+            ]
+        )
+
     def create_credit_invoice(  # noqa C901 TODO
         self, row_ids=None, amount=None, receivable_type=None, notes=""
     ):
@@ -544,76 +628,32 @@ class Invoice(TimeStampedSafeDeleteModel):
         return fraction
 
     def calculate_penalty_interest(self, calculation_date=None):
-        from .debt_collection import InterestRate
-
-        penalty_interest_data = {
-            "interest_start_date": None,
-            "interest_end_date": None,
-            "outstanding_amount": self.outstanding_amount,
-            "total_interest_amount": Decimal(0),
-            "interest_periods": [],
-        }
+        from leasing.calculation.penalty_interest import (
+            InterestRateTable,
+            calculate_penalty_interest_with_rates,
+        )
+
         if not calculation_date:
             calculation_date = timezone.now().date()
 
         if not self.outstanding_amount:
-            return penalty_interest_data
+            return {
+                "interest_start_date": None,
+                "interest_end_date": None,
+                "outstanding_amount": self.outstanding_amount,
+                "total_interest_amount": Decimal(0),
+                "interest_periods": [],
+            }
 
         interest_start_date = get_next_business_day(self.due_date)
-        interest_end_date = calculation_date
 
-        penalty_interest_data["interest_start_date"] = interest_start_date
-        penalty_interest_data["interest_end_date"] = interest_end_date
-
-        years = range(interest_start_date.year, interest_end_date.year + 1)
-
-        total_interest_amount = Decimal(0)
-
-        for interest_rate in InterestRate.objects.filter(
-            start_date__year__in=years
-        ).order_by("start_date"):
-            overlap = get_range_overlap(
-                interest_rate.start_date,
-                interest_rate.end_date,
-                interest_start_date,
-                interest_end_date,
-            )
-            if not overlap or not overlap[0] or not overlap[1]:
-                continue
-
-            days_between = (overlap[1] - overlap[0]).days + 1  # Inclusive
-
-            # TODO: which divisor to use
-            # divisor = 360
-            if calendar.isleap(interest_rate.start_date.year):
-                divisor = 366
-            else:
-                divisor = 365
-
-            interest_amount = (
-                self.outstanding_amount
-                * (interest_rate.penalty_rate / 100)
-                / divisor
-                * days_between
-            )
-
-            penalty_interest_data["interest_periods"].append(
-                {
-                    "start_date": overlap[0],
-                    "end_date": overlap[1],
-                    "penalty_rate": interest_rate.penalty_rate,
-                    "interest_amount": interest_amount,
-                }
-            )
-
-            total_interest_amount += interest_amount
-
-        penalty_interest_data["total_interest_amount"] = total_interest_amount.quantize(
-            Decimal(".01"), rounding=ROUND_HALF_UP
+        return calculate_penalty_interest_with_rates(
+            self.outstanding_amount,
+            interest_start_date,
+            calculation_date,
+            InterestRateTable.load(interest_start_date.year, calculation_date.year),
         )
 
-        return penalty_interest_data
-
     def is_same_recipient_and_tenants(self, invoice):
         """Checks that the self and dict of invoice data have the same recipients
         and the same tenants on the rows."""
@@ -16,6 +16,7 @@ from enumfields import EnumField
 from safedelete.managers import SafeDeleteManager
 
 from field_permissions.registry import field_permissions
+from leasing.calculation.profiling import profile_stage
 from leasing.calculation.result import CalculationAmount, CalculationResult
 from leasing.enums import (
     Classification,
@@ -680,6 +681,7 @@ class Lease(TimeStampedSafeDeleteModel):
 
         super().save(*args, **kwargs)
 
+    @profile_stage("due_dates")
     def get_due_dates_for_period(self, start_date, end_date):
         due_dates = set()
 
@@ -818,6 +820,13 @@ class Lease(TimeStampedSafeDeleteModel):
         return result
 
     def get_active_rents_on_period(self, date_range_start, date_range_end):
+        if "rents" in getattr(self, "_prefetched_objects_cache", {}):
+            return [
+                rent
+                for rent in self.rents.all()
+                if rent.is_active_on_period(date_range_start, date_range_end)
+            ]
+
         rent_range_filter = Q(
             Q(Q(end_date=None) | Q(end_date__gte=date_range_start))
             & Q(Q(start_date=None) | Q(start_date__lte=date_range_end))
@@ -847,28 +856,41 @@ class Lease(TimeStampedSafeDeleteModel):
         except ValueError:
             return False
 
-    def calculate_rent_amount_for_period(self, start_date, end_date):
+    def calculate_rent_amount_for_period(
+        self, start_date, end_date, dry_run=False, index_table=None
+    ):
         calculation_result = CalculationResult(
             date_range_start=start_date, date_range_end=end_date
         )
 
         for rent in self.get_active_rents_on_period(start_date, end_date):
             calculation_result.combine(
-                rent.get_amount_for_date_range(start_date, end_date)
+                rent.get_amount_for_date_range(
+                    start_date, end_date, dry_run=dry_run, index_table=index_table
+                )
             )
 
         return calculation_result
 
-    def calculate_rent_amount_for_year(self, year):
+    def calculate_rent_amount_for_year(self, year, dry_run=False, index_table=None):
         first_day_of_year = datetime.date(year=year, month=1, day=1)
         last_day_of_year = datetime.date(year=year, month=12, day=31)
 
         return self.calculate_rent_amount_for_period(
-            first_day_of_year, last_day_of_year
+            first_day_of_year,
+            last_day_of_year,
+            dry_run=dry_run,
+            index_table=index_table,
         )
 
+    @profile_stage("determine_payable_rents_and_periods")
     def determine_payable_rents_and_periods(  # noqa: TODO
-        self, start_date, end_date, dry_run=False, ignore_invoicing_date_after=None
+        self,
+        start_date,
+        end_date,
+        dry_run=False,
+        ignore_invoicing_date_after=None,
+        index_table=None,
     ):
         """Determines billing periods and rent amounts for them
 
@@ -881,6 +903,9 @@ class Lease(TimeStampedSafeDeleteModel):
         ignore_invoicing_date_after -parameter can be used to limit
         calculation to only for the due dates that would be invoiced
         before the provided date.
+
+        index_table -parameter can be used to look up the indexes
+        from a preloaded leasing.calculation.index.IndexTable.
         """
         lease_due_dates = self.get_due_dates_for_period(start_date, end_date)
 
@@ -933,7 +958,10 @@ class Lease(TimeStampedSafeDeleteModel):
                     }
 
                 rent_calculation_result = rent.get_amount_for_date_range(
-                    *billing_period, explain=True, dry_run=dry_run
+                    *billing_period,
+                    explain=True,
+                    dry_run=dry_run,
+                    index_table=index_table
                 )
 
                 if self.is_the_last_billing_period(billing_period):
@@ -947,6 +975,7 @@ class Lease(TimeStampedSafeDeleteModel):
 
         return amounts_for_billing_periods
 
+    @profile_stage("calculate_invoices")
     def calculate_invoices(self, period_rents):  # noqa: TODO
         from leasing.models import ReceivableType
 
@@ -0,0 +1,218 @@
+import re
+from collections import defaultdict
+
+from django.apps import apps
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from django.db import connection, models
+from django.db.models import F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.translation import pgettext_lazy
+from django.utils.translation import ugettext_lazy as _
+
+from leasing.models.utils import normalize_property_identifier
+
+LEASE_SEARCH_CONFIG = "simple"
+
+# The objects whose texts are in the search documents as {model: [lookups]}.
+# A lookup is a tuple of (source model, path to the object, path to the lease).
+#
+# The lessor is not in the documents, because the same lessor contact is the
+# lessor of most of the leases and saving it would recreate all of the
+# documents. The leases are searched by the lessor with a join instead.
+LEASE_SEARCH_SOURCES = {
+    "leasing.LeaseArea": [("leasing.LeaseArea", "id", "lease")],
+    "leasing.LeaseAreaAddress": [
+        ("leasing.LeaseAreaAddress", "id", "lease_area__lease")
+    ],
+    "leasing.Tenant": [("leasing.Tenant", "id", "lease")],
+    "leasing.TenantContact": [("leasing.TenantContact", "id", "tenant__lease")],
+    "leasing.Contact": [("leasing.TenantContact", "contact", "tenant__lease")],
+}
+
+
+class LeaseSearchDocument(models.Model):
+    """The searchable texts of a lease in one row
+
+    Contains the addresses, the property identifiers and the names of
+    the tenant contacts of the lease. The document
+    has a trigram index for the substring searches and the search vector
+    has a full-text index for the word searches and the ranking.
+
+    Kept up to date by the signals of the models the texts are from.
+    The rebuild_lease_search_index management command recreates the
+    documents of all of the leases."""
+
+    lease = models.OneToOneField(
+        "leasing.Lease",
+        verbose_name=_("Lease"),
+        related_name="+",
+        primary_key=True,
+        on_delete=models.CASCADE,
+    )
+    document = models.TextField(verbose_name=_("Document"), blank=True)
+    search_vector = SearchVectorField(verbose_name=_("Search vector"), null=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=["document"],
+                name="leasing_leasesearch_doc_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+            GinIndex(fields=["search_vector"], name="leasing_leasesearch_vector"),
+        ]
+        verbose_name = pgettext_lazy("Model name", "Lease search document")
+        verbose_name_plural = pgettext_lazy("Model name", "Lease search documents")
+
+
+def _get_all_objects(model_label):
+    # The soft deleted objects are searched too like in the searches
+    # that join the related tables
+    model = apps.get_model(model_label)
+
+    return getattr(model, "all_objects", model._default_manager).all()
+
+
+def get_lease_search_texts(lease_ids):
+    """Returns the searchable texts of the leases as {lease id: [texts]}"""
+    texts = defaultdict(list)
+
+    for (lease_id, identifier) in (
+        _get_all_objects("leasing.LeaseArea")
+        .filter(lease_id__in=lease_ids)
+        .values_list("lease_id", "identifier")
+    ):
+        texts[lease_id].append(identifier)
+
+    for (lease_id, address) in (
+        _get_all_objects("leasing.LeaseAreaAddress")
+        .filter(lease_area__lease_id__in=lease_ids)
+        .values_list("lease_area__lease_id", "address")
+    ):
+        texts[lease_id].append(address)
+
+    for (lease_id, name, first_name, last_name) in (
+        _get_all_objects("leasing.TenantContact")
+        .filter(tenant__lease_id__in=lease_ids)
+        .values_list(
+            "tenant__lease_id",
+            "contact__name",
+            "contact__first_name",
+            "contact__last_name",
+        )
+    ):
+        texts[lease_id].extend([name, first_name, last_name])
+
+    return texts
+
+
+def update_lease_search_documents(lease_ids):
+    """Recreates the search documents of the leases"""
+    lease_ids = set(lease_ids)
+    if not lease_ids:
+        return
+
+    texts = get_lease_search_texts(lease_ids)
+    existing_lease_ids = set(
+        _get_all_objects("leasing.Lease")
+        .filter(id__in=lease_ids)
+        .values_list("id", flat=True)
+    )
+
+    if not existing_lease_ids:
+        return
+
+    # Insert or update all of the documents with one statement
+    documents = [
+        (
+            lease_id,
+            "\n".join(sorted({text.lower() for text in texts[lease_id] if text})),
+        )
+        for lease_id in sorted(existing_lease_ids)
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO {table} (lease_id, document, search_vector) "
+            "SELECT lease_id, document, to_tsvector(%s::regconfig, document) "
+            "FROM (VALUES {values}) AS documents (lease_id, document) "
+            "ON CONFLICT (lease_id) DO UPDATE SET "
+            "document = EXCLUDED.document, "
+            "search_vector = EXCLUDED.search_vector".format(
+                table=connection.ops.quote_name(LeaseSearchDocument._meta.db_table),
+                values=", ".join(["(%s, %s)"] * len(documents)),
+            ),
+            [LEASE_SEARCH_CONFIG]
+            + [value for document in documents for value in document],
+        )
+
+
+def get_lease_search_source_models():
+    return [apps.get_model(model_label) for model_label in LEASE_SEARCH_SOURCES]
+
+
+def get_lease_search_lease_ids(instance):
+    """Returns the ids of the leases whose search documents contain
+    the texts of the instance"""
+    lease_ids = set()
+
+    for (source_model_label, object_path, lease_path) in LEASE_SEARCH_SOURCES[
+        instance._meta.label
+    ]:
+        lease_ids.update(
+            _get_all_objects(source_model_label)
+            .filter(
+                **{object_path: instance.pk, "{}__isnull".format(lease_path): False}
+            )
+            .values_list(lease_path, flat=True)
+        )
+
+    return lease_ids
+
+
+def get_lease_search_query(search_string):
+    """Returns a full-text query that finds the words of the search string
+    as prefixes of the words in the search documents"""
+    words = re.findall(r"\w+", search_string.lower())
+    if not words:
+        return None
+
+    return SearchQuery(
+        " & ".join("{}:*".format(word) for word in words),
+        config=LEASE_SEARCH_CONFIG,
+        search_type="raw",
+    )
+
+
+def get_lease_search_documents(search_string):
+    """Returns the search documents that match the search string annotated
+    with their search rank
+
+    A document matches if the search string is a part of it or if the
+    words in the search string are found in it."""
+    q = Q(document__contains=search_string.lower())
+
+    normalized_identifier = normalize_property_identifier(search_string)
+    if search_string != normalized_identifier:
+        q |= Q(document__contains=normalized_identifier.lower())
+
+    search_query = get_lease_search_query(search_string)
+    if search_query is None:
+        rank = Value(0.0, output_field=models.FloatField())
+    else:
+        q |= Q(search_vector=search_query)
+        rank = SearchRank(F("search_vector"), search_query)
+
+    return LeaseSearchDocument.objects.filter(q).annotate(search_rank=rank)
+
+
+def get_lease_search_rank(documents):
+    """Returns an expression of the search rank of a lease for annotating
+    a lease queryset. The leases without a matching document rank last."""
+    return Coalesce(
+        Subquery(
+            documents.filter(lease_id=OuterRef("pk")).values("search_rank")[:1],
+            output_field=models.FloatField(),
+        ),
+        Value(0.0, output_field=models.FloatField()),
+    )
@@ -11,7 +11,8 @@ from django.utils.translation import ugettext_lazy as _
 from enumfields import EnumField
 
 from field_permissions.registry import field_permissions
-from leasing.calculation.index import IndexCalculation
+from leasing.calculation.index import IndexCalculation, get_index_table
+from leasing.calculation.profiling import profile_stage
 from leasing.calculation.result import (
     CalculationAmount,
     CalculationNote,
@@ -241,22 +242,47 @@ class Rent(TimeStampedSafeDeleteModel):
             and self.seasonal_end_month
         )
 
-    def get_intended_uses_for_date_range(self, date_range_start, date_range_end):
-        intended_uses = set()
+    def get_related_items_for_date_range(
+        self, related_name, date_range_start, date_range_end
+    ):
+        """Returns the items in the related_name relation that are active
+        on the date range.
+
+        Filters the items in Python if the relation has been prefetched
+        (e.g. by leasing.calculation.bulk) and in the database otherwise."""
+        if related_name in getattr(self, "_prefetched_objects_cache", {}):
+            return [
+                item
+                for item in getattr(self, related_name).all()
+                if (item.end_date is None or item.end_date >= date_range_start)
+                and (item.start_date is None or item.start_date <= date_range_end)
+            ]
 
         range_filtering = Q(
             Q(Q(end_date=None) | Q(end_date__gte=date_range_start))
             & Q(Q(start_date=None) | Q(start_date__lte=date_range_end))
         )
 
+        return getattr(self, related_name).filter(range_filtering)
+
+    def get_intended_uses_for_date_range(self, date_range_start, date_range_end):
+        intended_uses = set()
+
         intended_uses.update(
             [
                 fiyr.intended_use
-                for fiyr in self.fixed_initial_year_rents.filter(range_filtering)
+                for fiyr in self.get_related_items_for_date_range(
+                    "fixed_initial_year_rents", date_range_start, date_range_end
+                )
             ]
         )
         intended_uses.update(
-            [cr.intended_use for cr in self.contract_rents.filter(range_filtering)]
+            [
+                cr.intended_use
+                for cr in self.get_related_items_for_date_range(
+                    "contract_rents", date_range_start, date_range_end
+                )
+            ]
         )
 
         return intended_uses
@@ -301,6 +327,7 @@ class Rent(TimeStampedSafeDeleteModel):
 
         return clamped_date_range_start, clamped_date_range_end
 
+    @profile_stage("adjustments")
     def get_rent_adjustment_amount(self, intended_use, amount, period, dry_run=False):
         calculation_amounts = []
 
@@ -336,16 +363,18 @@ class Rent(TimeStampedSafeDeleteModel):
 
         return calculation_amounts
 
+    @profile_stage("fixed_initial_year_rents")
     def fixed_initial_year_rent_amount_for_date_range(
         self, intended_use, date_range_start, date_range_end, dry_run=False
     ):
-        fixed_initial_year_rents = self.fixed_initial_year_rents.filter(
-            Q(
-                Q(Q(end_date=None) | Q(end_date__gte=date_range_start))
-                & Q(Q(start_date=None) | Q(start_date__lte=date_range_end))
+        intended_use_id = intended_use.id if intended_use else None
+        fixed_initial_year_rents = [
+            fixed_initial_year_rent
+            for fixed_initial_year_rent in self.get_related_items_for_date_range(
+                "fixed_initial_year_rents", date_range_start, date_range_end
             )
-            & Q(intended_use=intended_use)
-        )
+            if fixed_initial_year_rent.intended_use_id == intended_use_id
+        ]
 
         calculation_result = FixedInitialYearRentCalculationResult(
             date_range_start=date_range_start, date_range_end=date_range_end
@@ -382,20 +411,27 @@ class Rent(TimeStampedSafeDeleteModel):
 
         return calculation_result
 
+    @profile_stage("contract_rents")
     def contract_rent_amount_for_date_range(  # noqa: TODO
-        self, intended_use, date_range_start, date_range_end, dry_run=False
+        self,
+        intended_use,
+        date_range_start,
+        date_range_end,
+        dry_run=False,
+        index_table=None,
     ):
         calculation_result = CalculationResult(
             date_range_start=date_range_start, date_range_end=date_range_end
         )
 
-        contract_rents = self.contract_rents.filter(
-            Q(
-                Q(Q(end_date=None) | Q(end_date__gte=date_range_start))
-                & Q(Q(start_date=None) | Q(start_date__lte=date_range_end))
+        intended_use_id = intended_use.id if intended_use else None
+        contract_rents = [
+            contract_rent
+            for contract_rent in self.get_related_items_for_date_range(
+                "contract_rents", date_range_start, date_range_end
             )
-            & Q(intended_use=intended_use)
-        )
+            if contract_rent.intended_use_id == intended_use_id
+        ]
 
         for contract_rent in contract_rents:
             (contract_overlap, _remainder) = get_range_overlap_and_remainder(
@@ -445,7 +481,9 @@ class Rent(TimeStampedSafeDeleteModel):
                     *contract_overlap
                 )
 
-                index = self.get_index_for_date(contract_overlap[0])
+                index = self.get_index_for_date(
+                    contract_overlap[0], index_table=index_table
+                )
 
                 index_calculation = IndexCalculation(
                     amount=contract_amount.amount,
@@ -454,6 +492,7 @@ class Rent(TimeStampedSafeDeleteModel):
                     precision=self.index_rounding,
                     x_value=self.x_value,
                     y_value=self.y_value,
+                    index_table=index_table,
                 )
 
                 # There are some internal, no-cost INDEX rents which have no IndexType.
@@ -493,9 +532,20 @@ class Rent(TimeStampedSafeDeleteModel):
 
         return calculation_result
 
+    @profile_stage("rent_amount")
     def get_amount_for_date_range(
-        self, date_range_start, date_range_end, explain=False, dry_run=False
+        self,
+        date_range_start,
+        date_range_end,
+        explain=False,
+        dry_run=False,
+        index_table=None,
     ):  # noqa: TODO
+        """Calculates the rent amount for the date range
+
+        index_table (leasing.calculation.index.IndexTable) can be
+        provided to look up the indexes from memory instead of
+        querying them from the database."""
         calculation_result = CalculationResult(
             date_range_start=date_range_start, date_range_end=date_range_end
         )
@@ -546,7 +596,11 @@ class Rent(TimeStampedSafeDeleteModel):
 
             for (range_start, range_end) in date_ranges:
                 contract_rent_calculation_result = self.contract_rent_amount_for_date_range(
-                    intended_use, range_start, range_end, dry_run=dry_run
+                    intended_use,
+                    range_start,
+                    range_end,
+                    dry_run=dry_run,
+                    index_table=index_table,
                 )
 
                 calculation_result.combine(contract_rent_calculation_result)
@@ -558,13 +612,11 @@ class Rent(TimeStampedSafeDeleteModel):
     ):
         applicable_adjustments = []
 
-        range_filtering = Q(
-            Q(Q(end_date=None) | Q(end_date__gte=date_range_start))
-            & Q(Q(start_date=None) | Q(start_date__lte=date_range_end))
-        )
-
-        for rent_adjustment in self.rent_adjustments.filter(range_filtering):
-            if rent_adjustment.intended_use != intended_use:
+        intended_use_id = intended_use.id if intended_use else None
+        for rent_adjustment in self.get_related_items_for_date_range(
+            "rent_adjustments", date_range_start, date_range_end
+        ):
+            if rent_adjustment.intended_use_id != intended_use_id:
                 continue
 
             (
@@ -585,9 +637,12 @@ class Rent(TimeStampedSafeDeleteModel):
         if self.due_dates_type != DueDatesType.CUSTOM:
             return set()
 
-        return [
-            dd.as_daymonth() for dd in self.due_dates.all().order_by("month", "day")
-        ]
+        if "due_dates" in getattr(self, "_prefetched_objects_cache", {}):
+            due_dates = sorted(self.due_dates.all(), key=lambda dd: (dd.month, dd.day))
+        else:
+            due_dates = self.due_dates.all().order_by("month", "day")
+
+        return [dd.as_daymonth() for dd in due_dates]
 
     def get_due_dates_as_daymonths(self):
         due_dates = []
@@ -620,6 +675,7 @@ class Rent(TimeStampedSafeDeleteModel):
 
         return due_dates
 
+    @profile_stage("billing_periods")
     def get_billing_period_from_due_date(self, due_date):
         if not due_date:
             return None
@@ -738,8 +794,14 @@ class Rent(TimeStampedSafeDeleteModel):
 
         return the_date.year
 
-    def get_index_for_date(self, the_date):
-        return Index.objects.get_latest_for_year(self.get_rent_year_for_date(the_date))
+    @profile_stage("index_calculation")
+    def get_index_for_date(self, the_date, index_table=None):
+        year = self.get_rent_year_for_date(the_date)
+
+        if index_table is not None:
+            return index_table.get_latest_for_year(year)
+
+        return Index.objects.get_latest_for_year(year)
 
     def is_correct_index_for_date(self, index, the_date):
         """Check if the provided index is the previous years average index"""
@@ -1327,28 +1389,21 @@ class EqualizedRent(models.Model):
 
 class IndexManager(models.Manager):
     def get_latest_for_date(self, the_date=None):
-        """Returns the latest year average index"""
+        """Returns the latest year average index
+
+        The index is looked up from the in-process index table instead
+        of the database (see leasing.calculation.index.get_index_table)"""
         if the_date is None:
             the_date = datetime.date.today()
 
-        return (
-            self.get_queryset()
-            .filter(year__lte=the_date.year - 1, month__isnull=True)
-            .order_by("-year")
-            .first()
-        )
+        return get_index_table().get_latest_for_year(the_date.year)
 
     def get_latest_for_year(self, year=None):
         """Returns the latest year average index for year"""
         if year is None:
             year = datetime.date.today().year
 
-        return (
-            self.get_queryset()
-            .filter(year__lte=year - 1, month__isnull=True)
-            .order_by("-year")
-            .first()
-        )
+        return get_index_table().get_latest_for_year(year)
 
 
 class Index(models.Model):
@@ -0,0 +1,174 @@
+import hashlib
+import json
+
+from django.contrib.gis.db import models
+from django.contrib.postgres.fields import JSONField
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import pgettext_lazy
+from django.utils.translation import ugettext_lazy as _
+from enumfields import EnumField
+
+from leasing.enums import ReportJobState
+from users.models import User
+
+from .mixins import TimeStampedModel
+
+REPORT_JOB_IN_PROGRESS_STATES = [ReportJobState.QUEUED, ReportJobState.RUNNING]
+
+
+def get_report_job_result_upload_to(instance, filename):
+    return "/".join(["report_results", instance.report_type, filename])
+
+
+def get_report_job_input_data(input_data):
+    """Returns the validated report input in a JSON serializable form"""
+    return {
+        key: value.pk if isinstance(value, models.Model) else value
+        for (key, value) in input_data.items()
+    }
+
+
+def get_report_job_input_hash(report_type, input_data):
+    return hashlib.sha256(
+        json.dumps(
+            [report_type, input_data], cls=DjangoJSONEncoder, sort_keys=True
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+class ReportJobManager(models.Manager):
+    def get_or_create_for_input(
+        self, report_type, input_data, stale_after, queued_stale_after
+    ):
+        """Returns a job of the report with the same input that is in
+        progress or has a result that hasn't expired yet, or a new job
+
+        The jobs that have been running longer than stale_after or queued
+        longer than queued_stale_after are marked as failed. The task of a
+        job that stays queued that long has been lost, so its recipients
+        are moved to the new job."""
+        input_data = get_report_job_input_data(input_data)
+        input_hash = get_report_job_input_hash(report_type, input_data)
+        jobs = self.filter(report_type=report_type, input_hash=input_hash)
+        now = timezone.now()
+
+        lost_job_ids = list(
+            jobs.filter(
+                state=ReportJobState.QUEUED, created_at__lt=now - queued_stale_after
+            ).values_list("id", flat=True)
+        )
+        jobs.filter(
+            Q(state=ReportJobState.RUNNING, started_at__lt=now - stale_after)
+            | Q(state=ReportJobState.QUEUED, id__in=lost_job_ids)
+        ).update(state=ReportJobState.FAILED, finished_at=now)
+
+        job = (
+            jobs.filter(
+                Q(state__in=REPORT_JOB_IN_PROGRESS_STATES)
+                | Q(state=ReportJobState.SUCCEEDED, expires_at__gt=now)
+            )
+            .order_by("-created_at")
+            .first()
+        )
+        if job:
+            return (job, False)
+
+        try:
+            with transaction.atomic():
+                job = self.create(
+                    report_type=report_type,
+                    input_hash=input_hash,
+                    input_data=input_data,
+                )
+        except IntegrityError:
+            # An identical job was created at the same time
+            return (jobs.get(state__in=REPORT_JOB_IN_PROGRESS_STATES), False)
+
+        if lost_job_ids:
+            # The lost jobs that were claimed before they were marked as
+            # failed are left out
+            job.recipients.add(
+                *User.objects.filter(
+                    id__in=ReportJob.recipients.through.objects.filter(
+                        reportjob_id__in=lost_job_ids,
+                        reportjob__state=ReportJobState.FAILED,
+                    ).values("user_id")
+                )
+            )
+
+        return (job, True)
+
+
+class ReportJob(TimeStampedModel):
+    """A background run of an asynchronous report
+
+    The runs of the same report with the same input are deduplicated. A
+    request reuses the job that is in progress or the result that hasn't
+    expired yet, and the users who requested the report are notified when
+    the job finishes.
+    """
+
+    report_type = models.CharField(verbose_name=_("Report type"), max_length=255)
+    input_hash = models.CharField(verbose_name=_("Input hash"), max_length=64)
+    input_data = JSONField(verbose_name=_("Input data"), encoder=DjangoJSONEncoder)
+    state = EnumField(
+        ReportJobState,
+        verbose_name=_("State"),
+        max_length=30,
+        default=ReportJobState.QUEUED,
+    )
+    # Percentage of the work done
+    progress = models.PositiveSmallIntegerField(verbose_name=_("Progress"), default=0)
+    result = models.FileField(
+        verbose_name=_("Result"),
+        upload_to=get_report_job_result_upload_to,
+        null=True,
+        blank=True,
+    )
+    started_at = models.DateTimeField(
+        verbose_name=_("Time started"), null=True, blank=True
+    )
+    finished_at = models.DateTimeField(
+        verbose_name=_("Time finished"), null=True, blank=True
+    )
+    expires_at = models.DateTimeField(
+        verbose_name=_("Time expires"), null=True, blank=True
+    )
+    recipients = models.ManyToManyField(
+        User, verbose_name=_("Recipients"), related_name="+"
+    )
+
+    objects = ReportJobManager()
+
+    class Meta:
+        verbose_name = pgettext_lazy("Model name", "Report job")
+        verbose_name_plural = pgettext_lazy("Model name", "Report jobs")
+        indexes = [
+            models.Index(
+                fields=["report_type", "input_hash"], name="leasing_reportjob_input_idx"
+            )
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["report_type", "input_hash"],
+                condition=Q(
+                    state__in=[state.value for state in REPORT_JOB_IN_PROGRESS_STATES]
+                ),
+                name="leasing_reportjob_in_progress_key",
+            )
+        ]
+
+    def __str__(self):
+        return "{} {} ({})".format(self.report_type, self.id, self.state)
+
+    def set_progress(self, progress):
+        """Saves the progress when the percentage changes"""
+        progress = max(0, min(100, int(progress)))
+        if progress == self.progress:
+            return
+
+        self.progress = progress
+        ReportJob.objects.filter(pk=self.pk).update(progress=progress)
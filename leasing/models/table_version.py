@@ -0,0 +1,40 @@
+from django.db import models
+from django.utils.translation import pgettext_lazy
+from django.utils.translation import ugettext_lazy as _
+
+
+class TableVersion(models.Model):
+    """The version of the rows of a database table
+
+    Set by a database trigger on every statement that changes the table
+    (see the migration 0035_tableversion). The versions are taken from a
+    sequence, so a version is never reused, not even when the transaction
+    that changed the table is rolled back."""
+
+    table_name = models.CharField(
+        verbose_name=_("Table name"), max_length=255, primary_key=True
+    )
+    version = models.BigIntegerField(verbose_name=_("Version"))
+
+    class Meta:
+        verbose_name = pgettext_lazy("Model name", "Table version")
+        verbose_name_plural = pgettext_lazy("Model name", "Table versions")
+
+    def __str__(self):
+        return "{} {}".format(self.table_name, self.version)
+
+
+def get_table_version(*models):
+    """Returns the versions of the tables of the models
+
+    Used to find out whether the data loaded from the tables to the memory
+    of the process is still up to date. Only the tables that have a version
+    trigger are versioned; the version of a table that hasn't been changed
+    since the trigger was created is None."""
+    table_names = [model._meta.db_table for model in models]
+    versions = dict(
+        TableVersion.objects.filter(table_name__in=table_names).values_list(
+            "table_name", "version"
+        )
+    )
+    return tuple(versions.get(table_name) for table_name in table_names)
@@ -1,12 +1,13 @@
 import datetime
 import re
+from bisect import bisect_left
 from collections import OrderedDict, defaultdict, namedtuple
 from datetime import date
 from decimal import Decimal
 
 from dateutil.relativedelta import relativedelta
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import Manager, Model
+from django.db.models import Manager, Model, Prefetch, prefetch_related_objects
 
 from leasing.enums import PeriodType
 
@@ -360,33 +361,93 @@ def get_monthly_amount_by_period_type(amount, period_type):
         )
 
 
-def is_business_day(the_date):
+_bank_holiday_calendar = None
+
+
+def _check_date(the_date):
     if not the_date or not isinstance(the_date, datetime.date):
         raise ValueError("the_date must be an instance of datetime.date")
 
-    if the_date.weekday() > 4:
-        return False
 
+class BankHolidayCalendar:
+    """Sorted list of the bank holidays with bisect lookups"""
+
+    def __init__(self, days, version=None):
+        self.version = version
+        self.days = sorted(set(days))
+
+    @classmethod
+    def load(cls, version=None):
+        from leasing.models import BankHoliday
+
+        return cls(BankHoliday.objects.values_list("day", flat=True), version=version)
+
+    def is_bank_holiday(self, the_date):
+        position = bisect_left(self.days, the_date)
+
+        return position < len(self.days) and self.days[position] == the_date
+
+    def is_business_day(self, the_date):
+        _check_date(the_date)
+
+        return the_date.weekday() <= 4 and not self.is_bank_holiday(the_date)
+
+    def get_next_business_day(self, the_date):
+        _check_date(the_date)
+
+        next_day = the_date + relativedelta(days=1)
+
+        while not self.is_business_day(next_day):
+            next_day += relativedelta(days=1)
+
+        return next_day
+
+    def get_next_business_days(self, dates):
+        """Returns the next business day for every date in dates
+
+        The result is in the same order as dates. Every distinct
+        date is calculated only once."""
+        next_business_days = {
+            the_date: self.get_next_business_day(the_date) for the_date in set(dates)
+        }
+
+        return [next_business_days[the_date] for the_date in dates]
+
+
+def get_bank_holiday_calendar():
+    """Returns the bank holiday calendar of this process
+
+    The calendar is loaded once per process and reloaded only when the
+    bank holidays change (see leasing.models.table_version.get_table_version)."""
+    global _bank_holiday_calendar
     from leasing.models import BankHoliday
+    from leasing.models.table_version import get_table_version
+
+    version = get_table_version(BankHoliday)
 
-    try:
-        BankHoliday.objects.get(day=the_date)
+    if _bank_holiday_calendar is None or _bank_holiday_calendar.version != version:
+        _bank_holiday_calendar = BankHolidayCalendar.load(version=version)
+
+    return _bank_holiday_calendar
+
+
+def is_business_day(the_date):
+    _check_date(the_date)
 
+    if the_date.weekday() > 4:
         return False
-    except BankHoliday.DoesNotExist:
-        return True
+
+    return not get_bank_holiday_calendar().is_bank_holiday(the_date)
 
 
 def get_next_business_day(the_date):
-    if not the_date or not isinstance(the_date, datetime.date):
-        raise ValueError("the_date must be an instance of datetime.date")
+    _check_date(the_date)
 
-    next_day = the_date + relativedelta(days=1)
+    return get_bank_holiday_calendar().get_next_business_day(the_date)
 
-    while not is_business_day(next_day):
-        next_day += relativedelta(days=1)
 
-    return next_day
+def get_next_business_days(dates):
+    return get_bank_holiday_calendar().get_next_business_days(dates)
 
 
 def is_date_on_first_quarter(the_date):
@@ -426,31 +487,23 @@ class DayMonth(namedtuple("DayMonthBase", ["day", "month"])):
         return OrderedDict(zip(self._fields, self))
 
 
-def recursive_get_related(obj, user, parent_objs=None, acc=None):  # NOQA C901
-    """Recursively get objects that relate to `obj`
+RelatedPlanItem = namedtuple(
+    "RelatedPlanItem", ["accessor_name", "related_model", "many", "permission_name"]
+)
 
-    Returns all items as {content_type: set(instances)} that are
-    related by foreign keys on the `obj` and related objects that
-    point to `obj`.
+_recursive_get_related_plans = {}
 
-    Checks view_[modelname] permission."""
-    if acc is None:
-        acc = defaultdict(set)
 
-    if parent_objs is None:
-        parent_objs = []
+def get_recursive_get_related_plan(model):
+    """Returns the relations of the model that recursive_get_related follows
 
-    model = obj.__class__
+    The plan is computed once per model."""
+    if model in _recursive_get_related_plans:
+        return _recursive_get_related_plans[model]
 
-    # Go through every relation (except the ones marked as skip) and collect
-    # all of the referenced items.
-    skip_relations = getattr(model, "recursive_get_related_skip_relations", [])
+    skip_relations = set(getattr(model, "recursive_get_related_skip_relations", []))
 
-    # relations = (
-    #     f for f in model._meta.get_fields(include_hidden=True)
-    #     if f.is_relation and f.name not in skip_relations
-    # )
-    #
+    plan = []
     for relation in model._meta.get_fields(include_hidden=True):
         if (
             not relation.is_relation
@@ -467,45 +520,99 @@ def recursive_get_related(obj, user, parent_objs=None, acc=None):  # NOQA C901
         if accessor_name.endswith("+"):
             continue
 
-        # Skip relations to a parent model
-        if relation.related_model in (po.__class__ for po in parent_objs):
+        if relation.concrete and not relation.many_to_many:
+            # Foreign keys have a single value
+            many = False
+        elif relation.one_to_many or relation.many_to_many:
+            # Otherwise get all instances from the related manager
+            many = True
+        else:
             continue
 
-        if relation.concrete:
-            # Get value as-is if relation is a foreign key
-            concrete_item = getattr(obj, accessor_name)
-            if not concrete_item:
-                continue
-            all_items = [concrete_item]
+        plan.append(
+            RelatedPlanItem(
+                accessor_name,
+                relation.related_model,
+                many,
+                "{}.view_{}".format(
+                    relation.model._meta.app_label, relation.model._meta.model_name
+                ),
+            )
+        )
+
+    _recursive_get_related_plans[model] = plan
+
+    return plan
+
+
+def _get_related_items(objs, plan_item):
+    lookup = plan_item.accessor_name
+    # Include soft deleted objects
+    if hasattr(plan_item.related_model, "all_objects"):
+        lookup = Prefetch(lookup, queryset=plan_item.related_model.all_objects.all())
+
+    prefetch_related_objects(objs, lookup)
+
+    for obj in objs:
+        if plan_item.many:
+            yield from getattr(obj, plan_item.accessor_name).all()
         else:
-            # Otherwise get all instances from the related manager
-            related_manager = getattr(obj, accessor_name)
+            item = getattr(obj, plan_item.accessor_name)
+            if item:
+                yield item
 
-            if not hasattr(related_manager, "all"):
-                continue
 
-            # Include soft deleted objects
-            if hasattr(related_manager, "all_with_deleted"):
-                all_items = related_manager.all_with_deleted()
-            else:
-                all_items = related_manager.all()
+def recursive_get_related(obj, user, parent_objs=None, acc=None):
+    """Recursively get objects that relate to `obj`
 
-        # Model permission check
-        has_permission = False
-        permission_name = "{}.view_{}".format(
-            relation.model._meta.app_label, relation.model._meta.model_name
-        )
-        if user.has_perm(permission_name):
-            has_permission = True
+    Returns all items as {content_type: set(instances)} that are
+    related by foreign keys on the `obj` and related objects that
+    point to `obj`.
+
+    The objects are fetched one level at a time. The related objects
+    of all of the objects on a level that were reached through the same
+    models are fetched with one query per relation.
+
+    Checks view_[modelname] permission."""
+    if acc is None:
+        acc = defaultdict(set)
+
+    if parent_objs is None:
+        parent_objs = []
+
+    permissions = {}
+
+    # The objects to go through as {(model, models of the parent objects): {pk: obj}}
+    level = {
+        (obj.__class__, frozenset(po.__class__ for po in parent_objs)): {obj.pk: obj}
+    }
+
+    while level:
+        next_level = defaultdict(dict)
+
+        for ((model, parent_models), objs) in level.items():
+            objs = list(objs.values())
+            item_parent_models = parent_models | {model}
+
+            for plan_item in get_recursive_get_related_plan(model):
+                # Skip relations to a parent model
+                if plan_item.related_model in parent_models:
+                    continue
+
+                # Model permission check
+                if plan_item.permission_name not in permissions:
+                    permissions[plan_item.permission_name] = user.has_perm(
+                        plan_item.permission_name
+                    )
+
+                for item in _get_related_items(objs, plan_item):
+                    # Include item only if user has permission, but recurse into sub items regardless
+                    if permissions[plan_item.permission_name]:
+                        acc[ContentType.objects.get_for_model(item)].add(item)
 
-        for item in all_items:
-            # Include item only if user has permission, but recurse into sub items regardless
-            if has_permission:
-                acc[ContentType.objects.get_for_model(item)].add(item)
+                    next_level[(item.__class__, item_parent_models)][item.pk] = item
 
-            parent_objs.append(obj)
-            recursive_get_related(item, user=user, parent_objs=parent_objs, acc=acc)
-            parent_objs.pop()
+        level = next_level
 
     return acc
 
@@ -0,0 +1,173 @@
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from enum import Enum
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.translation import ugettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        if isinstance(o, Enum):
+            return o.value
+
+        return super().default(o)
+
+
+class OptionalKeysetPagination(LimitOffsetPagination):
+    """Limit/offset pagination with an opt-in keyset (cursor) mode
+
+    The keyset mode is used when the cursor query parameter is given. An
+    empty cursor returns the first page. Instead of skipping over the
+    previous pages, the next page is found by filtering by the ordering
+    values of the last object on the page, so that the deep pages are as
+    fast as the first one. The ordering of the queryset is used with the
+    primary key added as the last ordering field to make it unique. The
+    cursor pages can only be followed forwards.
+
+    The count is not returned in the keyset mode unless asked with the
+    count query parameter: "exact" counts the results and "estimate" uses
+    the row estimate of the query planner.
+    """
+
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = _("Invalid cursor")
+
+    keyset = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.keyset = True
+        self.request = request
+        self.display_page_controls = False
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.ordering = self.get_keyset_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+        self.count = self.get_keyset_count(queryset, request)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(position))
+
+        results = list(queryset[: self.limit + 1])
+
+        self.next_position = None
+        if len(results) > self.limit:
+            results = results[: self.limit]
+            self.next_position = list(
+                queryset.filter(pk=results[-1].pk)
+                .values_list(*[field.lstrip("-") for field in self.ordering])
+                .first()
+            )
+
+        return results
+
+    def get_keyset_ordering(self, queryset):
+        ordering = list(queryset.query.order_by)
+        if not ordering and queryset.query.default_ordering:
+            ordering = list(queryset.model._meta.ordering)
+
+        if not any(field.lstrip("-") in ("pk", "id") for field in ordering):
+            ordering.append("pk")
+
+        return ordering
+
+    def get_keyset_count(self, queryset, request):
+        count = request.query_params.get(self.count_query_param)
+
+        if count == "exact":
+            return queryset.count()
+
+        if count == "estimate":
+            plan = json.loads(queryset.explain(format="json"))
+            return int(plan[0]["Plan"]["Plan Rows"])
+
+        return None
+
+    def get_keyset_filter(self, position):
+        """Returns a filter for the objects that come after the position
+        in the ordering
+
+        Takes into account that PostgreSQL sorts nulls as larger than
+        any other value."""
+        q = Q(pk__in=[])
+        equal_q = Q()
+
+        for (field, value) in zip(self.ordering, position):
+            field_name = field.lstrip("-")
+
+            if field.startswith("-"):
+                if value is None:
+                    q |= equal_q & Q(**{"{}__isnull".format(field_name): False})
+                else:
+                    q |= equal_q & Q(**{"{}__lt".format(field_name): value})
+            elif value is not None:
+                q |= equal_q & (
+                    Q(**{"{}__gt".format(field_name): value})
+                    | Q(**{"{}__isnull".format(field_name): True})
+                )
+
+            if value is None:
+                equal_q &= Q(**{"{}__isnull".format(field_name): True})
+            else:
+                equal_q &= Q(**{field_name: value})
+
+        return q
+
+    def encode_cursor(self, position):
+        return urlsafe_b64encode(
+            json.dumps(position, cls=CursorJSONEncoder).encode("utf-8")
+        ).decode("ascii")
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+
+        try:
+            position = json.loads(urlsafe_b64decode(cursor.encode("ascii")))
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+
+        if self.next_position is None:
+            return None
+
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position),
+        )
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+
+        response_data = OrderedDict()
+        if self.count is not None:
+            response_data["count"] = self.count
+        response_data["next"] = self.get_next_link()
+        response_data["results"] = data
+
+        return Response(response_data)
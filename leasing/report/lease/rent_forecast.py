@@ -6,6 +6,8 @@ from django import forms
 from django.db.models import Q
 from django.utils.translation import ugettext_lazy as _
 
+from leasing.calculation.bulk import prefetch_for_rent_calculation
+from leasing.calculation.index import get_index_table
 from leasing.enums import LeaseState
 from leasing.models import Lease
 from leasing.report.excel import (
@@ -55,12 +57,11 @@ class RentForecastReport(AsyncReportBase):
         start_date = datetime.date(year=input_data["start_year"], month=1, day=1)
         end_date = datetime.date(year=input_data["end_year"], month=12, day=31)
 
-        leases = (
+        leases = prefetch_for_rent_calculation(
             Lease.objects.filter(
                 (Q(start_date__isnull=True) | Q(start_date__lte=end_date))
                 & (Q(end_date__isnull=True) | Q(end_date__gte=start_date))
-            )
-            .filter(
+            ).filter(
                 state__in=[
                     LeaseState.LEASE,
                     LeaseState.SHORT_TERM_LEASE,
@@ -68,8 +69,8 @@ class RentForecastReport(AsyncReportBase):
                     LeaseState.RYA,
                 ]
             )
-            .select_related("type")
         )
+        index_table = get_index_table()
 
         years = range(input_data["start_year"], input_data["end_year"] + 1)
 
@@ -78,10 +79,16 @@ class RentForecastReport(AsyncReportBase):
             "external": defaultdict(lambda: defaultdict(Decimal)),
         }
 
-        for lease in leases:
+        lease_count = leases.count()
+
+        for (lease_num, lease) in enumerate(leases):
+            self.set_progress(lease_num, lease_count)
+
             for year in years:
                 try:
-                    rent_amount = lease.calculate_rent_amount_for_year(year)
+                    rent_amount = lease.calculate_rent_amount_for_year(
+                        year, index_table=index_table
+                    )
 
                     rent_sums_key = "external"
                     if lease.type.identifier in INTERNAL_LEASE_TYPES:
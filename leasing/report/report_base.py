@@ -1,7 +1,10 @@
+import datetime
+import os
 from io import BytesIO
 
 import xlsxwriter
 from django.conf import settings
+from django.core.files.base import ContentFile
 from django.core.mail import EmailMessage
 from django.db.models import Model
 from django.utils import timezone
@@ -11,7 +14,10 @@ from django_q.tasks import async_task
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.fields import ChoiceField
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 
+from leasing.enums import ReportJobState
+from leasing.models.report_job import ReportJob
 from leasing.report.excel import ExcelRow, FormatType
 from leasing.report.forms import ReportFormBase
 from leasing.report.serializers import ReportOutputSerializer
@@ -281,46 +287,135 @@ class ReportBase:
 class AsyncReportBase(ReportBase):
     async_task_timeout = 60 * 30  # 30 min
 
+    # A job whose task hasn't started in this time is considered lost
+    queue_timeout = 60 * 60 * 2  # 2 h
+
+    # How long the generated report is reused for requests with the same input
+    result_ttl = datetime.timedelta(hours=24)
+
+    # The job that is generating the report
+    job = None
+
     @classmethod
     def get_output_fields_metadata(cls):
         return {"message": {"label": _("Message")}}
 
-    def generate_report(self, user, input_data):
+    def set_progress(self, done, total):
+        """Saves the progress of the report job. Can be called from get_data."""
+        if self.job and total:
+            # The rest of the work is writing the excel file
+            self.job.set_progress(done * 90 / total)
+
+    def generate_report(self, job_id, input_data):
+        """Generates the report of the job
+
+        Returns False without generating the report if the job isn't
+        queued anymore, i.e. another worker has already taken it."""
+        claimed = ReportJob.objects.filter(
+            pk=job_id, state=ReportJobState.QUEUED
+        ).update(state=ReportJobState.RUNNING, started_at=timezone.now())
+        if not claimed:
+            return False
+
+        self.job = ReportJob.objects.get(pk=job_id)
+
         report_data = self.get_data(input_data)
+        self.set_progress(1, 1)
 
-        return self.data_as_excel(report_data)
+        self.job.result.save(
+            self.get_filename("xlsx"),
+            ContentFile(self.data_as_excel(report_data)),
+            save=False,
+        )
+        self.job.state = ReportJobState.SUCCEEDED
+        self.job.progress = 100
+        self.job.finished_at = timezone.now()
+        self.job.expires_at = self.job.finished_at + self.result_ttl
+        self.job.save()
 
-    def send_report(self, task):
-        user = task.kwargs["user"]
+        return True
+
+    def send_job_result(self, job, recipients):
+        if job.state not in (ReportJobState.SUCCEEDED, ReportJobState.FAILED):
+            return
 
-        message = EmailMessage(from_email=settings.MVJ_EMAIL_FROM, to=[user.email])
+        message = EmailMessage(
+            from_email=settings.MVJ_EMAIL_FROM,
+            to=[user.email for user in recipients if user.email],
+        )
+        if not message.to:
+            return
 
-        if task.success:
+        if job.state == ReportJobState.SUCCEEDED:
             message.subject = _('Report "{}" successfully generated').format(self.name)
             message.body = _("Generated report attached")
-            message.attach(
-                self.get_filename("xlsx"),
-                task.result,
-                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
+            with job.result.open("rb") as result_file:
+                message.attach(
+                    os.path.basename(job.result.name),
+                    result_file.read(),
+                    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                )
         else:
             message.subject = _('Failed to generate report "{}"').format(self.name)
             message.body = _("Please try again")
 
         message.send()
 
+    def send_report(self, task):
+        if task.success and not task.result:
+            # The report was generated by another task
+            return
+
+        job = ReportJob.objects.get(pk=task.kwargs["job_id"])
+
+        if not task.success:
+            job.state = ReportJobState.FAILED
+            job.finished_at = timezone.now()
+            job.save()
+
+        self.send_job_result(job, job.recipients.all())
+
     def get_response(self, request):
         user = request.user
         input_data = self.get_input_data(request)
 
-        async_task(
-            self.generate_report,
-            user=user,
-            input_data=input_data,
-            hook=self.send_report,
-            timeout=self.async_task_timeout,
+        (job, created) = ReportJob.objects.get_or_create_for_input(
+            self.slug,
+            input_data,
+            # The task is stopped after the timeout, so a job that has been
+            # running much longer than that has failed
+            stale_after=datetime.timedelta(seconds=self.async_task_timeout * 2),
+            queued_stale_after=datetime.timedelta(seconds=self.queue_timeout),
         )
+        job.recipients.add(user)
+
+        if created:
+            try:
+                async_task(
+                    self.generate_report,
+                    job_id=job.id,
+                    input_data=input_data,
+                    hook=self.send_report,
+                    timeout=self.async_task_timeout,
+                )
+            except Exception:
+                # The job would block the requests with the same input
+                ReportJob.objects.filter(pk=job.pk).update(
+                    state=ReportJobState.FAILED, finished_at=timezone.now()
+                )
+                raise
+        else:
+            # The job may have finished before the user was added to the
+            # recipients
+            job.refresh_from_db()
+            self.send_job_result(job, [user])
 
         return Response(
-            {"message": _("Results will be sent by email to {}").format(user.email)}
+            {
+                "message": _("Results will be sent by email to {}").format(user.email),
+                "job": job.id,
+                "job_url": reverse(
+                    "report_job-detail", request=request, kwargs={"pk": job.id}
+                ),
+            }
         )
@@ -1,8 +1,13 @@
 import copy
 from collections import OrderedDict
 
+from enumfields.drf import EnumSupportSerializerMixin
 from rest_framework import serializers
 from rest_framework.fields import Field
+from rest_framework.reverse import reverse
+
+from leasing.enums import ReportJobState
+from leasing.models.report_job import ReportJob
 
 
 class ReportOutputSerializer(serializers.Serializer):
@@ -43,3 +48,32 @@ class ReportOutputSerializer(serializers.Serializer):
                 fields[field_name] = serializers.ReadOnlyField(source=field_source)
 
         return fields
+
+
+class ReportJobSerializer(EnumSupportSerializerMixin, serializers.ModelSerializer):
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = (
+            "id",
+            "report_type",
+            "input_data",
+            "state",
+            "progress",
+            "result",
+            "created_at",
+            "started_at",
+            "finished_at",
+            "expires_at",
+        )
+
+    def get_result(self, obj):
+        if obj.state != ReportJobState.SUCCEEDED or not obj.result:
+            return None
+
+        return reverse(
+            "report_job-download",
+            request=self.context.get("request"),
+            kwargs={"pk": obj.id},
+        )
@@ -1,12 +1,18 @@
+import os
+
+from django.http import HttpResponse
 from django.utils.translation import ugettext_lazy as _
 from rest_framework import status
+from rest_framework.decorators import action
 from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
-from rest_framework.viewsets import ViewSet
+from rest_framework.viewsets import ReadOnlyModelViewSet, ViewSet
 
+from leasing.enums import ReportJobState
+from leasing.models.report_job import ReportJob
 from leasing.renderers import BrowsableAPIRendererWithoutForms
 from leasing.report.invoice.collaterals_report import CollateralsReport
 from leasing.report.invoice.invoice_payments import InvoicePaymentsReport
@@ -24,6 +30,7 @@ from leasing.report.lease.lease_statistic_report import LeaseStatisticReport
 from leasing.report.lease.rent_forecast import RentForecastReport
 from leasing.report.lease.reservations import ReservationsReport
 from leasing.report.renderers import XLSXRenderer
+from leasing.report.serializers import ReportJobSerializer
 
 ENABLED_REPORTS = [
     DecisionConditionsReport,
@@ -133,3 +140,34 @@ class ReportViewSet(ViewSet):
             metadata["output_fields"] = report_class.get_output_fields_metadata()
 
         return Response(metadata, status=status.HTTP_200_OK)
+
+
+class ReportJobViewSet(ReadOnlyModelViewSet):
+    """The progress and the results of the asynchronous reports the user
+    has requested"""
+
+    permission_classes = (IsAuthenticated,)
+    serializer_class = ReportJobSerializer
+
+    def get_queryset(self):
+        return ReportJob.objects.filter(recipients=self.request.user).order_by(
+            "-created_at"
+        )
+
+    @action(methods=["get"], detail=True)
+    def download(self, request, pk=None):
+        job = self.get_object()
+
+        if job.state != ReportJobState.SUCCEEDED or not job.result:
+            raise NotFound(_("Report result not found"))
+
+        with job.result.open("rb") as result_file:
+            response = HttpResponse(
+                result_file.read(),
+                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
+        response["Content-Disposition"] = 'attachment; filename="{}"'.format(
+            os.path.basename(job.result.name)
+        )
+
+        return response
@@ -1,6 +1,6 @@
 from django.contrib.contenttypes.models import ContentType
-from django.contrib.gis.db.models import Union
 from django.db.models import DurationField, Q
+from django.db.models.expressions import RawSQL
 from django.db.models.functions import Cast
 from django.utils.translation import ugettext_lazy as _
 from enumfields.drf import EnumField, EnumSupportSerializerMixin
@@ -13,6 +13,8 @@ from leasing.models import (
     BasisOfRent,
     EmailLog,
     InfillDevelopmentCompensation,
+    LeaseAreaNoteOverlap,
+    LeaseBasisOfRentOverlap,
     RelatedLease,
     ReservationProcedure,
 )
@@ -294,32 +296,35 @@ class LeaseListSerializer(LeaseSerializerBase):
     collection_notes = None
 
 
-def get_related_lease_predecessors(to_lease_id, accumulator=None):
-    if accumulator is None:
-        accumulator = []
-
-    accumulator.append(to_lease_id)
-
-    result = set()
-    predecessors = RelatedLease.objects.filter(to_lease=to_lease_id).select_related(
-        "to_lease", "from_lease"
-    )
-
-    if predecessors:
-        for predecessor in predecessors:
-            result.add(predecessor)
-
-            if predecessor.from_lease_id == predecessor.to_lease_id:
-                continue
-
-            if predecessor.from_lease_id in accumulator:
-                continue
-
-            result.update(
-                get_related_lease_predecessors(predecessor.from_lease_id, accumulator)
+def get_related_lease_predecessors(to_lease_id):
+    """Returns all of the relations leading to the lease
+
+    The whole chain of predecessors is found with one recursive query
+    regardless of the length of the lease history."""
+    related_lease_table = RelatedLease._meta.db_table
+
+    return set(
+        RelatedLease.objects.filter(
+            id__in=RawSQL(
+                """
+                WITH RECURSIVE predecessors(id, from_lease_id) AS (
+                    SELECT rl.id, rl.from_lease_id
+                    FROM {related_lease_table} rl
+                    WHERE rl.to_lease_id = %s AND rl.deleted IS NULL
+                    UNION
+                    SELECT rl.id, rl.from_lease_id
+                    FROM {related_lease_table} rl
+                    INNER JOIN predecessors p ON rl.to_lease_id = p.from_lease_id
+                    WHERE rl.deleted IS NULL
+                )
+                SELECT id FROM predecessors
+                """.format(
+                    related_lease_table=related_lease_table
+                ),
+                [to_lease_id],
             )
-
-    return result
+        ).select_related("to_lease", "from_lease")
+    )
 
 
 def get_related_leases(obj):
@@ -380,27 +385,23 @@ class LeaseRetrieveSerializer(LeaseSerializerBase):
     def get_area_notes(self, obj):
         from leasing.serializers.area_note import AreaNoteSerializer
 
-        area_notes = None
-        combined_area = obj.lease_areas.aggregate(union=Union("geometry"))["union"]
-        if combined_area:
-            area_notes = AreaNote.objects.filter(geometry__intersects=combined_area)
+        area_notes = AreaNote.objects.filter(
+            id__in=LeaseAreaNoteOverlap.objects.filter(lease=obj).values("area_note")
+        )
 
         return AreaNoteSerializer(area_notes, many=True).data
 
     def get_matching_basis_of_rents(self, obj):
         from leasing.serializers.basis_of_rent import BasisOfRentSerializer
 
-        q = Q()
+        q = Q(
+            id__in=LeaseBasisOfRentOverlap.objects.filter(lease=obj).values(
+                "basis_of_rent"
+            )
+        )
         property_identifiers = obj.lease_areas.values_list("identifier", flat=True)
         if property_identifiers:
-            q = Q(property_identifiers__identifier__in=property_identifiers)
-
-        combined_area = obj.lease_areas.aggregate(union=Union("geometry"))["union"]
-        if combined_area:
-            q |= Q(geometry__intersects=combined_area)
-
-        if not q:
-            return []
+            q |= Q(property_identifiers__identifier__in=property_identifiers)
 
         return BasisOfRentSerializer(BasisOfRent.objects.filter(q), many=True).data
 
@@ -2,6 +2,7 @@ import os
 from collections import OrderedDict
 
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import ForeignObjectRel
 from django.urls import reverse
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
@@ -50,6 +51,75 @@ class InstanceDictPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
         return OrderedDict((item.pk, self.display_value(item)) for item in queryset)
 
 
+def _get_relation(model, attribute_name):
+    for field in model._meta.get_fields():
+        if not field.is_relation:
+            continue
+
+        if isinstance(field, ForeignObjectRel):
+            if field.get_accessor_name() == attribute_name:
+                return field
+        elif field.name == attribute_name:
+            return field
+
+    return None
+
+
+def _collect_related_lookups(serializer, prefix, prefetch, lookups):  # noqa: C901
+    if hasattr(serializer, "modify_fields_by_field_permissions"):
+        serializer.modify_fields_by_field_permissions()
+
+    model = serializer.Meta.model
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+
+        if field.source == "*":
+            if isinstance(field, serializers.ModelSerializer):
+                _collect_related_lookups(field, prefix, prefetch, lookups)
+            continue
+
+        if len(field.source_attrs) != 1:
+            continue
+
+        relation = _get_relation(model, field.source_attrs[0])
+        if relation is None:
+            continue
+
+        lookup = prefix + field.source_attrs[0]
+
+        if relation.one_to_many or relation.many_to_many:
+            if isinstance(field, serializers.ListSerializer):
+                lookups["prefetch_related"].append(lookup)
+                _collect_related_lookups(
+                    field.child, lookup + "__", True, lookups,
+                )
+            elif isinstance(field, serializers.ManyRelatedField):
+                lookups["prefetch_related"].append(lookup)
+        elif isinstance(field, serializers.ModelSerializer):
+            lookups["prefetch_related" if prefetch else "select_related"].append(lookup)
+            _collect_related_lookups(field, lookup + "__", prefetch, lookups)
+        elif not isinstance(field, serializers.PrimaryKeyRelatedField):
+            lookups["prefetch_related" if prefetch else "select_related"].append(lookup)
+
+
+def get_serializer_related_lookups(serializer):
+    """Returns the select_related and prefetch_related lookups of the
+    relations the serializer outputs
+
+    The fields the user has no permission to are left out. The relations
+    that are only used in SerializerMethodFields or in the serializer
+    methods are not found."""
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+
+    lookups = {"select_related": [], "prefetch_related": []}
+    _collect_related_lookups(serializer, "", False, lookups)
+
+    return lookups
+
+
 def sync_new_items_to_manager(new_items, manager, context):
     if not hasattr(manager, "add"):
         return
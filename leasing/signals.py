@@ -1,7 +1,20 @@
-from django.db.models.signals import post_delete, pre_save
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 
-from leasing.models import PlotSearchTarget
+from leasing.models import AreaNote, BasisOfRent, LeaseArea, PlotSearchTarget
+from leasing.models.area_overlap import (
+    update_lease_area_overlaps,
+    update_overlapping_leases,
+)
+from leasing.models.auditlog import (
+    get_audit_log_owner_source_models,
+    update_audit_log_object_owners,
+)
+from leasing.models.lease_search import (
+    get_lease_search_lease_ids,
+    get_lease_search_source_models,
+    update_lease_search_documents,
+)
 
 
 @receiver(pre_save, sender=PlotSearchTarget)
@@ -17,3 +30,62 @@ def prepare_plan_unit_on_plot_search_target_save(sender, instance, **kwargs):
 @receiver(post_delete, sender=PlotSearchTarget)
 def post_delete_plan_unit_on_plot_search_target_delete(sender, instance, **kwargs):
     instance.plan_unit.delete()
+
+
+@receiver(post_save, sender=LeaseArea)
+@receiver(post_delete, sender=LeaseArea)
+def update_lease_area_overlaps_on_lease_area_change(sender, instance, **kwargs):
+    update_lease_area_overlaps(instance.lease_id)
+
+
+@receiver(post_save, sender=AreaNote)
+@receiver(post_save, sender=BasisOfRent)
+def update_overlapping_leases_on_save(sender, instance, **kwargs):
+    update_overlapping_leases(instance)
+
+
+def update_audit_log_object_owners_on_save(sender, instance, **kwargs):
+    update_audit_log_object_owners([instance])
+
+
+for audit_log_owner_source_model in get_audit_log_owner_source_models():
+    post_save.connect(
+        update_audit_log_object_owners_on_save,
+        sender=audit_log_owner_source_model,
+        dispatch_uid="update_audit_log_object_owners_on_{}_save".format(
+            audit_log_owner_source_model._meta.model_name
+        ),
+    )
+
+
+def update_lease_search_documents_on_save(sender, instance, **kwargs):
+    update_lease_search_documents(get_lease_search_lease_ids(instance))
+
+
+def find_lease_search_leases_on_delete(sender, instance, **kwargs):
+    # The leases can't be found anymore after the instance is deleted
+    instance._lease_search_lease_ids = get_lease_search_lease_ids(instance)
+
+
+def update_lease_search_documents_on_delete(sender, instance, **kwargs):
+    update_lease_search_documents(getattr(instance, "_lease_search_lease_ids", []))
+
+
+for lease_search_source_model in get_lease_search_source_models():
+    model_name = lease_search_source_model._meta.model_name
+
+    post_save.connect(
+        update_lease_search_documents_on_save,
+        sender=lease_search_source_model,
+        dispatch_uid="update_lease_search_documents_on_{}_save".format(model_name),
+    )
+    pre_delete.connect(
+        find_lease_search_leases_on_delete,
+        sender=lease_search_source_model,
+        dispatch_uid="find_lease_search_leases_on_{}_delete".format(model_name),
+    )
+    post_delete.connect(
+        update_lease_search_documents_on_delete,
+        sender=lease_search_source_model,
+        dispatch_uid="update_lease_search_documents_on_{}_delete".format(model_name),
+    )
@@ -0,0 +1,161 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+from auditlog.models import LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.urls import reverse
+
+from leasing.models import (
+    AuditLogObjectOwner,
+    Contact,
+    Invoice,
+    InvoicePayment,
+    RelatedLease,
+    Tenant,
+    TenantContact,
+)
+
+
+@pytest.mark.django_db
+def test_lease_auditlog_includes_the_objects_of_the_lease(
+    django_db_setup, admin_client, lease_test_data, lease_factory, tenant_factory
+):
+    lease = lease_test_data["lease"]
+    tenant = lease_test_data["tenants"][0]
+    tenant.share_numerator = 2
+    tenant.share_denominator = 3
+    tenant.save()
+
+    other_lease = lease_factory(
+        type_id=1, municipality_id=1, district_id=1, notice_period_id=1
+    )
+    other_tenant = tenant_factory(
+        lease=other_lease, share_numerator=1, share_denominator=1
+    )
+
+    url = reverse("auditlog") + "?type=lease&id={}&limit=1000".format(lease.id)
+    response = admin_client.get(url)
+
+    assert response.status_code == 200, "%s %s" % (response.status_code, response.data)
+
+    log_entries = LogEntry.objects.filter(
+        id__in=[item["id"] for item in response.data["results"]]
+    )
+    logged_objects = {
+        (log_entry.content_type.model_class(), log_entry.object_id)
+        for log_entry in log_entries
+    }
+
+    assert (Tenant, tenant.id) in logged_objects
+    assert (Tenant, other_tenant.id) not in logged_objects
+    for tenant_contact in lease_test_data["tenantcontacts"]:
+        assert (TenantContact, tenant_contact.id) in logged_objects
+        assert (Contact, tenant_contact.contact_id) in logged_objects
+
+    assert (
+        len(
+            [
+                item
+                for item in response.data["results"]
+                if item["object_id"] == tenant.id
+            ]
+        )
+        == LogEntry.objects.get_for_object(tenant).count()
+    )
+
+
+@pytest.mark.django_db
+def test_lease_auditlog_includes_the_related_leases_of_both_leases(
+    django_db_setup, admin_client, lease_factory, related_lease_factory
+):
+    from_lease = lease_factory(
+        type_id=1, municipality_id=1, district_id=1, notice_period_id=1
+    )
+    to_lease = lease_factory(
+        type_id=1, municipality_id=1, district_id=1, notice_period_id=1
+    )
+    related_lease = related_lease_factory(from_lease=from_lease, to_lease=to_lease)
+
+    for lease in (from_lease, to_lease):
+        url = reverse("auditlog") + "?type=lease&id={}&limit=1000".format(lease.id)
+        response = admin_client.get(url)
+
+        assert response.status_code == 200, "%s %s" % (
+            response.status_code,
+            response.data,
+        )
+
+        log_entries = LogEntry.objects.filter(
+            id__in=[item["id"] for item in response.data["results"]]
+        )
+        assert (RelatedLease, related_lease.id) in {
+            (log_entry.content_type.model_class(), log_entry.object_id)
+            for log_entry in log_entries
+        }
+
+
+@pytest.mark.django_db
+def test_audit_log_object_owners_are_kept_after_moving(
+    django_db_setup, lease_test_data, lease_factory
+):
+    tenant = lease_test_data["tenants"][0]
+    old_lease = tenant.lease
+    new_lease = lease_factory(
+        type_id=1, municipality_id=1, district_id=1, notice_period_id=1
+    )
+
+    tenant.lease = new_lease
+    tenant.save()
+
+    assert set(
+        AuditLogObjectOwner.objects.filter(
+            content_type=ContentType.objects.get_for_model(Tenant), object_id=tenant.id,
+        ).values_list("lease", flat=True)
+    ) == {old_lease.id, new_lease.id}
+
+
+@pytest.mark.django_db
+def test_contact_auditlog_includes_the_invoices_and_tenants_of_the_contact(
+    django_db_setup,
+    admin_client,
+    lease_test_data,
+    invoice_factory,
+    invoice_payment_factory,
+):
+    lease = lease_test_data["lease"]
+    tenant_contact = lease_test_data["tenantcontacts"][0]
+    contact = tenant_contact.contact
+
+    invoice = invoice_factory(
+        lease=lease,
+        total_amount=Decimal(100),
+        billed_amount=Decimal(100),
+        outstanding_amount=Decimal(100),
+        recipient=contact,
+    )
+    payment = invoice_payment_factory(
+        invoice=invoice,
+        paid_amount=Decimal(100),
+        paid_date=datetime.date(year=2018, month=1, day=1),
+    )
+
+    url = reverse("auditlog") + "?type=contact&id={}&limit=1000".format(contact.id)
+    response = admin_client.get(url)
+
+    assert response.status_code == 200, "%s %s" % (response.status_code, response.data)
+
+    log_entries = LogEntry.objects.filter(
+        id__in=[item["id"] for item in response.data["results"]]
+    )
+    logged_objects = {
+        (log_entry.content_type.model_class(), log_entry.object_id)
+        for log_entry in log_entries
+    }
+
+    assert logged_objects == {
+        (Contact, contact.id),
+        (TenantContact, tenant_contact.id),
+        (Invoice, invoice.id),
+        (InvoicePayment, payment.id),
+    }
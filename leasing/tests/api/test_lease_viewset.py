@@ -3,9 +3,13 @@ from datetime import date, datetime
 
 import pytest
 from django.core.serializers.json import DjangoJSONEncoder
+from django.test import RequestFactory
 from django.urls import reverse
 
 from leasing.models import Lease, PlanUnit
+from leasing.models.lease_search import get_lease_search_lease_ids
+from leasing.serializers.lease import LeaseListSerializer, LeaseRetrieveSerializer
+from leasing.serializers.utils import get_serializer_related_lookups
 
 
 @pytest.mark.django_db
@@ -139,3 +143,127 @@ def test_copy_areas_to_contract(
 
     assert response.status_code == 200, "%s %s" % (response.status_code, response.data)
     assert PlanUnit.objects.filter(lease_area=lease_area, in_contract=True).count() == 1
+
+
+@pytest.mark.django_db
+def test_preview_invoices_calculation_profile_header(
+    django_db_setup, admin_client, lease_test_data
+):
+    lease = lease_test_data["lease"]
+    url = reverse("lease-preview-invoices-for-year") + "?lease={}&year=2020".format(
+        lease.id
+    )
+
+    response = admin_client.get(url)
+
+    assert response.status_code == 200
+    assert "X-Calculation-Profile" not in response
+
+    response = admin_client.get(url + "&profile=1")
+
+    assert response.status_code == 200
+    assert response["X-Calculation-Profile"].startswith("total;queries=")
+    assert "determine_payable_rents_and_periods;count=12;" in (
+        response["X-Calculation-Profile"]
+    )
+
+
+@pytest.mark.django_db
+def test_lease_details_contains_all_predecessors(
+    django_db_setup, admin_client, lease_factory, related_lease_factory
+):
+    leases = [
+        lease_factory(type_id=1, municipality_id=1, district_id=1, notice_period_id=1)
+        for i in range(5)
+    ]
+    related_leases = [
+        related_lease_factory(from_lease=from_lease, to_lease=to_lease)
+        for (from_lease, to_lease) in zip(leases, leases[1:])
+    ]
+    # A cycle in the history doesn't cause an endless loop
+    related_leases.append(
+        related_lease_factory(from_lease=leases[3], to_lease=leases[1])
+    )
+    # Deleted relations are not included
+    related_lease_factory(from_lease=leases[0], to_lease=leases[2]).delete()
+
+    url = reverse("lease-detail", kwargs={"pk": leases[3].id})
+    response = admin_client.get(url, content_type="application/json")
+
+    assert response.status_code == 200, "%s %s" % (response.status_code, response.data)
+    assert {item["id"] for item in response.data["related_leases"]["related_from"]} == {
+        related_lease.id for related_lease in related_leases[:3]
+    } | {related_leases[4].id}
+    assert {item["id"] for item in response.data["related_leases"]["related_to"]} == {
+        related_leases[3].id,
+        related_leases[4].id,
+    }
+
+
+@pytest.mark.django_db
+def test_lease_search_by_other_fields(
+    django_db_setup, admin_client, lease_factory, lease_test_data
+):
+    lease = lease_test_data["lease"]
+    other_lease = lease_factory(
+        type_id=1, municipality_id=1, district_id=1, notice_period_id=1
+    )
+
+    def search(search_string):
+        response = admin_client.get(reverse("lease-list"), {"search": search_string})
+
+        assert response.status_code == 200, "%s %s" % (
+            response.status_code,
+            response.data,
+        )
+
+        return {item["id"] for item in response.data["results"]}
+
+    assert search("primary street") == {lease.id}
+    assert search("12345") == {lease.id}
+    assert search("last name 2") == {lease.id}
+    assert search("Name 2 Fir") == {lease.id}
+    assert search("Nonexistent") == set()
+
+    # The search index is updated when the contact is changed
+    contact = lease_test_data["tenantcontacts"][0].contact
+    contact.last_name = "Renamed"
+    contact.save()
+
+    assert search("renamed") == {lease.id}
+
+    other_lease.lessor = contact
+    other_lease.save()
+
+    assert search("renamed") == {lease.id, other_lease.id}
+
+    # Saving a lessor doesn't recreate the search documents of its leases
+    assert get_lease_search_lease_ids(contact) == {lease.id}
+
+
+@pytest.mark.django_db
+def test_lease_list_and_detail_related_lookups(django_db_setup, admin_user):
+    request = RequestFactory().get("/")
+    request.user = admin_user
+    context = {"request": request}
+
+    list_lookups = get_serializer_related_lookups(LeaseListSerializer(context=context))
+    detail_lookups = get_serializer_related_lookups(
+        LeaseRetrieveSerializer(context=context)
+    )
+
+    assert "identifier__type" in list_lookups["select_related"]
+    assert "lessor" in list_lookups["select_related"]
+    assert "tenants__tenantcontact_set__contact" in list_lookups["prefetch_related"]
+    assert "lease_areas__addresses" in list_lookups["prefetch_related"]
+    assert "lease_areas__plots" not in list_lookups["prefetch_related"]
+    assert not [
+        lookup
+        for lookup in list_lookups["prefetch_related"]
+        if lookup.startswith(("rents", "contracts", "decisions", "collection_"))
+    ]
+
+    assert "preparer" in detail_lookups["select_related"]
+    assert "lease_areas__plots" in detail_lookups["prefetch_related"]
+    assert "rents__contract_rents" in detail_lookups["prefetch_related"]
+    assert "rents__payable_rents" in detail_lookups["prefetch_related"]
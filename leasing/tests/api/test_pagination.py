@@ -0,0 +1,68 @@
+import pytest
+from django.urls import reverse
+
+from leasing.enums import ContactType
+
+
+def get_ids(admin_client, url, params):
+    ids = []
+    response = admin_client.get(url, params)
+
+    while True:
+        assert response.status_code == 200, "%s %s" % (
+            response.status_code,
+            response.data,
+        )
+        ids.extend(item["id"] for item in response.data["results"])
+
+        if not response.data["next"]:
+            return ids
+
+        response = admin_client.get(response.data["next"])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("ordering", [None, "-names", "first_name"])
+def test_contact_list_keyset_pagination(
+    django_db_setup, admin_client, contact_factory, ordering
+):
+    for name in ["B", "A", None]:
+        for first_name in ["X", "Y", None]:
+            contact_factory(name=name, first_name=first_name, type=ContactType.BUSINESS)
+            contact_factory(
+                last_name=name, first_name=first_name, type=ContactType.PERSON
+            )
+
+    url = reverse("contact-list")
+    params = {"ordering": ordering} if ordering else {}
+
+    expected_ids = get_ids(admin_client, url, dict(params, limit=1000))
+    ids = get_ids(admin_client, url, dict(params, limit=4, cursor=""))
+
+    # The ordering has ties, so only check that every contact is on
+    # exactly one page
+    assert len(expected_ids) >= 18
+    assert sorted(ids) == sorted(expected_ids)
+
+
+@pytest.mark.django_db
+def test_contact_list_keyset_pagination_count(
+    django_db_setup, admin_client, contact_factory
+):
+    for i in range(3):
+        contact_factory(name="Contact {}".format(i), type=ContactType.BUSINESS)
+
+    url = reverse("contact-list")
+
+    response = admin_client.get(url, {"cursor": ""})
+    assert response.status_code == 200
+    assert "count" not in response.data
+
+    response = admin_client.get(url, {"cursor": "", "count": "exact"})
+    assert response.data["count"] == len(response.data["results"])
+
+    response = admin_client.get(url, {"cursor": "", "count": "estimate"})
+    assert isinstance(response.data["count"], int)
+
+    response = admin_client.get(url, {"cursor": "invalid"})
+    assert response.status_code == 404
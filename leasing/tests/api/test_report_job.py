@@ -0,0 +1,150 @@
+import datetime
+from types import SimpleNamespace
+
+import pytest
+from django.core import mail
+from django.urls import reverse
+from django.utils import timezone
+
+from leasing.enums import ReportJobState
+from leasing.models import ReportJob
+
+
+@pytest.fixture
+def queued_tasks(monkeypatch):
+    tasks = []
+
+    def async_task(func, **kwargs):
+        tasks.append((func, kwargs))
+
+    monkeypatch.setattr("leasing.report.report_base.async_task", async_task)
+
+    return tasks
+
+
+@pytest.mark.django_db
+def test_async_report_jobs_are_deduplicated(
+    django_db_setup, admin_client, admin_user, settings, tmp_path, queued_tasks
+):
+    settings.MEDIA_ROOT = str(tmp_path)
+    admin_user.email = "admin@example.com"
+    admin_user.save()
+
+    url = reverse("report-detail", kwargs={"report_type": "rent_forecast"})
+    params = {"start_year": 2020, "end_year": 2021}
+
+    responses = [admin_client.get(url, params) for i in range(2)]
+
+    assert [response.status_code for response in responses] == [200, 200]
+    assert responses[0].data["job"] == responses[1].data["job"]
+    assert len(queued_tasks) == 1
+
+    job = ReportJob.objects.get(pk=responses[0].data["job"])
+    assert job.state == ReportJobState.QUEUED
+    assert list(job.recipients.all()) == [admin_user]
+
+    # Run the task and its hook
+    (func, kwargs) = queued_tasks[0]
+    result = func(job_id=kwargs["job_id"], input_data=kwargs["input_data"])
+    kwargs["hook"](SimpleNamespace(kwargs=kwargs, success=True, result=result))
+
+    assert len(mail.outbox) == 1
+    assert len(mail.outbox[0].attachments) == 1
+
+    response = admin_client.get(reverse("report_job-detail", kwargs={"pk": job.id}))
+    assert response.status_code == 200
+    assert response.data["state"] == ReportJobState.SUCCEEDED.value
+    assert response.data["progress"] == 100
+
+    response = admin_client.get(response.data["result"])
+    assert response.status_code == 200
+
+    # The result is reused for the same input and sent right away
+    response = admin_client.get(url, params)
+    assert response.data["job"] == job.id
+    assert len(queued_tasks) == 1
+    assert len(mail.outbox) == 2
+
+    # Different input creates a new job
+    response = admin_client.get(url, {"start_year": 2020, "end_year": 2022})
+    assert response.data["job"] != job.id
+    assert len(queued_tasks) == 2
+
+
+@pytest.mark.django_db
+def test_async_report_job_is_run_once(
+    django_db_setup, admin_client, admin_user, settings, tmp_path, queued_tasks
+):
+    settings.MEDIA_ROOT = str(tmp_path)
+    admin_user.email = "admin@example.com"
+    admin_user.save()
+
+    url = reverse("report-detail", kwargs={"report_type": "rent_forecast"})
+    admin_client.get(url, {"start_year": 2020, "end_year": 2021})
+
+    # The same task is run twice, e.g. when it's retried
+    (func, kwargs) = queued_tasks[0]
+    results = [
+        func(job_id=kwargs["job_id"], input_data=kwargs["input_data"]) for i in range(2)
+    ]
+    for result in results:
+        kwargs["hook"](SimpleNamespace(kwargs=kwargs, success=True, result=result))
+
+    assert results == [True, False]
+    assert len(mail.outbox) == 1
+
+
+@pytest.mark.django_db
+def test_stale_report_jobs_are_failed(django_db_setup, admin_user):
+    stale_after = datetime.timedelta(hours=1)
+    queued_stale_after = datetime.timedelta(hours=3)
+    long_ago = timezone.now() - datetime.timedelta(hours=2)
+    input_data = {"start_year": 2020, "end_year": 2021}
+
+    (queued_job, created) = ReportJob.objects.get_or_create_for_input(
+        "rent_forecast", input_data, stale_after, queued_stale_after
+    )
+    queued_job.recipients.add(admin_user)
+    ReportJob.objects.filter(pk=queued_job.pk).update(created_at=long_ago)
+
+    (job, created) = ReportJob.objects.get_or_create_for_input(
+        "rent_forecast", input_data, stale_after, queued_stale_after
+    )
+    assert (job, created) == (queued_job, False)
+
+    # The task of the queued job has been lost
+    (job, created) = ReportJob.objects.get_or_create_for_input(
+        "rent_forecast", input_data, stale_after, datetime.timedelta(hours=1)
+    )
+    assert created
+    assert list(job.recipients.all()) == [admin_user]
+    queued_job.refresh_from_db()
+    assert queued_job.state == ReportJobState.FAILED
+
+    ReportJob.objects.filter(pk=job.pk).update(
+        state=ReportJobState.RUNNING, started_at=long_ago
+    )
+
+    (new_job, created) = ReportJob.objects.get_or_create_for_input(
+        "rent_forecast", input_data, stale_after, queued_stale_after
+    )
+    assert created
+    assert list(new_job.recipients.all()) == []
+    job.refresh_from_db()
+    assert job.state == ReportJobState.FAILED
+
+
+@pytest.mark.django_db
+def test_report_job_is_failed_if_it_cant_be_queued(
+    django_db_setup, admin_client, monkeypatch
+):
+    def async_task(func, **kwargs):
+        raise ConnectionError()
+
+    monkeypatch.setattr("leasing.report.report_base.async_task", async_task)
+
+    url = reverse("report-detail", kwargs={"report_type": "rent_forecast"})
+    with pytest.raises(ConnectionError):
+        admin_client.get(url, {"start_year": 2020, "end_year": 2021})
+
+    assert ReportJob.objects.get().state == ReportJobState.FAILED
@@ -0,0 +1,133 @@
+import datetime
+from io import StringIO
+
+import pytest
+from auditlog.models import LogEntry
+from django.core.management import call_command
+
+from leasing.enums import (
+    ContactType,
+    DueDatesType,
+    PeriodType,
+    RentCycle,
+    RentType,
+    TenantContactType,
+)
+from leasing.management.commands.create_invoices import create_invoices_for_shard
+from leasing.models import Invoice
+
+
+@pytest.fixture
+def invoicing_lease(
+    lease_factory,
+    tenant_factory,
+    contact_factory,
+    tenant_contact_factory,
+    tenant_rent_share_factory,
+    rent_factory,
+    contract_rent_factory,
+):
+    lease = lease_factory(
+        type_id=1,
+        municipality_id=1,
+        district_id=1,
+        notice_period_id=1,
+        start_date=datetime.date(year=2000, month=1, day=1),
+        is_invoicing_enabled=True,
+    )
+
+    tenant = tenant_factory(lease=lease, share_numerator=1, share_denominator=1)
+    tenant_rent_share_factory(
+        tenant=tenant, intended_use_id=1, share_numerator=1, share_denominator=1
+    )
+    contact = contact_factory(
+        first_name="First name", last_name="Last name", type=ContactType.PERSON
+    )
+    tenant_contact_factory(
+        type=TenantContactType.TENANT,
+        tenant=tenant,
+        contact=contact,
+        start_date=datetime.date(year=2000, month=1, day=1),
+    )
+
+    rent = rent_factory(
+        lease=lease,
+        type=RentType.FIXED,
+        cycle=RentCycle.JANUARY_TO_DECEMBER,
+        due_dates_type=DueDatesType.FIXED,
+        due_dates_per_year=12,
+    )
+    contract_rent_factory(
+        rent=rent,
+        intended_use_id=1,
+        amount=1200,
+        period=PeriodType.PER_YEAR,
+        base_amount=1200,
+        base_amount_period=PeriodType.PER_YEAR,
+    )
+
+    return lease
+
+
+@pytest.mark.django_db
+def test_create_invoices_for_shard_skips_existing_invoices(
+    django_db_setup, invoicing_lease
+):
+    today = datetime.date(year=2020, month=1, day=1)
+    start_date = datetime.date(year=2020, month=2, day=1)
+    end_date = datetime.date(year=2020, month=2, day=29)
+
+    (lease_ids, invoice_count, messages) = create_invoices_for_shard(
+        [invoicing_lease.id], today, start_date, end_date
+    )
+
+    assert lease_ids == [invoicing_lease.id]
+    assert invoice_count == 1
+
+    invoice = Invoice.objects.get(lease=invoicing_lease)
+    assert invoice.generated
+    assert invoice.invoicing_date == today
+    assert invoice.outstanding_amount == invoice.billed_amount
+    assert invoice.rows.count() == 1
+    assert LogEntry.objects.get_for_object(invoice).get().action == (
+        LogEntry.Action.CREATE
+    )
+
+    (lease_ids, invoice_count, messages) = create_invoices_for_shard(
+        [invoicing_lease.id], today, start_date, end_date
+    )
+
+    assert invoice_count == 0
+    assert Invoice.objects.filter(lease=invoicing_lease).count() == 1
+
+
+@pytest.mark.django_db
+def test_create_invoices_continues_from_checkpoint(
+    django_db_setup, invoicing_lease, tmp_path
+):
+    checkpoint_file = tmp_path / "checkpoint.json"
+    out = StringIO()
+
+    call_command(
+        "create_invoices",
+        True,
+        workers=1,
+        checkpoint_file=str(checkpoint_file),
+        stdout=out,
+    )
+
+    assert Invoice.objects.filter(lease=invoicing_lease).count() == 1
+    assert str(invoicing_lease.id) in checkpoint_file.read_text()
+
+    # The lease is already done, so it's not processed again
+    Invoice.objects.filter(lease=invoicing_lease).delete()
+
+    call_command(
+        "create_invoices",
+        True,
+        workers=1,
+        checkpoint_file=str(checkpoint_file),
+        stdout=out,
+    )
+
+    assert not Invoice.objects.filter(lease=invoicing_lease).exists()
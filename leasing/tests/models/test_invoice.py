@@ -3,9 +3,14 @@ import json
 from decimal import Decimal
 
 import pytest
+from auditlog.models import LogEntry
 from django.core.serializers.json import DjangoJSONEncoder
 from django.urls import reverse
 
+from leasing.calculation.penalty_interest import (
+    calculate_accrued_penalty_interest,
+    calculate_penalty_interests,
+)
 from leasing.enums import ContactType, InvoiceState, InvoiceType
 from leasing.models import Invoice, ReceivableType
 from leasing.models.invoice import InvoiceSet
@@ -1632,6 +1637,79 @@ def test_outstanding_amount_with_collection_charge_one_payment(
     assert invoice.state == InvoiceState.OPEN
 
 
+@pytest.mark.django_db
+def test_update_amounts_incrementally(
+    django_db_setup,
+    lease_factory,
+    contact_factory,
+    invoice_factory,
+    invoice_row_factory,
+    invoice_payment_factory,
+):
+    lease = lease_factory(
+        type_id=1, municipality_id=1, district_id=5, notice_period_id=1
+    )
+
+    contact = contact_factory(
+        first_name="First name", last_name="Last name", type=ContactType.PERSON
+    )
+
+    billing_period_start_date = datetime.date(year=2017, month=1, day=1)
+    billing_period_end_date = datetime.date(year=2017, month=12, day=31)
+
+    invoice = invoice_factory(
+        lease=lease,
+        total_amount=Decimal(200),
+        billed_amount=Decimal(200),
+        outstanding_amount=Decimal(200),
+        recipient=contact,
+        billing_period_start_date=billing_period_start_date,
+        billing_period_end_date=billing_period_end_date,
+    )
+    modified_at = invoice.modified_at
+
+    invoice_row_factory(
+        invoice=invoice,
+        receivable_type=ReceivableType.objects.get(pk=1),
+        billing_period_start_date=billing_period_start_date,
+        billing_period_end_date=billing_period_end_date,
+        amount=Decimal(200),
+    )
+
+    invoice_payment_factory(
+        invoice=invoice,
+        paid_amount=Decimal(50),
+        paid_date=datetime.date(year=2018, month=1, day=1),
+    )
+    invoice.update_amounts_incrementally(paid_amount=Decimal(50))
+
+    assert invoice.outstanding_amount == Decimal(150)
+    assert invoice.state == InvoiceState.OPEN
+    assert invoice.modified_at > modified_at
+    assert invoice.calculate_amounts() == {
+        "billed_amount": Decimal(200),
+        "total_amount": Decimal(200),
+        "outstanding_amount": Decimal(150),
+        "state": InvoiceState.OPEN,
+    }
+
+    log_entry = LogEntry.objects.get_for_object(invoice).latest("timestamp")
+    assert log_entry.action == LogEntry.Action.UPDATE
+    assert log_entry.changes_dict["outstanding_amount"] == ["200.00", "150.00"]
+
+    # Paying the rest changes the state, so the amounts are calculated again
+    invoice_payment_factory(
+        invoice=invoice,
+        paid_amount=Decimal(150),
+        paid_date=datetime.date(year=2018, month=2, day=1),
+    )
+    invoice.update_amounts_incrementally(paid_amount=Decimal(150))
+
+    invoice = Invoice.objects.get(pk=invoice.id)
+    assert invoice.outstanding_amount == Decimal(0)
+    assert invoice.state == InvoiceState.PAID
+
+
 @pytest.mark.django_db
 def test_calculate_penalty_amount(
     django_db_setup, lease_factory, contact_factory, invoice_factory
@@ -1672,6 +1750,56 @@ def test_calculate_penalty_amount(
     assert len(penalty_interest_data["interest_periods"]) == 4
 
 
+@pytest.mark.django_db
+def test_calculate_penalty_interests_matches_single_invoice_calculation(
+    django_db_setup, lease_factory, contact_factory, invoice_factory
+):
+    calculation_date = datetime.date(year=2018, month=9, day=6)
+
+    lease = lease_factory(
+        type_id=1, municipality_id=1, district_id=5, notice_period_id=1
+    )
+
+    contact = contact_factory(
+        first_name="First name", last_name="Last name", type=ContactType.PERSON
+    )
+
+    invoices = [
+        invoice_factory(
+            lease=lease,
+            total_amount=Decimal(500),
+            billed_amount=Decimal(500),
+            outstanding_amount=outstanding_amount,
+            due_date=due_date,
+            recipient=contact,
+            billing_period_start_date=datetime.date(year=2017, month=1, day=1),
+            billing_period_end_date=datetime.date(year=2017, month=12, day=31),
+        )
+        for (outstanding_amount, due_date) in [
+            (Decimal(100), datetime.date(year=2017, month=1, day=1)),
+            (Decimal("123.45"), datetime.date(year=2018, month=3, day=31)),
+            (Decimal(0), datetime.date(year=2018, month=1, day=1)),
+            (Decimal(100), datetime.date(year=2018, month=12, day=1)),
+        ]
+    ]
+
+    penalty_interests = calculate_penalty_interests(
+        invoices, calculation_date=calculation_date
+    )
+
+    for invoice in invoices:
+        assert penalty_interests[invoice] == invoice.calculate_penalty_interest(
+            calculation_date=calculation_date
+        )
+
+    assert calculate_accrued_penalty_interest(
+        invoices, calculation_date=calculation_date
+    ) == sum(
+        penalty_interest_data["total_interest_amount"]
+        for penalty_interest_data in penalty_interests.values()
+    )
+
+
 @pytest.mark.django_db
 def test_is_same_recipient_and_tenants(django_db_setup, invoices_test_data):
     assert invoices_test_data["invoice1"].is_same_recipient_and_tenants(
@@ -1,4 +1,14 @@
 import pytest
+from django.contrib.gis.geos import MultiPolygon, Polygon
+
+from leasing.models import AreaNote, LeaseAreaNoteOverlap
+
+
+def make_square(x, y, size=1):
+    return MultiPolygon(
+        Polygon(((x, y), (x, y + size), (x + size, y + size), (x + size, y), (x, y))),
+        srid=4326,
+    )
 
 
 @pytest.mark.django_db
@@ -17,3 +27,47 @@ def test_plan_unit_cannot_create_another_master_plan_unit(
 
     with pytest.raises(Exception):
         another_master_plan_unit.save()
+
+
+@pytest.mark.django_db
+def test_lease_area_note_overlaps_follow_geometry_changes(
+    lease_test_data, lease_area_factory, user_factory
+):
+    lease = lease_test_data["lease"]
+    lease_area = lease_test_data["lease_area"]
+    lease_area.geometry = make_square(24, 60)
+    lease_area.save()
+
+    user = user_factory(username="test_user")
+    overlapping_note = AreaNote.objects.create(
+        geometry=make_square(24.5, 60.5), note="Overlapping", user=user
+    )
+    AreaNote.objects.create(geometry=make_square(30, 65), note="Far away", user=user)
+
+    def get_overlapping_note_ids():
+        return set(
+            LeaseAreaNoteOverlap.objects.filter(lease=lease).values_list(
+                "area_note_id", flat=True
+            )
+        )
+
+    assert get_overlapping_note_ids() == {overlapping_note.id}
+
+    lease_area.geometry = make_square(10, 10)
+    lease_area.save()
+
+    assert get_overlapping_note_ids() == set()
+
+    lease_area_factory(
+        lease=lease,
+        identifier="67890",
+        area=100,
+        section_area=100,
+        geometry=make_square(24.9, 60.9),
+    )
+
+    assert get_overlapping_note_ids() == {overlapping_note.id}
+
+    overlapping_note.delete()
+
+    assert get_overlapping_note_ids() == set()
@@ -4,10 +4,13 @@ from decimal import Decimal
 import pytest
 from django.db.models.aggregates import Sum
 
+from leasing.calculation.bulk import calculate_rent_amounts_for_period
 from leasing.enums import (
     ContactType,
     DueDatesType,
+    IndexType,
     PeriodType,
+    RentAdjustmentAmountType,
     RentCycle,
     RentType,
     TenantContactType,
@@ -707,3 +710,76 @@ def test_add_rounded_amount_previous_invoices(
     ).aggregate(sum=Sum("amount"))["sum"]
 
     assert invoice_sum == lease.calculate_rent_amount_for_year(2017).get_total_amount()
+
+
+@pytest.mark.django_db
+def test_calculate_rent_amounts_for_period_matches_single_lease_calculation(
+    django_db_setup,
+    django_assert_max_num_queries,
+    lease_factory,
+    rent_factory,
+    contract_rent_factory,
+    fixed_initial_year_rent_factory,
+    rent_adjustment_factory,
+):
+    leases = []
+    for index_type in [IndexType.TYPE_3, IndexType.TYPE_7]:
+        lease = lease_factory(
+            type_id=1,
+            municipality_id=1,
+            district_id=1,
+            notice_period_id=1,
+            start_date=datetime.date(year=2000, month=1, day=1),
+        )
+        rent = rent_factory(
+            lease=lease,
+            type=RentType.INDEX,
+            index_type=index_type,
+            cycle=RentCycle.APRIL_TO_MARCH,
+            due_dates_type=DueDatesType.FIXED,
+            due_dates_per_year=2,
+        )
+        contract_rent_factory(
+            rent=rent,
+            intended_use_id=1,
+            amount=1000,
+            period=PeriodType.PER_YEAR,
+            base_amount=1000,
+            base_amount_period=PeriodType.PER_YEAR,
+        )
+        fixed_initial_year_rent_factory(
+            rent=rent,
+            intended_use_id=1,
+            amount=500,
+            start_date=datetime.date(year=2017, month=1, day=1),
+            end_date=datetime.date(year=2017, month=5, day=31),
+        )
+        rent_adjustment_factory(
+            rent=rent,
+            intended_use_id=1,
+            full_amount=10,
+            amount_type=RentAdjustmentAmountType.PERCENT_PER_YEAR,
+            start_date=datetime.date(year=2017, month=1, day=1),
+        )
+        leases.append(lease)
+
+    start_date = datetime.date(year=2017, month=1, day=1)
+    end_date = datetime.date(year=2017, month=12, day=31)
+
+    expected = {
+        lease.id: lease.calculate_rent_amount_for_period(
+            start_date, end_date
+        ).get_total_amount()
+        for lease in leases
+    }
+
+    # Leases, rents, due dates, contract rents, fixed initial year rents,
+    # rent adjustments, indexes and legacy indexes
+    with django_assert_max_num_queries(8):
+        results = calculate_rent_amounts_for_period(
+            Lease.objects.filter(id__in=expected.keys()), start_date, end_date
+        )
+
+    assert {
+        lease.id: result.get_total_amount() for lease, result in results.items()
+    } == expected
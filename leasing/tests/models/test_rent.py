@@ -377,6 +377,33 @@ def test_index_get_latest_for_year(year, expected):
         assert index.number == expected
 
 
+@pytest.mark.django_db
+def test_index_get_latest_for_year_is_cached(django_assert_num_queries):
+    Index.objects.get_latest_for_year(2018)
+
+    # Only the version of the index table is checked
+    with django_assert_num_queries(1):
+        assert Index.objects.get_latest_for_year(2018).number == 1927
+
+
+@pytest.mark.django_db
+def test_index_table_is_reloaded_on_index_change():
+    assert Index.objects.get_latest_for_year(2030).number == 1927
+
+    index = Index.objects.create(year=2029, number=2000)
+
+    assert Index.objects.get_latest_for_year(2030).number == 2000
+
+    index.number = 2100
+    index.save()
+
+    assert Index.objects.get_latest_for_year(2030).number == 2100
+
+    index.delete()
+
+    assert Index.objects.get_latest_for_year(2030).number == 1927
+
+
 @pytest.mark.django_db
 def test_get_amount_for_date_range_empty(lease_test_data, rent_factory):
     lease = lease_test_data["lease"]
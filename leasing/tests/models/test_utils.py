@@ -2,17 +2,24 @@ import inspect
 from datetime import date
 
 import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
+from leasing.enums import ContactType, TenantContactType
+from leasing.models import BankHoliday, Contact, Tenant, TenantContact
 from leasing.models.utils import (
     combine_ranges,
     fix_amount_for_overlap,
     get_billing_periods_for_year,
     get_next_business_day,
+    get_next_business_days,
     get_range_overlap_and_remainder,
     group_items_in_period_by_date_range,
     is_business_day,
     is_date_on_first_quarter,
     normalize_property_identifier,
+    recursive_get_related,
     split_date_range,
     subtract_range_from_range,
     subtract_ranges_from_ranges,
@@ -583,6 +590,41 @@ def test_get_next_business_day(the_day, expected):
         assert get_next_business_day(the_day) == expected
 
 
+@pytest.mark.django_db
+def test_get_next_business_days(django_assert_num_queries):
+    the_days = [
+        date(2017, 12, 25),
+        date(2019, 12, 5),
+        date(2017, 12, 25),
+        date(2021, 6, 30),
+    ]
+
+    # Load the calendar
+    get_next_business_day(date(2017, 1, 1))
+
+    # Only the version of the calendar is checked
+    with django_assert_num_queries(1):
+        assert get_next_business_days(the_days) == [
+            date(2017, 12, 27),
+            date(2019, 12, 9),
+            date(2017, 12, 27),
+            date(2021, 7, 1),
+        ]
+
+
+@pytest.mark.django_db
+def test_bank_holiday_calendar_is_reloaded_on_bank_holiday_change():
+    assert get_next_business_day(date(2021, 6, 30)) == date(2021, 7, 1)
+
+    bank_holiday = BankHoliday.objects.create(day=date(2021, 7, 1))
+
+    assert get_next_business_day(date(2021, 6, 30)) == date(2021, 7, 2)
+
+    bank_holiday.delete()
+
+    assert get_next_business_day(date(2021, 6, 30)) == date(2021, 7, 1)
+
+
 @pytest.mark.django_db
 @pytest.mark.parametrize(
     "the_day, expected",
@@ -742,3 +784,46 @@ def test_group_items_in_period_by_date_range(items, expected):
 )
 def test_normalize_property_identifier(identifier, expected):
     assert normalize_property_identifier(identifier) == expected
+
+
+@pytest.mark.django_db
+def test_recursive_get_related_query_count_does_not_depend_on_object_count(
+    django_db_setup,
+    admin_user,
+    lease_test_data,
+    contact_factory,
+    tenant_factory,
+    tenant_contact_factory,
+):
+    lease = lease_test_data["lease"]
+
+    with CaptureQueriesContext(connection) as context:
+        related = recursive_get_related(lease, user=admin_user)
+    query_count = len(context.captured_queries)
+
+    assert related[ContentType.objects.get_for_model(Tenant)] == set(
+        lease_test_data["tenants"]
+    )
+    assert related[ContentType.objects.get_for_model(TenantContact)] == set(
+        lease_test_data["tenantcontacts"]
+    )
+    assert {
+        tenant_contact.contact for tenant_contact in lease_test_data["tenantcontacts"]
+    } <= related[ContentType.objects.get_for_model(Contact)]
+
+    for i in range(3):
+        tenant = tenant_factory(lease=lease, share_numerator=1, share_denominator=5)
+        tenant_contact_factory(
+            type=TenantContactType.TENANT,
+            tenant=tenant,
+            contact=contact_factory(
+                first_name="New", last_name=str(i), type=ContactType.PERSON
+            ),
+            start_date=date(2019, 1, 1),
+        )
+
+    with CaptureQueriesContext(connection) as context:
+        related = recursive_get_related(lease, user=admin_user)
+
+    assert len(context.captured_queries) == query_count
+    assert len(related[ContentType.objects.get_for_model(Tenant)]) == 5
@@ -1,6 +1,6 @@
 from auditlog.models import LogEntry
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import Q
+from django.db.models import Exists, OuterRef
 from django.utils.translation import ugettext_lazy as _
 from rest_framework import status
 from rest_framework.exceptions import APIException, PermissionDenied
@@ -11,8 +11,8 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from leasing.forms import AuditLogSearchForm
-from leasing.models import Contact, Lease
-from leasing.models.utils import recursive_get_related
+from leasing.models import AuditLogObjectOwner, Contact, Lease
+from leasing.models.auditlog import get_audit_log_owner_models
 from leasing.serializers.auditlog import LogEntrySerializer
 
 
@@ -26,7 +26,7 @@ class AuditLogView(APIView):
     def get_view_description(self, html=False):
         return _("View auditlog of a lease or a contact")
 
-    def get(self, request, format=None):  # NOQA C901
+    def get(self, request, format=None):
         search_form = AuditLogSearchForm(self.request.query_params)
         if not search_form.is_valid():
             return Response(search_form.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -38,27 +38,39 @@ class AuditLogView(APIView):
 
         if search_form["type"].value() == "lease":
             try:
-                obj = Lease.objects.full_select_related_and_prefetch_related().get(
-                    pk=search_form["id"].value()
-                )
+                obj = Lease.objects.get(pk=search_form["id"].value())
             except Lease.DoesNotExist:
                 raise APIException("Lease does not exist")
+            owner_field = "lease"
         elif search_form["type"].value() == "contact":
             try:
                 obj = Contact.objects.get(pk=search_form["id"].value())
-            except Lease.DoesNotExist:
+            except Contact.DoesNotExist:
                 raise APIException("Contact does not exist")
-
-        collected_items = recursive_get_related(obj, user=request.user)
-
-        obj_content_type = ContentType.objects.get_for_model(obj)
-        q = Q(content_type=obj_content_type) & Q(object_id=obj.id)
-        for content_type, items in collected_items.items():
-            q |= Q(content_type=content_type) & Q(object_id__in=[i.pk for i in items])
+            owner_field = "contact"
+
+        # Include the log entries of the objects the user has permission to view
+        content_types = ContentType.objects.get_for_models(
+            *[
+                model
+                for model in get_audit_log_owner_models(owner_field)
+                if isinstance(obj, model)
+                or request.user.has_perm(
+                    "{}.view_{}".format(model._meta.app_label, model._meta.model_name)
+                )
+            ]
+        ).values()
+
+        owners = AuditLogObjectOwner.objects.filter(
+            content_type=OuterRef("content_type"),
+            object_id=OuterRef("object_id"),
+            content_type__in=content_types,
+            **{owner_field: obj}
+        )
 
         queryset = (
-            LogEntry.objects.filter(q)
-            .distinct()
+            LogEntry.objects.annotate(is_owned=Exists(owners))
+            .filter(is_owned=True)
             .order_by("-timestamp")
             .select_related("actor")
         )
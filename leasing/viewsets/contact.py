@@ -4,6 +4,7 @@ from rest_framework import filters
 from field_permissions.viewsets import FieldPermissionsViewsetMixin
 from leasing.filters import CoalesceOrderingFilter, ContactFilter
 from leasing.models import Contact
+from leasing.pagination import OptionalKeysetPagination
 from leasing.serializers.contact import ContactSerializer
 
 from .utils import AtomicTransactionModelViewSet, AuditLogMixin
@@ -20,6 +21,7 @@ class ContactViewSet(
         filters.SearchFilter,
         CoalesceOrderingFilter,
     )
+    pagination_class = OptionalKeysetPagination
     search_fields = (
         "id",
         "first_name",
@@ -15,6 +15,7 @@ from leasing.filters import (
 )
 from leasing.models import Invoice, Lease
 from leasing.models.invoice import InvoiceNote, InvoiceRow, InvoiceSet, ReceivableType
+from leasing.pagination import OptionalKeysetPagination
 from leasing.serializers.invoice import (
     CreditNoteUpdateSerializer,
     GeneratedInvoiceUpdateSerializer,
@@ -38,6 +39,7 @@ class InvoiceViewSet(FieldPermissionsViewsetMixin, AtomicTransactionModelViewSet
     serializer_class = InvoiceSerializer
     filterset_class = InvoiceFilter
     filter_backends = (DjangoFilterBackend, CoalesceOrderingFilter)
+    pagination_class = OptionalKeysetPagination
     ordering_fields = (
         "sent_to_sap_at",
         "recipient_name",
@@ -135,6 +137,7 @@ class InvoiceNoteViewSet(FieldPermissionsViewsetMixin, AtomicTransactionModelVie
     queryset = InvoiceNote.objects.all()
     serializer_class = InvoiceNoteSerializer
     filterset_class = InvoiceNoteFilter
+    pagination_class = OptionalKeysetPagination
 
     def get_serializer_class(self):
         if self.action in ("create", "update", "partial_update", "metadata"):
@@ -147,12 +150,14 @@ class InvoiceRowViewSet(FieldPermissionsViewsetMixin, ReadOnlyModelViewSet):
     queryset = InvoiceRow.objects.all()
     serializer_class = InvoiceRowSerializer
     filterset_class = InvoiceRowFilter
+    pagination_class = OptionalKeysetPagination
 
 
 class InvoiceSetViewSet(ReadOnlyModelViewSet):
     queryset = InvoiceSet.objects.all()
     serializer_class = InvoiceSetSerializer
     filterset_class = InvoiceSetFilter
+    pagination_class = OptionalKeysetPagination
 
 
 class ReceivableTypeViewSet(ReadOnlyModelViewSet):
@@ -8,12 +8,11 @@ from django.utils.translation import ugettext_lazy as _
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework.exceptions import PermissionDenied
-from rest_framework.filters import OrderingFilter
 from rest_framework.response import Response
 from rest_framework_gis.filters import InBBoxFilter
 
 from field_permissions.viewsets import FieldPermissionsViewsetMixin
-from leasing.filters import DistrictFilter, LeaseFilter
+from leasing.filters import DistrictFilter, LeaseFilter, SearchRankOrderingFilter
 from leasing.forms import LeaseSearchForm
 from leasing.models import (
     District,
@@ -32,7 +31,12 @@ from leasing.models import (
     StatisticalUse,
     SupportiveHousing,
 )
+from leasing.models.lease_search import (
+    get_lease_search_documents,
+    get_lease_search_rank,
+)
 from leasing.models.utils import normalize_property_identifier
+from leasing.pagination import OptionalKeysetPagination
 from leasing.serializers.common import ManagementSerializer
 from leasing.serializers.lease import (
     DistrictSerializer,
@@ -55,6 +59,7 @@ from leasing.serializers.lease import (
     StatisticalUseSerializer,
     SupportiveHousingSerializer,
 )
+from leasing.serializers.utils import get_serializer_related_lookups
 
 from .utils import AtomicTransactionModelViewSet, AuditLogMixin
 
@@ -139,7 +144,8 @@ class LeaseViewSet(
 ):
     serializer_class = LeaseRetrieveSerializer
     filterset_class = LeaseFilter
-    filter_backends = (DjangoFilterBackend, OrderingFilter, InBBoxFilter)
+    filter_backends = (DjangoFilterBackend, SearchRankOrderingFilter, InBBoxFilter)
+    pagination_class = OptionalKeysetPagination
     ordering = (
         "identifier__type__identifier",
         "identifier__municipality__identifier",
@@ -170,6 +176,12 @@ class LeaseViewSet(
 
         if succinct:
             queryset = Lease.objects.succinct_select_related_and_prefetch_related()
+        elif self.action in ("list", "retrieve"):
+            # Load only the relations the serializer of the action outputs
+            lookups = get_serializer_related_lookups(self.get_serializer())
+            queryset = Lease.objects.select_related(
+                *lookups["select_related"]
+            ).prefetch_related(*lookups["prefetch_related"])
         else:
             queryset = Lease.objects.full_select_related_and_prefetch_related()
 
@@ -241,50 +253,14 @@ class LeaseViewSet(
 
             # Search also by other fields if the search string is clearly not a lease identifier
             if search_by_other and not looks_like_identifier:
-                # Address
-                other_q |= Q(lease_areas__addresses__address__icontains=search_string)
-
-                # Property identifier
-                other_q |= Q(lease_areas__identifier__icontains=search_string)
-                normalized_identifier = normalize_property_identifier(search_string)
-                if search_string != normalized_identifier:
-                    other_q |= Q(
-                        lease_areas__identifier__icontains=normalized_identifier
-                    )
-
-                # Tenantcontact name
-                other_q |= Q(
-                    tenants__tenantcontact__contact__name__icontains=search_string
+                # Addresses, property identifiers and tenant contact names
+                # from the search index
+                documents = get_lease_search_documents(search_string)
+                other_q |= Q(id__in=documents.values("lease_id"))
+                queryset = queryset.annotate(
+                    search_rank=get_lease_search_rank(documents)
                 )
 
-                if " " in search_string:
-                    tenant_name_parts = search_string.split(" ", 2)
-                    other_q |= Q(
-                        tenants__tenantcontact__contact__first_name__icontains=tenant_name_parts[
-                            0
-                        ]
-                    ) & Q(
-                        tenants__tenantcontact__contact__last_name__icontains=tenant_name_parts[
-                            1
-                        ]
-                    )
-                    other_q |= Q(
-                        tenants__tenantcontact__contact__first_name__icontains=tenant_name_parts[
-                            1
-                        ]
-                    ) & Q(
-                        tenants__tenantcontact__contact__last_name__icontains=tenant_name_parts[
-                            0
-                        ]
-                    )
-                else:
-                    other_q |= Q(
-                        tenants__tenantcontact__contact__first_name__icontains=search_string
-                    )
-                    other_q |= Q(
-                        tenants__tenantcontact__contact__last_name__icontains=search_string
-                    )
-
                 # Lessor
                 other_q |= Q(lessor__name__icontains=search_string)
                 other_q |= Q(lessor__first_name__icontains=search_string)
@@ -13,6 +13,7 @@ from rest_framework.exceptions import APIException, ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from leasing.calculation.penalty_interest import calculate_penalty_interests
 from leasing.models import Lease, PlanUnit, Plot
 from leasing.models.utils import get_billing_periods_for_year
 from leasing.permissions import PerMethodPermission
@@ -22,7 +23,7 @@ from leasing.serializers.invoice import (
     CreateChargeSerializer,
     InvoiceSerializerWithExplanations,
 )
-from leasing.viewsets.utils import AtomicTransactionMixin
+from leasing.viewsets.utils import AtomicTransactionMixin, CalculationProfileMixin
 
 
 class LeaseCreateChargeViewSet(AtomicTransactionMixin, viewsets.GenericViewSet):
@@ -146,9 +147,13 @@ class LeaseCreateCollectionLetterDocumentViewSet(
 
         collection_charge_total = Decimal(0)
 
+        penalty_interests = calculate_penalty_interests(
+            [invoice_datum["invoice"] for invoice_datum in invoices]
+        )
+
         for invoice_datum in invoices:
             invoice = invoice_datum["invoice"]
-            penalty_interest_data = invoice.calculate_penalty_interest()
+            penalty_interest_data = penalty_interests[invoice]
 
             if penalty_interest_data["total_interest_amount"]:
                 interest_strings.append(
@@ -239,7 +244,7 @@ def get_lease_from_query_params(query_params):
         raise APIException("Invalid lease id")
 
 
-class LeaseRentForPeriodView(APIView):
+class LeaseRentForPeriodView(CalculationProfileMixin, APIView):
     permission_classes = (PerMethodPermission,)
     perms_map = {"GET": ["leasing.view_invoice"]}
 
@@ -294,7 +299,7 @@ class LeaseRentForPeriodView(APIView):
         return Response(result)
 
 
-class LeaseBillingPeriodsView(APIView):
+class LeaseBillingPeriodsView(CalculationProfileMixin, APIView):
     permission_classes = (PerMethodPermission,)
     perms_map = {"GET": ["leasing.view_invoice"]}
 
@@ -328,7 +333,7 @@ class LeaseBillingPeriodsView(APIView):
         return Response({"billing_periods": billing_periods})
 
 
-class LeasePreviewInvoicesForYearView(APIView):
+class LeasePreviewInvoicesForYearView(CalculationProfileMixin, APIView):
     permission_classes = (PerMethodPermission,)
     perms_map = {"GET": ["leasing.view_invoice"]}
 
@@ -12,6 +12,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import exception_handler
 
+from leasing.calculation.profiling import profile_calculation
+
 
 class AuditLogMixin:
     def initial(self, request, *args, **kwargs):
@@ -28,6 +30,23 @@ class AtomicTransactionMixin:
         return super().dispatch(request, *args, **kwargs)
 
 
+class CalculationProfileMixin:
+    """Profiles the rent and invoice calculations of the request if the
+    "profile" query parameter is set and returns the profile in the
+    X-Calculation-Profile response header"""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.GET.get("profile") not in ["1", "true"]:
+            return super().dispatch(request, *args, **kwargs)
+
+        with profile_calculation() as profile:
+            response = super().dispatch(request, *args, **kwargs)
+
+        response["X-Calculation-Profile"] = profile.to_header_value()
+
+        return response
+
+
 class AtomicTransactionModelViewSet(AtomicTransactionMixin, viewsets.ModelViewSet):
     """Viewset that combines AtomicTransactionMixin and rest_framework.viewsets.ModelViewSet"""
 
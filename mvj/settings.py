@@ -73,6 +73,7 @@ env = environ.Env(
     LEASE_AREA_DATABASE_DSN=(str, "host= port= user= password= dbname="),
     LASKE_EXPORT_FROM_EMAIL=(str, ""),
     LASKE_EXPORT_ANNOUNCE_EMAIL=(str, ""),
+    LASKE_EXPORT_MAX_FILE_SIZE=(int, None),
 )
 
 env_file = project_root(".env")
@@ -242,7 +243,7 @@ ANYMAIL = {"SENDGRID_API_KEY": env.str("SENDGRID_API_KEY")}
 EMAIL_BACKEND = env.str("EMAIL_BACKEND")
 
 CORS_ORIGIN_ALLOW_ALL = True
-CORS_EXPOSE_HEADERS = ["Content-Disposition"]
+CORS_EXPOSE_HEADERS = ["Content-Disposition", "X-Calculation-Profile"]
 
 Q_CLUSTER = {
     "name": "DjangORM",
@@ -287,6 +288,10 @@ LASKE_VALUES = {
 
 LASKE_EXPORT_ROOT = project_root("laske_export_files")
 
+# Maximum size (in bytes) of a Laske export file. Larger exports are split
+# into several files. No limit if not set.
+LASKE_EXPORT_MAX_FILE_SIZE = env.int("LASKE_EXPORT_MAX_FILE_SIZE")
+
 LASKE_DUE_DATE_OFFSET_DAYS = 17
 
 LASKE_SERVERS = {
@@ -6,7 +6,7 @@ from rest_framework import routers
 from rest_framework_swagger.views import get_swagger_view
 
 from forms.viewsets.form import FormViewSet
-from leasing.report.viewset import ReportViewSet
+from leasing.report.viewset import ReportJobViewSet, ReportViewSet
 from leasing.views import CloudiaProxy, VirreProxy, ktj_proxy
 from leasing.viewsets.area_note import AreaNoteViewSet
 from leasing.viewsets.auditlog import AuditLogView
@@ -144,6 +144,7 @@ router.register(r"regulation", RegulationViewSet)
 router.register(r"receivable_type", ReceivableTypeViewSet)
 router.register(r"related_lease", RelatedLeaseViewSet)
 router.register(r"report", ReportViewSet, basename="report")
+router.register(r"report_job", ReportJobViewSet, basename="report_job")
 router.register(r"special_project", SpecialProjectViewSet)
 router.register(r"reservation_procedure", ReservationProcedureViewSet)
 router.register(r"statistical_use", StatisticalUseViewSet)